@@ -1,8 +1,7 @@
 const ExcelJS = require('exceljs');
-const { execFile } = require('child_process');
-const path = require('path');
 const PdfPrinter = require('pdfmake');
 const { getFlights } = require('../../services/commercialFlightService');
+const { optimizarTurnoPython } = require('../../services/optimizadorService');
 const { PrismaClient, ShiftType } = require('@prisma/client');
 const prisma = new PrismaClient();
 const { enviarMensaje } = require('../chatbot/whatsapp.controller');
@@ -1110,7 +1109,8 @@ async function agregarAsignacionTurno(req, res) {
     const restriccion = await prisma.assignmentPlane.create({
       data: {
         planeTurnoId,
-        trabajadorTurnoId
+        trabajadorTurnoId,
+        manual: true
       },
     });
 
@@ -1699,31 +1699,33 @@ const crearPlaneTurno = async (req, res) => {
 // Ejecutar modelo de optimización 
 async function optimizarTurno(req, res) {
   const { id } = req.params;
+  // dosFases: guarda primero un plan factible (si no se indica, vale dos_fases de ParametrosModeloTurno)
+  const { incremental, fijarNoModificados, dosFases } = req.body || {};
 
   try {
-    const busesScript = path.resolve(__dirname, '../../scripts/crear_buses.py');
-    const resolverScript = path.resolve(__dirname, '../../scripts/resolver_modelo.py');
-
-    // Paso 1: crear buses
-    await new Promise((resolve, reject) => {
-      execFile('python3', [busesScript, '--turnoId', id], (err, stdout, stderr) => {
-        if (err) return reject(stderr);
-        console.log(stdout);
-        resolve();
-      });
+    const parametros = await prisma.parametrosModeloTurno.findUnique({
+      where: { turnoId: id },
+      select: { max_tiempo_ejecucion: true },
     });
 
-    // Paso 2: resolver modelo
-    const resultadoModelo = await new Promise((resolve, reject) => {
-      execFile('python3', [resolverScript, '--turnoId', id], (err, stdout, stderr) => {
-        if (err) return reject(stderr);
-        console.log(stdout);
-        if (stdout.includes("❌ No se encontró solución.")) {
-          return reject("No se encontró solución para el modelo.");
-        }
-        resolve(stdout);
-      });
+    // Crear buses + resolver modelo (servicio Python persistente, o procesos si no está corriendo)
+    const trabajo = await optimizarTurnoPython(id, {
+      incremental: Boolean(incremental),
+      fijarNoModificados: Boolean(fijarNoModificados),
+      dosFases: Boolean(dosFases),
+      maxTiempoEjecucion: parametros?.max_tiempo_ejecucion,
     });
+    const { crear_buses, resolver } = trabajo.resultado || {};
+    if (crear_buses?.salida) console.log(crear_buses.salida);
+    if (resolver?.salida) console.log(resolver.salida);
+
+    if (trabajo.estado === 'ERROR') {
+      const salida = (resolver || crear_buses)?.salida;
+      throw `${trabajo.error}${salida ? `: ${salida.slice(-2000)}` : ''}`;
+    }
+    if (!trabajo.resultado.solucion_encontrada) {
+      throw "No se encontró solución para el modelo.";
+    }
 
     await prisma.turno.update({
       where: { id: id },
@@ -1896,6 +1898,20 @@ async function obtenerHistorialDeTurno(req, res) {
   }
 }
 
+// Ver métricas (tiempo, CPU y memoria por fase) de las ejecuciones del optimizador
+async function obtenerMetricasEjecucion(req, res) {
+  try {
+    const { id } = req.params;
+    const metricas = await prisma.metricaEjecucionTurno.findMany({
+      where: { turnoId: id },
+      orderBy: { creadoEn: 'desc' },
+    });
+    res.json(metricas);
+  } catch (error) {
+    res.status(500).json({ error: 'Error al obtener métricas de ejecución' });
+  }
+}
+
 // helpers/kpiUtils.js
 function calcularKPIs(turno, assignmentBuses, assignmentPlanes, busMap, planeMap) {
   const totalTrab = turno.trabajadoresTurno.length;
@@ -2481,6 +2497,14 @@ async function actualizarParametrosModeloTurno(req, res) {
       costo_vuelos_comerciales,
       max_tiempo_ejecucion,
       tiempo_adicional_parada,
+      formulacion_espera,
+      agrupar_trabajadores,
+      hilos_busqueda,
+      gap_relativo,
+      gap_absoluto,
+      semilla,
+      nivel_presolve,
+      dos_fases,
     } = req.body;
 
     // Verifica existencia del turno
@@ -2508,6 +2532,14 @@ async function actualizarParametrosModeloTurno(req, res) {
         costo_vuelos_comerciales,
         max_tiempo_ejecucion,
         tiempo_adicional_parada,
+        formulacion_espera,
+        agrupar_trabajadores,
+        hilos_busqueda,
+        gap_relativo,
+        gap_absoluto,
+        semilla,
+        nivel_presolve,
+        dos_fases,
       },
     });
 
@@ -2655,6 +2687,7 @@ module.exports = {
   optimizarTurno,
   obtenerAsignacionesDeTurno,
   obtenerHistorialDeTurno,
+  obtenerMetricasEjecucion,
   exportarAsignacionesExcel,
   exportarAsignacionesPdf,
   agregarCapacidadTurno,
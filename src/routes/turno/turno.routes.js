@@ -16,6 +16,7 @@ const {
   optimizarTurno,
   obtenerAsignacionesDeTurno,
   obtenerHistorialDeTurno,
+  obtenerMetricasEjecucion,
   exportarAsignacionesExcel,
   exportarAsignacionesPdf,
   agregarCapacidadTurno,
@@ -286,6 +287,22 @@ router.post('/:id/planes', asignarAvionesATurno);
  *         required: true
  *         schema:
  *           type: string
+ *     requestBody:
+ *       required: false
+ *       content:
+ *         application/json:
+ *           schema:
+ *             type: object
+ *             properties:
+ *               incremental:
+ *                 type: boolean
+ *                 description: Parte de las asignaciones guardadas del turno y no vuelve a crear buses
+ *               fijarNoModificados:
+ *                 type: boolean
+ *                 description: En modo incremental, fija la asignación de los trabajadores no afectados por la edición
+ *               dosFases:
+ *                 type: boolean
+ *                 description: Guarda primero un plan factible y lo reemplaza solo si la optimización reduce la espera (por defecto, dos_fases de los parámetros del turno)
  *     responses:
  *       200:
  *         description: Optimización ejecutada
@@ -432,6 +449,24 @@ router.put('/:id/asignaciones/vuelo/intercambio', intercambioAsignacionTurnoPlan
  */
 router.get('/:id/historial', obtenerHistorialDeTurno);
 
+/**
+ * @swagger
+ * /turnos/{id}/metricas-ejecucion:
+ *   get:
+ *     summary: Obtener métricas por fase de las ejecuciones del optimizador
+ *     tags: [Turnos]
+ *     parameters:
+ *       - name: id
+ *         in: path
+ *         required: true
+ *         schema:
+ *           type: string
+ *     responses:
+ *       200:
+ *         description: Métricas de ejecución, de la más reciente a la más antigua
+ */
+router.get('/:id/metricas-ejecucion', obtenerMetricasEjecucion);
+
 router.get('/:id/exportar_excel', exportarAsignacionesExcel);
 
 router.get('/:id/exportar_pdf', exportarAsignacionesPdf);
@@ -492,6 +527,32 @@ router.get('/:id/parametros', obtenerParametrosModelo);
  *              tiempo_adicional_parada:
  *                type: integer
  *                description: Tiempo adicional de parada
+ *              formulacion_espera:
+ *                type: string
+ *                enum: [COMBINACIONES, POR_TRABAJADOR]
+ *                description: Formulación de la espera en el modelo (por combinación trabajador-bus-vuelo o una variable por trabajador)
+ *              agrupar_trabajadores:
+ *                type: boolean
+ *                description: Agrupa trabajadores idénticos en variables enteras de conteo
+ *              hilos_busqueda:
+ *                type: integer
+ *                description: Workers de búsqueda en paralelo de CP-SAT (0 = todos los núcleos)
+ *              gap_relativo:
+ *                type: number
+ *                description: Gap relativo con el que CP-SAT se detiene (0 = hasta probar el óptimo)
+ *              gap_absoluto:
+ *                type: number
+ *                description: Gap absoluto, en minutos de espera, con el que CP-SAT se detiene
+ *              semilla:
+ *                type: integer
+ *                description: Semilla aleatoria del solver
+ *              nivel_presolve:
+ *                type: integer
+ *                enum: [0, 1, 2]
+ *                description: 0 sin presolve, 1 presolve sin probing, 2 presolve completo
+ *              dos_fases:
+ *                type: boolean
+ *                description: Guarda primero un plan factible y lo reemplaza solo si la optimización reduce la espera
  *              min_hora:
  *                type: string
  *                description: Hora mínima de operación
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+TAMANOS = [100, 500, 1000, 2000, 5000]
+MODOS = ["memoria", "postgres"]
+FORMULACIONES_ESPERA = ["COMBINACIONES", "POR_TRABAJADOR"]
+
+# (clave, título, formato) de las columnas del reporte y de la comparación entre corridas
+METRICAS = [
+    ("variables", "Variables", "{:.0f}"),
+    ("restricciones", "Restricciones", "{:.0f}"),
+    ("tiempo_buses", "Buses (s)", "{:.2f}"),
+    ("tiempo_modelo", "Modelo (s)", "{:.2f}"),
+    ("tiempo_resolucion", "Solve (s)", "{:.2f}"),
+    ("tiempo_escritura", "Escritura (s)", "{:.3f}"),
+    ("memoria_max_mb", "RSS máx (MB)", "{:.0f}"),
+    ("objetivo", "Objetivo", "{:.0f}"),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Mide cómo escala el optimizador con turnos sintéticos de distintos tamaños."
+    )
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS, help="Cantidades de trabajadores a generar")
+    parser.add_argument("--modo", choices=MODOS, default="memoria",
+                        help="memoria: datos generados en proceso, sin base; postgres: turno escrito en DATABASE_URL")
+    parser.add_argument("--semilla", type=int, default=1, help="Semilla del generador")
+    parser.add_argument("--tiempo-limite", type=int, default=60, help="max_tiempo_ejecucion del resolver (segundos)")
+    parser.add_argument("--formulacion", choices=FORMULACIONES_ESPERA, help="Formulación de espera a usar")
+    parser.add_argument("--agrupar-trabajadores", action="store_true", help="Usa el modelo agregado")
+    parser.add_argument("--conservar", action="store_true", help="En modo postgres, no borra los turnos generados")
+    parser.add_argument("--salida", help="Ruta donde guardar los resultados en JSON")
+    parser.add_argument("--comparar", help="Resultados JSON de una corrida anterior para comparar")
+    parser.add_argument("--desde", help="Usa estos resultados JSON en vez de ejecutar (para comparar corridas guardadas)")
+    parser.add_argument("--tamano", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--json", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def memoria_maxima_mb():
+    # Pico de RSS del proceso y de sus hijos (los subproblemas en paralelo corren en procesos aparte)
+    try:
+        import resource
+    except ImportError:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    propio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(propio, hijos) / 1024  # KB en Linux
+
+
+def medir_tamano(args):
+    # Un tamaño, en su propio proceso: así el pico de memoria corresponde solo a este turno
+    from scripts.benchmarks.generador_turnos import datos_en_memoria, eliminar_turno, generar_turno, insertar_turno
+    from scripts.pipeline import agregar_buses, cargar_datos, crear_buses, extraer_solucion, planificar_buses, resolver_turno
+
+    inicio_total = time.time()
+    turno = generar_turno(args.tamano, args.semilla)
+    turno_id = turno["turno_id"]
+    medicion = {"trabajadores": args.tamano, "modo": args.modo, "turnoId": turno_id}
+    opciones = {"formulacion": args.formulacion, "agrupar": args.agrupar_trabajadores}
+
+    conn = None
+    try:
+        if args.modo == "postgres":
+            from scripts.modelo.conexion import obtener_conexion
+            conn = obtener_conexion()
+            inicio = time.time()
+            insertar_turno(conn, turno, args.tiempo_limite)
+            medicion["tiempo_generacion"] = time.time() - inicio
+
+            inicio = time.time()
+            datos = cargar_datos(conn, turno_id)
+            medicion["tiempo_carga"] = time.time() - inicio
+            inicio = time.time()
+            crear_buses(conn, turno_id, datos)
+            medicion["tiempo_buses"] = time.time() - inicio
+
+            resultado = resolver_turno(conn, turno_id, datos, **opciones)
+            escritura = resultado["escritura"]
+            medicion["tiempo_escritura"] = escritura["tiempo"] if escritura else None
+        else:
+            inicio = time.time()
+            datos = datos_en_memoria(turno, args.tiempo_limite)
+            medicion["tiempo_generacion"] = time.time() - inicio
+            medicion["tiempo_carga"] = 0.0
+
+            inicio = time.time()
+            plan = planificar_buses(turno_id, datos)
+            agregar_buses(datos, plan["filas"])
+            medicion["tiempo_buses"] = time.time() - inicio
+
+            # Sin base no hay escritura; se mide hasta la extracción de la solución
+            resultado = resolver_turno(None, turno_id, datos, guardar_solucion=False, **opciones)
+            if resultado["contexto"] is not None:
+                inicio = time.time()
+                extraer_solucion(resultado["contexto"])
+                resultado["tiempos"]["extraccion"] = time.time() - inicio
+            medicion["tiempo_escritura"] = None
+
+        stats = resultado["stats"] or {}
+        medicion.update({clave: stats.get(clave) for clave in (
+            "buses", "vuelos", "subproblemas", "variables", "restricciones", "tiempo_indice", "tiempo_modelo",
+            "tiempo_resolucion", "estado", "objetivo", "gap_obtenido", "formulacion_espera", "agrupar_trabajadores",
+        )})
+        medicion["tiempos"] = resultado["tiempos"]
+        medicion["fases"] = resultado["metricas"]["fases"]
+    finally:
+        if conn is not None:
+            if not args.conservar:
+                eliminar_turno(conn, turno_id)
+            conn.close()
+
+    medicion["memoria_max_mb"] = memoria_maxima_mb()
+    medicion["tiempo_total"] = time.time() - inicio_total
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump(medicion, f, indent=2, default=str)
+
+
+def ejecutar_tamano(args, tamano):
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "medicion.json")
+        comando = [sys.executable, str(Path(__file__).resolve()), "--tamano", str(tamano), "--json", ruta,
+                   "--modo", args.modo, "--semilla", str(args.semilla), "--tiempo-limite", str(args.tiempo_limite)]
+        if args.formulacion:
+            comando += ["--formulacion", args.formulacion]
+        if args.agrupar_trabajadores:
+            comando.append("--agrupar-trabajadores")
+        if args.conservar:
+            comando.append("--conservar")
+        proceso = subprocess.run(comando, capture_output=True, text=True)
+        if proceso.returncode != 0 or not os.path.exists(ruta):
+            print(f"⚠️ Error midiendo {tamano} trabajadores:", file=sys.stderr)
+            print(proceso.stdout[-2000:], proceso.stderr[-2000:], file=sys.stderr)
+            return None
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def formatear(valor, formato):
+    return "-" if valor is None else formato.format(valor)
+
+
+def imprimir_reporte(resultados):
+    encabezado = f"{'Trabajadores':<13}" + "".join(f"{titulo:>15}" for _, titulo, _ in METRICAS) + f"{'Estado':>10}"
+    print(f"\n{encabezado}")
+    for r in resultados:
+        print(f'{r["trabajadores"]:<13}' + "".join(f"{formatear(r.get(clave), formato):>15}" for clave, _, formato in METRICAS)
+              + f'{r["estado"] or "-":>10}')
+
+
+def imprimir_comparacion(base, actual):
+    # Por tamaño y métrica: valor de la corrida base, de la actual y cambio relativo
+    por_tamano = {r["trabajadores"]: r for r in base["resultados"]}
+    print(f"\n📊 Comparación con la corrida del {base['fecha']} (modo {base['modo']})")
+    print(f"{'Trabajadores':<13}{'Métrica':<16}{'Base':>12}{'Actual':>12}{'Cambio':>10}")
+    for r in actual["resultados"]:
+        anterior = por_tamano.get(r["trabajadores"])
+        if anterior is None:
+            continue
+        for clave, titulo, formato in METRICAS:
+            a, b = anterior.get(clave), r.get(clave)
+            cambio = "-"
+            if a is not None and b is not None and a != 0:
+                cambio = f"{(b - a) / abs(a) * 100:+.1f}%"
+            print(f'{r["trabajadores"]:<13}{titulo:<16}{formatear(a, formato):>12}{formatear(b, formato):>12}{cambio:>10}')
+        if anterior.get("estado") != r.get("estado"):
+            print(f'{r["trabajadores"]:<13}{"Estado":<16}{anterior.get("estado") or "-":>12}{r.get("estado") or "-":>12}')
+
+
+def main():
+    args = parse_args()
+    if args.tamano:
+        medir_tamano(args)
+        return
+
+    if args.desde:
+        with open(args.desde, encoding="utf-8") as f:
+            corrida = json.load(f)
+    else:
+        corrida = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "modo": args.modo,
+            "semilla": args.semilla,
+            "tiempo_limite": args.tiempo_limite,
+            "formulacion": args.formulacion,
+            "agrupar_trabajadores": args.agrupar_trabajadores,
+            "resultados": [],
+        }
+        for tamano in args.tamanos:
+            print(f"⏳ Turno sintético de {tamano} trabajadores ({args.modo})...")
+            medicion = ejecutar_tamano(args, tamano)
+            if medicion:
+                corrida["resultados"].append(medicion)
+
+    imprimir_reporte(corrida["resultados"])
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            imprimir_comparacion(json.load(f), corrida)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(corrida, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
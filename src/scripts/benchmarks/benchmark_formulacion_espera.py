@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+RESOLVER = Path(__file__).resolve().parents[1] / "resolver_modelo.py"
+FORMULACIONES_ESPERA = ["COMBINACIONES", "POR_TRABAJADOR"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compara tamaño del modelo y tiempo de resolución entre formulaciones de espera."
+    )
+    parser.add_argument("--turnoId", required=True, help="ID del turno a resolver")
+    parser.add_argument("--salida", help="Ruta opcional para guardar los resultados en JSON")
+    return parser.parse_args()
+
+
+def ejecutar_formulacion(turno_id, formulacion):
+    # El resolver se ejecuta sin guardar, así el turno queda intacto entre corridas
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta_stats = os.path.join(tmp, "stats.json")
+        proceso = subprocess.run(
+            [sys.executable, str(RESOLVER), "--turnoId", turno_id,
+             "--formulacion", formulacion, "--no-guardar", "--stats-json", ruta_stats],
+            capture_output=True, text=True
+        )
+        if proceso.returncode != 0 or not os.path.exists(ruta_stats):
+            print(f"⚠️ Error ejecutando formulación {formulacion}:", file=sys.stderr)
+            print(proceso.stdout[-2000:], proceso.stderr[-2000:], file=sys.stderr)
+            return None
+        with open(ruta_stats, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def main():
+    args = parse_args()
+
+    resultados = []
+    for formulacion in FORMULACIONES_ESPERA:
+        print(f"⏳ Resolviendo turno {args.turnoId} con formulación {formulacion}...")
+        stats = ejecutar_formulacion(args.turnoId, formulacion)
+        if stats:
+            resultados.append(stats)
+
+    print(f"\n{'Formulación':<16}{'Variables':>11}{'Restricciones':>15}{'Modelo (s)':>12}{'Solve (s)':>11}{'Estado':>10}{'Objetivo':>11}")
+    for r in resultados:
+        objetivo = "-" if r["objetivo"] is None else f'{r["objetivo"]:.0f}'
+        print(f'{r["formulacion_espera"]:<16}{r["variables"]:>11}{r["restricciones"]:>15}'
+              f'{r["tiempo_modelo"]:>12.3f}{r["tiempo_resolucion"]:>11.2f}{r["estado"]:>10}{objetivo:>11}')
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
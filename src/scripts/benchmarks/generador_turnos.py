@@ -0,0 +1,248 @@
+import math
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from scripts.modelo.carga import COLUMNAS_REGION, TIEMPO_ADICIONAL_PARADA
+
+# Turnos sintéticos para medir cómo escala el optimizador. Un turno se genera como filas por tabla
+# y se puede escribir en una base PostgreSQL local (insertar_turno) o entregar directo al pipeline
+# con la misma forma que scripts/modelo/carga.py (datos_en_memoria), sin base de datos.
+
+PREFIJO = "bench"
+FECHA_TURNO = datetime(2025, 4, 7)
+
+# Regiones de origen: comunas (todas en modelo/comunas.csv), tiempo promedio de bus, menú de
+# capacidades de bus y peso en la nómina. RM llega directo al aeropuerto (sin bus). En la tabla
+# Region se guardan con nombre propio ("BENCH V", ...) para no mezclarse con las regiones reales.
+REGIONES = {
+    "RM": (["AEROPUERTO SANTIAGO"], 0, [], 2),
+    "V": (["VALPARAISO", "VINA DEL MAR", "QUILPUE", "VILLA ALEMANA", "LIMACHE", "QUILLOTA", "LA CALERA",
+           "SAN FELIPE", "LOS ANDES", "SAN ANTONIO", "CARTAGENA", "CASABLANCA"], 120, [45, 20], 4),
+    "VI": (["RANCAGUA", "MACHALI", "GRANEROS", "RENGO", "SAN FERNANDO", "SANTA CRUZ"], 90, [45, 20], 2),
+    "VII": (["CURICO", "MOLINA", "TALCA", "LINARES", "CONSTITUCION"], 180, [45, 30, 12], 1),
+    "VIII": (["CHILLAN", "CONCEPCION", "TALCAHUANO", "SAN PEDRO DE LA PAZ", "LOS ANGELES"], 300, [45, 30, 12], 1),
+}
+DESTINOS = {"CALAMA": "CJC", "ANTOFAGASTA": "ANF"}
+
+# Vuelos charter (hora local de salida y duración) por sentido; la capacidad se escala con la demanda
+HORAS_CHARTER_SUBIDA = [8, 10, 13]
+HORAS_CHARTER_BAJADA = [15, 17, 19]
+DURACION_VUELO_MINUTOS = 125
+CAPACIDAD_CHARTER = 180
+COBERTURA_CHARTER = 0.85
+
+# Vuelos comerciales: asientos por vuelo como los publica la aerolínea (pocos por tarifa)
+HORAS_COMERCIALES = range(6, 23)
+ASIENTOS_COMERCIALES = (1, 9)
+HOLGURA_COMERCIAL = 1.5
+DESFASE_UTC = 4  # Santiago en abril (UTC-4); CommercialPlane guarda las horas en UTC
+
+
+def nombre_region(region):
+    return f"{PREFIJO.upper()} {region}"
+
+
+def generar_turno(trabajadores, semilla=1, turno_id=None):
+    # Filas de todas las tablas de un turno con "trabajadores" trabajadores, reproducibles por semilla
+    rnd = random.Random(semilla)
+    turno_id = turno_id or f"{PREFIJO}_{trabajadores}_{semilla}"
+    regiones = list(REGIONES)
+    pesos = [REGIONES[r][3] for r in regiones]
+
+    filas_trabajadores = []
+    demanda = {}
+    for i in range(trabajadores):
+        region = rnd.choices(regiones, pesos)[0]
+        comuna = rnd.choice(REGIONES[region][0])
+        destino = rnd.choice(list(DESTINOS))
+        subida = rnd.random() < 0.5
+        origen, llegada = ("SANTIAGO", destino) if subida else (destino, "SANTIAGO")
+        filas_trabajadores.append({
+            "id": f"{turno_id}_tt{i:05d}",
+            "trabajador_id": f"{turno_id}_w{i:05d}",
+            "rut": f"{turno_id}-{i}",
+            "subida": subida,
+            "origen": origen,
+            "destino": llegada,
+            "acercamiento": comuna,
+            "region": region,
+        })
+        demanda[(origen, llegada)] = demanda.get((origen, llegada), 0) + 1
+
+    # Charter: cubre COBERTURA_CHARTER de cada ruta, repartido entre los horarios del sentido
+    planes = []
+    for (origen, destino), cantidad in sorted(demanda.items()):
+        horas = HORAS_CHARTER_SUBIDA if origen == "SANTIAGO" else HORAS_CHARTER_BAJADA
+        vuelos = min(len(horas), max(1, math.ceil(cantidad * COBERTURA_CHARTER / CAPACIDAD_CHARTER)))
+        capacidad = max(1, math.ceil(cantidad * COBERTURA_CHARTER / vuelos))
+        for hora in horas[:vuelos]:
+            salida = FECHA_TURNO + timedelta(hours=hora)
+            planes.append({
+                "id": f"{turno_id}_pt{len(planes)}",
+                "plane_id": f"{turno_id}_p{len(planes)}",
+                "ciudad_origen": origen,
+                "ciudad_destino": destino,
+                "capacidad": capacidad,
+                "horario_salida": salida,
+                "horario_llegada": salida + timedelta(minutes=DURACION_VUELO_MINUTOS),
+            })
+
+    # Comerciales: asientos para HOLGURA_COMERCIAL veces lo que no cubren los charter, en vuelos
+    # a lo largo del día (la mitad queda fuera del margen de desfase y el filtro los descarta)
+    iata = {"SANTIAGO": "SCL", **DESTINOS}
+    comerciales = []
+    for (origen, destino), cantidad in sorted(demanda.items()):
+        asientos_objetivo = math.ceil(cantidad * (1 - COBERTURA_CHARTER) * HOLGURA_COMERCIAL) + 1
+        asientos = 0
+        while asientos < asientos_objetivo:
+            hora = rnd.choice(HORAS_COMERCIALES)
+            salida = FECHA_TURNO + timedelta(hours=hora + DESFASE_UTC, minutes=rnd.choice([0, 15, 30, 45]))
+            cupos = rnd.randint(*ASIENTOS_COMERCIALES)
+            asientos += cupos
+            comerciales.append({
+                "id": len(comerciales) + 1,
+                "airline": rnd.choice(["Latam Airlines", "Sky Airline"]),
+                "flightCode": f"B{trabajadores}-{len(comerciales)}",
+                "origin": iata[origen],
+                "destination": iata[destino],
+                "departureTime": salida,
+                "arrivalTime": salida + timedelta(minutes=DURACION_VUELO_MINUTOS),
+                "priceClp": rnd.randint(40, 250) * 1000,
+                "seatsAvailable": cupos,
+            })
+
+    return {
+        "turno_id": turno_id,
+        "fecha": FECHA_TURNO,
+        "regiones": [
+            {"name": nombre_region(r), "comunas": comunas, "tiempo_promedio_bus": tiempo}
+            for r, (comunas, tiempo, _, _) in REGIONES.items()
+        ],
+        "capacidades": [(nombre_region(r), c) for r, (_, _, menu, _) in REGIONES.items() for c in menu],
+        "trabajadores": filas_trabajadores,
+        "planes": planes,
+        "comerciales": comerciales,
+    }
+
+
+def parametros_por_defecto(turno, max_tiempo_ejecucion):
+    # Misma forma que CONSULTA_PARAMETROS, con los valores por defecto de ParametrosModeloTurno
+    return (turno["fecha"], 180, 20, 480, 150, max_tiempo_ejecucion, TIEMPO_ADICIONAL_PARADA,
+            "COMBINACIONES", False, 0, 0.0, 0.0, 1, 2, False)
+
+
+def datos_en_memoria(turno, max_tiempo_ejecucion=120):
+    # Reemplazo en proceso de cargar_datos_turno: mismas claves y columnas, sin base de datos
+    # Como en la consulta, trabajador_id es el id de TrabajadorTurno
+    df_trabajadores = pd.DataFrame(turno["trabajadores"]).drop(columns="trabajador_id").rename(columns={"id": "trabajador_id"})
+    df_planes = pd.DataFrame(turno["planes"]).rename(columns={"id": "plane_turno_id"})
+    df_comerciales = pd.DataFrame(turno["comerciales"])
+    return {
+        "trabajadores": df_trabajadores[["trabajador_id", "subida", "origen", "destino", "acercamiento", "region"]],
+        "trabajadores_con_avion": pd.DataFrame(
+            columns=["trabajador_id", "subida", "origen", "destino", "acercamiento", "region", "rut"]
+        ),
+        "buses": pd.DataFrame(columns=["id", "capacidad", "region", "comunas_origen", "comunas_destino"]),
+        "planes": df_planes[["plane_turno_id", "horario_salida", "horario_llegada", "ciudad_origen",
+                             "ciudad_destino", "capacidad"]],
+        "capacidad_usada_aviones": pd.DataFrame(columns=["planeTurnoId", "capacidad_usada"]),
+        "commercial_planes": df_comerciales[["id", "origin", "destination", "departureTime", "arrivalTime",
+                                             "priceClp", "seatsAvailable"]],
+        "capacidades": pd.DataFrame(turno["capacidades"], columns=["region", "capacidad"]),
+        "regiones": pd.DataFrame(
+            [(r["name"].lower().replace(" ", "_"), r["name"], r["comunas"], r["comunas"], r["tiempo_promedio_bus"])
+             for r in turno["regiones"]],
+            columns=COLUMNAS_REGION,
+        ),
+        "fecha_turno": turno["fecha"],
+        "tiempo_adicional_parada": TIEMPO_ADICIONAL_PARADA,
+        "parametros": parametros_por_defecto(turno, max_tiempo_ejecucion),
+        "plan_anterior": None,
+    }
+
+
+def eliminar_turno(conn, turno_id):
+    # Turno sintético y sus filas (las tablas del turno se borran en cascada)
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM "Turno" WHERE id = %s', (turno_id,))
+    cursor.execute('DELETE FROM "Trabajador" WHERE id LIKE %s', (f"{turno_id}\\_w%",))
+    cursor.execute('DELETE FROM "Plane" WHERE id LIKE %s', (f"{turno_id}\\_p%",))
+    conn.commit()
+    cursor.close()
+
+
+def insertar_turno(conn, turno, max_tiempo_ejecucion=120):
+    # Escribe el turno en la base (reemplazando uno anterior con el mismo id). Las regiones
+    # sintéticas, el usuario, el proyecto y el tipo de turno se crean una vez y se comparten.
+    turno_id = turno["turno_id"]
+    eliminar_turno(conn, turno_id)
+    ahora = datetime.now()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        INSERT INTO "User" (id, name, email, password) VALUES (%s, %s, %s, %s)
+        ON CONFLICT DO NOTHING
+    ''', (PREFIJO, "Benchmark", f"{PREFIJO}@localhost", "-"))
+    cursor.execute('INSERT INTO "Project" (id, name, "updatedAt") VALUES (%s, %s, %s) ON CONFLICT DO NOTHING',
+                   (PREFIJO, "Benchmark", ahora))
+    cursor.execute('INSERT INTO "ShiftType" (id, name, "updatedAt") VALUES (%s, %s, %s) ON CONFLICT DO NOTHING',
+                   (PREFIJO, "Benchmark", ahora))
+    execute_values(cursor, '''
+        INSERT INTO "Region" (id, name, comunas_acercamiento_subida, comunas_acercamiento_bajada,
+                              tiempo_promedio_bus, "updatedAt")
+        VALUES %s ON CONFLICT (name) DO NOTHING
+    ''', [(r["name"].lower().replace(" ", "_"), r["name"], r["comunas"], r["comunas"], r["tiempo_promedio_bus"], ahora)
+          for r in turno["regiones"]])
+
+    cursor.execute('''
+        INSERT INTO "Turno" (id, nombre, "proyectoId", "tipoTurnoId", fecha, "modeloEjecutado", "creadoPorId")
+        VALUES (%s, %s, %s, %s, %s, false, %s)
+    ''', (turno_id, f"Benchmark {len(turno['trabajadores'])}", PREFIJO, PREFIJO, turno["fecha"], PREFIJO))
+    cursor.execute('''
+        INSERT INTO "ParametrosModeloTurno" (id, "turnoId", max_tiempo_ejecucion) VALUES (%s, %s, %s)
+    ''', (turno_id, turno_id, max_tiempo_ejecucion))
+    execute_values(cursor, '''
+        INSERT INTO "CapacidadTurno" (id, "turnoId", "regionId", capacidad)
+        SELECT v.id, v.turno, r.id, v.capacidad
+        FROM (VALUES %s) AS v(id, turno, region, capacidad)
+        JOIN "Region" r ON r.name = v.region
+    ''', [(f"{turno_id}_ct_{r}_{c}".replace(" ", "_"), turno_id, r, c) for r, c in turno["capacidades"]])
+
+    execute_values(cursor, 'INSERT INTO "Trabajador" (id, rut, "nombreCompleto") VALUES %s',
+                   [(t["trabajador_id"], t["rut"], f"Trabajador {t['trabajador_id']}") for t in turno["trabajadores"]])
+    execute_values(cursor, '''
+        INSERT INTO "TrabajadorTurno" (id, "trabajadorId", "turnoId", acercamiento, origen, destino, region, subida)
+        VALUES %s
+    ''', [(t["id"], t["trabajador_id"], turno_id, t["acercamiento"], t["origen"], t["destino"], t["region"], t["subida"])
+          for t in turno["trabajadores"]])
+
+    execute_values(cursor, '''
+        INSERT INTO "Plane" (id, capacidad, ciudad_origen, ciudad_destino, horario_salida, horario_llegada)
+        VALUES %s
+    ''', [(p["plane_id"], p["capacidad"], p["ciudad_origen"], p["ciudad_destino"],
+           p["horario_salida"].strftime("%H:%M"), p["horario_llegada"].strftime("%H:%M")) for p in turno["planes"]])
+    execute_values(cursor, '''
+        INSERT INTO "PlaneTurno" (id, "planeId", "turnoId", capacidad, horario_salida, horario_llegada) VALUES %s
+    ''', [(p["id"], p["plane_id"], turno_id, p["capacidad"], p["horario_salida"], p["horario_llegada"])
+          for p in turno["planes"]])
+
+    # Los id de CommercialPlane los asigna la base
+    execute_values(cursor, '''
+        INSERT INTO "CommercialPlane" (airline, "flightCode", origin, destination, "departureDate", "departureTime",
+                                       "arrivalTime", "durationMinutes", "priceClp", direct, stops, "seatsAvailable",
+                                       "turnoId")
+        VALUES %s
+    ''', [(c["airline"], c["flightCode"], c["origin"], c["destination"], turno["fecha"], c["departureTime"],
+           c["arrivalTime"], DURACION_VUELO_MINUTOS, c["priceClp"], True, 0, c["seatsAvailable"], turno_id)
+          for c in turno["comerciales"]])
+
+    conn.commit()
+    cursor.close()
+    return turno_id
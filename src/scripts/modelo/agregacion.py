@@ -0,0 +1,28 @@
+def agrupar_trabajadores_identicos(trabajadores, firma_trabajador):
+    # Dos trabajadores son indistinguibles para el modelo si tienen la misma firma
+    # (buses y vuelos compatibles, sentido del viaje y uso de bus/avión).
+    # Cada clase se identifica por su menor id, y sus miembros quedan ordenados,
+    # así la desagregación posterior es determinista.
+    clases = {}
+    for t in trabajadores:
+        clases.setdefault(firma_trabajador(t), []).append(t)
+
+    resultado = {}
+    for miembros in clases.values():
+        miembros = sorted(miembros)
+        resultado[miembros[0]] = miembros
+    return resultado
+
+
+def desagregar_clase(miembros, cantidades):
+    # Reparte los miembros (ya ordenados) según las cantidades de la solución agregada.
+    # "cantidades" es una lista de (destino, cantidad) en orden determinista.
+    asignacion = {}
+    siguiente = 0
+    for destino, cantidad in cantidades:
+        for t in miembros[siguiente:siguiente + cantidad]:
+            asignacion[t] = destino
+        siguiente += cantidad
+    if siguiente > len(miembros):
+        raise ValueError(f"La solución asigna {siguiente} trabajadores a una clase de {len(miembros)}")
+    return asignacion
@@ -0,0 +1,218 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from scripts.modelo.incremental import cargar_plan_anterior
+
+# Valor por defecto de ParametrosModeloTurno.tiempo_adicional_parada
+TIEMPO_ADICIONAL_PARADA = 30
+
+# Solo las columnas que usan crear_buses.py y resolver_modelo.py
+COLUMNAS_REGION = ["id", "name", "comunas_acercamiento_subida", "comunas_acercamiento_bajada", "tiempo_promedio_bus"]
+
+CONSULTAS_RESOLVER = {
+    "trabajadores": '''
+        SELECT TT.id AS trabajador_id, TT.subida, TT.origen, TT.destino, TT.acercamiento, TT.region
+        FROM "TrabajadorTurno" TT
+        WHERE TT."turnoId" = %(turno_id)s
+    ''',
+    "trabajadores_con_avion": '''
+        SELECT TT.id AS trabajador_id, TT.subida, TT.origen, TT.destino, TT.acercamiento, TT.region, T.rut
+        FROM "AssignmentPlane" AP
+        JOIN "TrabajadorTurno" TT ON AP."trabajadorTurnoId" = TT.id
+        JOIN "Trabajador" T ON TT."trabajadorId" = T.id
+        WHERE TT."turnoId" = %(turno_id)s
+    ''',
+    "buses": '''
+        SELECT id, capacidad, region, comunas_origen, comunas_destino
+        FROM "BusTurno"
+        WHERE "turnoId" = %(turno_id)s
+    ''',
+    "planes": '''
+        SELECT
+            PT.id AS plane_turno_id,
+            PT."horario_salida",
+            PT."horario_llegada",
+            P."ciudad_origen",
+            P."ciudad_destino",
+            PT."capacidad"
+        FROM "PlaneTurno" PT
+        JOIN "Plane" P ON PT."planeId" = P."id"
+        WHERE PT."turnoId" = %(turno_id)s
+    ''',
+    "capacidad_usada_aviones": '''
+        SELECT
+            AP."planeTurnoId",
+            COUNT(*) AS capacidad_usada
+        FROM "AssignmentPlane" AP
+        JOIN "TrabajadorTurno" TT ON AP."trabajadorTurnoId" = TT.id
+        WHERE TT."turnoId" = %(turno_id)s
+        GROUP BY AP."planeTurnoId"
+    ''',
+    "commercial_planes": '''
+        SELECT
+          "id",
+          "origin",
+          "destination",
+          "departureTime",
+          "arrivalTime",
+          "priceClp",
+          "seatsAvailable"
+        FROM "CommercialPlane"
+        WHERE "turnoId" = %(turno_id)s
+        ORDER BY "departureTime" ASC
+    ''',
+}
+
+CONSULTA_CAPACIDADES = '''
+    SELECT r.name AS region, ct.capacidad
+    FROM "CapacidadTurno" ct
+    JOIN "Region" r ON ct."regionId" = r.id
+    WHERE ct."turnoId" = %(turno_id)s
+'''
+
+CONSULTA_FECHA_TURNO = '''
+    SELECT t."fecha", p."tiempo_adicional_parada"
+    FROM "Turno" t
+    LEFT JOIN "ParametrosModeloTurno" p ON p."turnoId" = t."id"
+    WHERE t."id" = %(turno_id)s
+'''
+
+CONSULTA_PARAMETROS = '''
+    SELECT  t."fecha",
+            p."espera_conexion_subida",
+            p."espera_conexion_bajada",
+            p."max_espera_permitida",
+            p."margen_desfase",
+            p."max_tiempo_ejecucion",
+            p."tiempo_adicional_parada",
+            p."formulacion_espera",
+            p."agrupar_trabajadores",
+            p."hilos_busqueda",
+            p."gap_relativo",
+            p."gap_absoluto",
+            p."semilla",
+            p."nivel_presolve",
+            p."dos_fases"
+    FROM    "Turno"                AS t
+    JOIN    "ParametrosModeloTurno" AS p
+           ON p."turnoId" = t."id"
+    WHERE   t."id" = %(turno_id)s
+'''
+
+CONSULTAS_CREAR_BUSES = {
+    "trabajadores": '''
+        SELECT TT.subida, TT.acercamiento
+        FROM "TrabajadorTurno" TT
+        WHERE TT."turnoId" = %(turno_id)s
+    ''',
+    "capacidades": CONSULTA_CAPACIDADES,
+}
+
+
+def consultar(cursor, sql, parametros=None):
+    cursor.execute(sql, parametros)
+    columnas = [c.name for c in cursor.description]
+    return pd.DataFrame.from_records(cursor.fetchall(), columns=columnas)
+
+
+def iniciar_lectura(conn):
+    # Todas las consultas de la carga ven la misma foto de la base (una sola transacción de
+    # solo lectura). Si la conexión del pool quedó con una transacción abierta (por ejemplo,
+    # por el ping de SQLAlchemy) se cierra antes: la carga siempre es lo primero que se hace.
+    if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+        conn.rollback()
+    cursor = conn.cursor()
+    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+    return cursor
+
+
+# -------------------------
+# Cache de la tabla Region
+# -------------------------
+# Region casi no cambia: se guarda en memoria (útil en el servicio de optimización) y en un
+# JSON local, y solo se vuelve a leer si cambió su versión (último updatedAt y cantidad de filas).
+_cache_regiones = {}
+
+
+def ruta_cache_regiones():
+    directorio = Path(os.getenv("MPM_CACHE_DIR", Path(tempfile.gettempdir()) / "mpm_cache"))
+    return directorio / "regiones.json"
+
+
+def cargar_regiones(cursor):
+    cursor.execute('SELECT MAX("updatedAt"), COUNT(*) FROM "Region"')
+    ultima, cantidad = cursor.fetchone()
+    version = f"{ultima.isoformat() if ultima else ''}|{cantidad}"
+
+    if _cache_regiones.get("version") == version:
+        return _cache_regiones["df"]
+
+    ruta = ruta_cache_regiones()
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            guardado = json.load(f)
+        if guardado["version"] == version:
+            df = pd.DataFrame(guardado["filas"], columns=COLUMNAS_REGION)
+            _cache_regiones.update(version=version, df=df)
+            return df
+    except (OSError, ValueError, KeyError):
+        pass
+
+    df = consultar(cursor, f'SELECT {", ".join(COLUMNAS_REGION)} FROM "Region"')
+    _cache_regiones.update(version=version, df=df)
+    try:
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "filas": df.values.tolist()}, f, ensure_ascii=False)
+    except OSError:
+        pass
+    return df
+
+
+def cargar_fecha_turno(cursor, parametros):
+    # Fecha del turno y tiempo_adicional_parada (con su valor por defecto si el turno no tiene parámetros)
+    cursor.execute(CONSULTA_FECHA_TURNO, parametros)
+    fila = cursor.fetchone()
+    if not fila:
+        return None, TIEMPO_ADICIONAL_PARADA
+    return fila[0], fila[1] if fila[1] is not None else TIEMPO_ADICIONAL_PARADA
+
+
+def cargar_datos_turno(conn, turno_id, con_plan_anterior=False):
+    # Todo lo que necesitan la creación de buses y el resolver, en una sola transacción y con
+    # parámetros enlazados. "parametros" es None si el turno no tiene ParametrosModeloTurno.
+    cursor = iniciar_lectura(conn)
+    try:
+        parametros = {"turno_id": turno_id}
+        datos = {nombre: consultar(cursor, sql, parametros) for nombre, sql in CONSULTAS_RESOLVER.items()}
+        datos["capacidades"] = consultar(cursor, CONSULTA_CAPACIDADES, parametros)
+        datos["regiones"] = cargar_regiones(cursor)
+        datos["fecha_turno"], datos["tiempo_adicional_parada"] = cargar_fecha_turno(cursor, parametros)
+        cursor.execute(CONSULTA_PARAMETROS, parametros)
+        datos["parametros"] = cursor.fetchone()
+        datos["plan_anterior"] = None
+        if con_plan_anterior and datos["parametros"]:
+            datos["plan_anterior"] = cargar_plan_anterior(cursor, turno_id, datos["parametros"][0])
+        conn.commit()
+    finally:
+        cursor.close()
+    return datos
+
+
+def cargar_datos_crear_buses(conn, turno_id):
+    # Solo lo que usa la creación de buses (crear_buses.py sin el resto del pipeline)
+    cursor = iniciar_lectura(conn)
+    try:
+        parametros = {"turno_id": turno_id}
+        datos = {nombre: consultar(cursor, sql, parametros) for nombre, sql in CONSULTAS_CREAR_BUSES.items()}
+        datos["regiones"] = cargar_regiones(cursor)
+        datos["fecha_turno"], datos["tiempo_adicional_parada"] = cargar_fecha_turno(cursor, parametros)
+        conn.commit()
+    finally:
+        cursor.close()
+    return datos
@@ -0,0 +1,23 @@
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+# Un engine (con su pool de conexiones) por URL y por proceso. Cuando los scripts corren
+# dentro del servicio de optimización este módulo queda cargado entre trabajos, así que las
+# conexiones se reutilizan en vez de abrirse en cada ejecución.
+_engines = {}
+
+
+def obtener_engine(db_url=None):
+    if db_url is None:
+        load_dotenv()
+        db_url = os.getenv("DATABASE_URL")
+    if db_url not in _engines:
+        _engines[db_url] = create_engine(db_url, pool_pre_ping=True)
+    return _engines[db_url]
+
+
+def obtener_conexion(db_url=None):
+    # Conexión psycopg2 del pool; close() la devuelve al pool en lugar de cerrarla
+    return obtener_engine(db_url).raw_connection()
@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ortools.sat.python import cp_model
+
+
+def componentes_conexas(trabajadores, trabajadores_comerciales, buses, vuelos, vuelos_comerciales,
+                        buses_trabajador, vuelos_trabajador):
+    # Union-find sobre el grafo trabajador–bus–vuelo: dos trabajadores quedan en la misma
+    # componente solo si comparten (directa o indirectamente) un bus o un vuelo compatible.
+    padre = {}
+
+    def raiz(nodo):
+        while padre[nodo] != nodo:
+            padre[nodo] = padre[padre[nodo]]
+            nodo = padre[nodo]
+        return nodo
+
+    def unir(a, b):
+        ra, rb = raiz(a), raiz(b)
+        if ra != rb:
+            padre[rb] = ra
+
+    for t in trabajadores:
+        padre[("t", t)] = ("t", t)
+    for tc in trabajadores_comerciales:
+        padre[("tc", tc)] = ("tc", tc)
+    for b in buses:
+        padre[("b", b)] = ("b", b)
+    for v in vuelos:
+        padre[("v", v)] = ("v", v)
+    for vc in vuelos_comerciales:
+        padre[("vc", vc)] = ("vc", vc)
+
+    for t in trabajadores:
+        for b in buses_trabajador[t]:
+            unir(("t", t), ("b", b))
+        for v in vuelos_trabajador[t]:
+            unir(("t", t), ("v", v))
+    for tc in trabajadores_comerciales:
+        for b in buses_trabajador[tc]:
+            unir(("tc", tc), ("b", b))
+        for vc in vuelos_trabajador[tc]:
+            unir(("tc", tc), ("vc", vc))
+
+    # Se mantiene el orden de entrada dentro de cada componente y entre componentes
+    componentes = {}
+    claves = {"t": "trabajadores", "tc": "trabajadores_comerciales", "b": "buses", "v": "vuelos", "vc": "vuelos_comerciales"}
+    for tipo, nodos in (("t", trabajadores), ("tc", trabajadores_comerciales), ("b", buses), ("v", vuelos), ("vc", vuelos_comerciales)):
+        for nodo in nodos:
+            r = raiz((tipo, nodo))
+            if r not in componentes:
+                componentes[r] = {clave: [] for clave in claves.values()}
+            componentes[r][claves[tipo]].append(nodo)
+
+    return list(componentes.values())
+
+
+def modelo_a_texto(model):
+    # CpModel no se puede serializar con pickle; el formato de texto del proto sí viaja entre procesos
+    return str(model.Proto())
+
+
+def modelo_desde_texto(texto):
+    model = cp_model.CpModel()
+    proto = model.Proto()
+    if hasattr(proto, "parse_text_format"):
+        proto.parse_text_format(texto)
+    else:
+        from google.protobuf import text_format
+        text_format.Parse(texto, proto)
+    return model
+
+
+def modelo_factibilidad(model):
+    # Copia del modelo sin función objetivo: el solver se detiene en la primera solución factible
+    copia = model.Clone()
+    copia.ClearObjective()
+    return copia
+
+
+def evaluar_objetivo(model, solucion):
+    # Valor de la función objetivo de "model" en una solución (lista de valores por índice de
+    # variable), por ejemplo una obtenida con modelo_factibilidad
+    objetivo = model.Proto().objective
+    total = objetivo.offset
+    for var, coef in zip(objetivo.vars, objetivo.coeffs):
+        total += coef * (solucion[var] if var >= 0 else -solucion[-var - 1])
+    return total * (objetivo.scaling_factor or 1.0)
+
+
+def configurar_solver(solver, max_tiempo, num_workers=0, parametros_solver=None):
+    # parametros_solver: gap_relativo, gap_absoluto, semilla y nivel_presolve de ParametrosModeloTurno
+    # (0 = sin presolve, 1 = presolve sin probing, 2 = presolve completo, el valor por defecto de CP-SAT)
+    parametros_solver = parametros_solver or {}
+    solver.parameters.max_time_in_seconds = max_tiempo
+    solver.parameters.num_workers = num_workers
+    if parametros_solver.get("gap_relativo"):
+        solver.parameters.relative_gap_limit = parametros_solver["gap_relativo"]
+    if parametros_solver.get("gap_absoluto"):
+        solver.parameters.absolute_gap_limit = parametros_solver["gap_absoluto"]
+    if parametros_solver.get("semilla") is not None:
+        solver.parameters.random_seed = parametros_solver["semilla"]
+    nivel_presolve = parametros_solver.get("nivel_presolve", 2)
+    if nivel_presolve <= 0:
+        solver.parameters.cp_model_presolve = False
+    elif nivel_presolve == 1:
+        solver.parameters.cp_model_probing_level = 0
+
+
+def resolver_modelo(model, max_tiempo, num_workers=0, parametros_solver=None):
+    solver = cp_model.CpSolver()
+    configurar_solver(solver, max_tiempo, num_workers, parametros_solver)
+    status = solver.Solve(model)
+    tiene_solucion = status in [cp_model.FEASIBLE, cp_model.OPTIMAL]
+    return {
+        "estado": status,
+        "objetivo": solver.ObjectiveValue() if tiene_solucion else None,
+        "cota": solver.BestObjectiveBound() if tiene_solucion else None,
+        "solucion": list(solver.ResponseProto().solution) if tiene_solucion else [],
+        "tiempo": solver.WallTime(),
+    }
+
+
+def resolver_modelo_serializado(texto_modelo, max_tiempo, num_workers, limite=None, parametros_solver=None):
+    # "limite" es el instante en que vence el presupuesto global; si la tarea esperó en cola
+    # se resuelve con el tiempo que quede (mínimo 1 segundo para encontrar algo factible)
+    # "cpu": segundos de CPU del proceso que resolvió (no cuentan como hijos del proceso principal)
+    if limite is not None:
+        max_tiempo = max(1.0, min(max_tiempo, limite - time.time()))
+    inicio_cpu = time.process_time()
+    resultado = resolver_modelo(modelo_desde_texto(texto_modelo), max_tiempo, num_workers, parametros_solver)
+    resultado["cpu"] = time.process_time() - inicio_cpu
+    return resultado
+
+
+def contexto_procesos():
+    # Sin "fork": el servicio de optimización tiene hilos (servidor HTTP, cola, pool de conexiones)
+    # y un fork puede heredar un lock tomado por otro hilo. Los subproblemas viajan como texto;
+    # con "forkserver" cada proceso parte de un servidor limpio que ya importó este módulo.
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    contexto = multiprocessing.get_context("forkserver")
+    contexto.set_forkserver_preload([__name__])
+    return contexto
+
+
+def resolver_en_paralelo(modelos, max_tiempo, procesos=None, num_workers_total=0, parametros_solver=None):
+    # Cada subproblema se resuelve en su propio proceso; los núcleos (o los workers pedidos en
+    # num_workers_total) se reparten entre ellos.
+    procesos = procesos or min(len(modelos), num_workers_total or os.cpu_count() or 1)
+    num_workers = max(1, (num_workers_total or os.cpu_count() or 1) // procesos)
+    textos = [modelo_a_texto(m) for m in modelos]
+    tamanos = [len(m.Proto().variables) + len(m.Proto().constraints) for m in modelos]
+    tamano_total = sum(tamanos) or 1
+
+    # Si hay más subproblemas que procesos, el tiempo se reparte según el tamaño de cada uno
+    # para que el turno completo no exceda max_tiempo; los más grandes entran primero al pool.
+    orden = sorted(range(len(modelos)), key=lambda i: tamanos[i], reverse=True)
+    limite = time.time() + max_tiempo
+
+    contexto = contexto_procesos()
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+        futuros = {}
+        for i in orden:
+            presupuesto = max_tiempo if len(modelos) <= procesos else min(max_tiempo, max_tiempo * procesos * tamanos[i] / tamano_total)
+            futuros[i] = pool.submit(resolver_modelo_serializado, textos[i], presupuesto, num_workers, limite, parametros_solver)
+        return [futuros[i].result() for i in range(len(modelos))]
@@ -0,0 +1,67 @@
+# -------------------------
+# Poda por dominancia de vuelos comerciales
+# -------------------------
+# En el modelo, un vuelo comercial solo importa por su hora (salida si sale de Santiago, llegada
+# si llega a Santiago), su capacidad y su precio. El vuelo A domina al B de la misma ruta si:
+#   - A no es más caro que B, y
+#   - cualquier trabajador de B puede pasar a A sin esperar más ni romper la conexión: misma
+#     hora, o A es más temprano (subida) / más tarde (bajada) y su conexión no restringe ningún
+#     horario posible de bus (HB está acotado a [hb_min, hb_max]).
+# B se descarta solo si los vuelos que lo dominan ya suman asientos para toda la demanda de la
+# ruta: así, en cualquier solución, los pasajeros de B caben en vuelos mejores y el óptimo no empeora.
+
+
+def domina(a, b, subida, hb_min, hb_max, espera_conexion_subida, espera_conexion_bajada):
+    # a y b: (id, minuto_salida, minuto_llegada, precio, asientos)
+    if a[3] > b[3]:
+        return False
+    if subida:
+        hora_a, hora_b = a[1], b[1]
+        holgado = hora_a - espera_conexion_subida >= hb_max
+        mejor_hora = hora_a <= hora_b
+    else:
+        hora_a, hora_b = a[2], b[2]
+        holgado = hora_a + espera_conexion_bajada <= hb_min
+        mejor_hora = hora_a >= hora_b
+    if hora_a != hora_b and not (mejor_hora and holgado):
+        return False
+    # Vuelos idénticos en hora y precio: domina el de más asientos (y, si empatan, el de menor id)
+    if hora_a == hora_b and a[3] == b[3]:
+        return (a[4], str(b[0])) > (b[4], str(a[0]))
+    return True
+
+
+def podar_vuelos_dominados(df_vuelos, demanda_por_ruta, hb_min, hb_max, espera_conexion_subida,
+                           espera_conexion_bajada, protegidos=()):
+    # df_vuelos: vuelos comerciales con minuto_salida/minuto_llegada ya calculados. Devuelve los
+    # ids a descartar y, por ruta, cuántos había y cuántos se descartaron. protegidos: ids que no
+    # se descartan (por ejemplo, los del plan anterior en modo incremental).
+    descartados = set()
+    por_ruta = {}
+    protegidos = set(protegidos)
+
+    columnas = ["id", "minuto_salida", "minuto_llegada", "priceClp", "seatsAvailable"]
+    for (origen, destino), grupo in df_vuelos.groupby(["origin", "destination"], sort=False):
+        if origen != "SANTIAGO" and destino != "SANTIAGO":
+            continue
+        subida = origen == "SANTIAGO"
+        demanda = demanda_por_ruta.get((origen, destino), 0)
+        candidatos = list(grupo[columnas].itertuples(index=False, name=None))
+        candidatos = [(i, s, l, p if p == p else float("inf"), a) for i, s, l, p, a in candidatos]
+
+        descartados_ruta = []
+        for b in candidatos:
+            if b[0] in protegidos:
+                continue
+            asientos_dominantes = sum(
+                a[4] for a in candidatos
+                if a is not b and a[0] not in descartados
+                and domina(a, b, subida, hb_min, hb_max, espera_conexion_subida, espera_conexion_bajada)
+            )
+            if asientos_dominantes >= demanda:
+                descartados.add(b[0])
+                descartados_ruta.append(b[0])
+
+        por_ruta[(origen, destino)] = {"candidatos": len(candidatos), "descartados": len(descartados_ruta),
+                                       "demanda": demanda}
+    return descartados, por_ruta
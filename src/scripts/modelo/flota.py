@@ -0,0 +1,123 @@
+import math
+import time
+
+from ortools.sat.python import cp_model
+
+from scripts.modelo.descomposicion import configurar_solver
+
+MAX_PARADAS = 2
+TIEMPO_MAXIMO_FLOTA = 5.0
+
+
+def solucion_trivial(remanentes, capacidad_maxima):
+    # Cada comuna en sus propios buses de la mayor capacidad (siempre factible: una parada por bus)
+    buses = []
+    for comuna, cantidad in remanentes.items():
+        while cantidad > 0:
+            a_subir = min(cantidad, capacidad_maxima)
+            buses.append({"capacidad": capacidad_maxima, "comunas": {comuna: a_subir}})
+            cantidad -= a_subir
+    return buses
+
+
+def dimensionar_flota(demanda, capacidades, max_paradas=MAX_PARADAS, max_tiempo=TIEMPO_MAXIMO_FLOTA, distancia=None):
+    # Bin packing de una región y sentido: elige cuántos buses abrir y de qué capacidad (del menú
+    # de CapacidadTurno de la región) para llevar a todos los trabajadores de "demanda"
+    # ({comuna: cantidad}), con a lo más max_paradas comunas por bus. Primero minimiza la
+    # cantidad de buses, luego los asientos totales (es decir, los asientos vacíos) y, si se
+    # entrega distancia(c1, c2) en km, la suma de distancias entre comunas de un mismo bus.
+    # Devuelve (buses, stats); cada bus es {"capacidad", "comunas": {comuna: pasajeros}}.
+    inicio = time.time()
+    tamanos = sorted(set(capacidades), reverse=True)
+    capacidad_maxima = tamanos[0]
+
+    # Los buses llenos de la mayor capacidad con una sola comuna no se pueden mejorar; solo se
+    # deja al modelo el remanente de cada comuna (menos de dos buses grandes)
+    buses = []
+    remanentes = {}
+    for comuna, cantidad in demanda.items():
+        while cantidad >= 2 * capacidad_maxima:
+            buses.append({"capacidad": capacidad_maxima, "comunas": {comuna: capacidad_maxima}})
+            cantidad -= capacidad_maxima
+        if cantidad > 0:
+            remanentes[comuna] = cantidad
+
+    optimo = True
+    if remanentes:
+        trivial = solucion_trivial(remanentes, capacidad_maxima)
+        comunas = list(remanentes)
+        indices = range(len(trivial))
+
+        model = cp_model.CpModel()
+        usa = {b: model.NewBoolVar(f"usa_{b}") for b in indices}
+        tam = {(b, k): model.NewBoolVar(f"tam_{b}_{k}") for b in indices for k in tamanos}
+        x = {(b, c): model.NewIntVar(0, min(remanentes[c], capacidad_maxima), f"x_{b}_{c}")
+             for b in indices for c in comunas}
+        para = {(b, c): model.NewBoolVar(f"para_{b}_{c}") for b in indices for c in comunas}
+
+        for b in indices:
+            model.Add(sum(tam[b, k] for k in tamanos) == usa[b])
+            model.Add(sum(x[b, c] for c in comunas) <= sum(k * tam[b, k] for k in tamanos))
+            model.Add(sum(para[b, c] for c in comunas) <= max_paradas * usa[b])
+            for c in comunas:
+                model.Add(x[b, c] <= min(remanentes[c], capacidad_maxima) * para[b, c])
+                model.Add(x[b, c] >= para[b, c])
+            # Ruptura de simetría: los buses usados van primero
+            if b > 0:
+                model.Add(usa[b] <= usa[b - 1])
+        for c in comunas:
+            model.Add(sum(x[b, c] for b in indices) == remanentes[c])
+
+        # Cotas inferiores redundantes que ayudan a probar optimalidad
+        total = sum(remanentes.values())
+        model.Add(sum(usa.values()) >= max(math.ceil(total / capacidad_maxima), math.ceil(len(comunas) / max_paradas)))
+
+        dispersion = 0
+        peso_asiento = 1
+        if distancia is not None and max_paradas > 1:
+            pares = {(c1, c2): round(distancia(c1, c2)) for i, c1 in enumerate(comunas) for c2 in comunas[i + 1:]}
+            for b in indices:
+                for (c1, c2), km in pares.items():
+                    if km > 0:
+                        juntas = model.NewBoolVar(f"juntas_{b}_{c1}_{c2}")
+                        model.Add(juntas >= para[b, c1] + para[b, c2] - 1)
+                        dispersion += km * juntas
+            peso_asiento = len(trivial) * sum(pares.values()) + 1
+
+        asientos = sum(k * tam[b, k] for b in indices for k in tamanos)
+        peso_bus = (len(trivial) * capacidad_maxima + 1) * peso_asiento
+        model.Minimize(peso_bus * sum(usa.values()) + peso_asiento * asientos + dispersion)
+
+        for b, bus in enumerate(trivial):
+            model.AddHint(usa[b], 1)
+            for k in tamanos:
+                model.AddHint(tam[b, k], int(k == bus["capacidad"]))
+            for c in comunas:
+                model.AddHint(x[b, c], bus["comunas"].get(c, 0))
+                model.AddHint(para[b, c], int(c in bus["comunas"]))
+
+        solver = cp_model.CpSolver()
+        configurar_solver(solver, max_tiempo)
+        estado = solver.Solve(model)
+        optimo = estado == cp_model.OPTIMAL
+
+        if estado in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            for b in indices:
+                if not solver.Value(usa[b]):
+                    continue
+                buses.append({
+                    "capacidad": next(k for k in tamanos if solver.Value(tam[b, k])),
+                    "comunas": {c: solver.Value(x[b, c]) for c in comunas if solver.Value(para[b, c])},
+                })
+        else:
+            buses.extend(trivial)
+
+    asientos_totales = sum(bus["capacidad"] for bus in buses)
+    stats = {
+        "buses": len(buses),
+        "asientos": asientos_totales,
+        "asientos_vacios": asientos_totales - sum(demanda.values()),
+        "tiempo": time.time() - inicio,
+        "optimo": optimo,
+    }
+    return buses, stats
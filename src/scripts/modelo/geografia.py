@@ -0,0 +1,103 @@
+import csv
+import math
+import os
+from itertools import permutations
+from pathlib import Path
+
+from scripts.modelo.preprocesamiento import normalizar
+
+# Tabla local de coordenadas por comuna (nombres normalizados); se puede reemplazar con MPM_COMUNAS_CSV
+RUTA_COMUNAS = Path(__file__).resolve().with_name("comunas.csv")
+PUNTO_TERMINAL = "AEROPUERTO SANTIAGO"
+
+# Tiempo de viaje estimado: distancia en línea recta por un factor de ruta a velocidad media de bus
+FACTOR_RUTA = 1.3
+VELOCIDAD_KMH = 70
+DIAMETRO_MAXIMO_KM = 50
+MAX_PARADAS_EXACTO = 6
+
+_coordenadas = {}
+
+
+def cargar_coordenadas(ruta=None):
+    ruta = Path(ruta or os.getenv("MPM_COMUNAS_CSV", RUTA_COMUNAS))
+    if ruta not in _coordenadas:
+        with open(ruta, encoding="utf-8") as f:
+            _coordenadas[ruta] = {
+                normalizar(fila["comuna"]): (float(fila["latitud"]), float(fila["longitud"]))
+                for fila in csv.DictReader(f)
+            }
+    return _coordenadas[ruta]
+
+
+def distancia_km(a, b, coordenadas):
+    # Haversine entre dos comunas de la tabla
+    (lat1, lon1), (lat2, lon2) = coordenadas[normalizar(a)], coordenadas[normalizar(b)]
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    h = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(h))
+
+
+def minutos_viaje(a, b, coordenadas):
+    return distancia_km(a, b, coordenadas) * FACTOR_RUTA / VELOCIDAD_KMH * 60
+
+
+def tiene_coordenadas(comunas, coordenadas):
+    return all(normalizar(c) in coordenadas for c in comunas)
+
+
+def ordenar_paradas(comunas, coordenadas):
+    # Orden de recogida que termina en el aeropuerto con el menor tiempo de viaje; para pocas
+    # paradas se prueban todas las permutaciones, si no se usa el vecino más cercano hacia atrás
+    # desde el aeropuerto. Devuelve (orden, minutos de viaje).
+    def tiempo(orden):
+        tramos = list(orden) + [PUNTO_TERMINAL]
+        return sum(minutos_viaje(a, b, coordenadas) for a, b in zip(tramos, tramos[1:]))
+
+    if len(comunas) <= MAX_PARADAS_EXACTO:
+        orden = min(permutations(comunas), key=tiempo)
+    else:
+        pendientes = list(comunas)
+        orden = []
+        actual = PUNTO_TERMINAL
+        while pendientes:
+            siguiente = min(pendientes, key=lambda c: minutos_viaje(actual, c, coordenadas))
+            pendientes.remove(siguiente)
+            orden.insert(0, siguiente)
+            actual = siguiente
+    return list(orden), tiempo(orden)
+
+
+def agrupar_por_cercania(comunas, coordenadas, diametro_km=DIAMETRO_MAXIMO_KM):
+    # Clustering aglomerativo de enlace completo: se unen los grupos más cercanos mientras la
+    # distancia entre sus comunas más lejanas no supere diametro_km. Las comunas sin coordenadas
+    # quedan juntas en un grupo aparte (se agrupan como antes, sin considerar distancia).
+    sin_coordenadas = [c for c in comunas if normalizar(c) not in coordenadas]
+    grupos = [[c] for c in comunas if normalizar(c) in coordenadas]
+
+    def diametro(g1, g2):
+        return max(distancia_km(a, b, coordenadas) for a in g1 for b in g2)
+
+    while len(grupos) > 1:
+        distancia, i, j = min(
+            (diametro(grupos[i], grupos[j]), i, j)
+            for i in range(len(grupos)) for j in range(i + 1, len(grupos))
+        )
+        if distancia > diametro_km:
+            break
+        grupos[i] = grupos[i] + grupos.pop(j)
+
+    if sin_coordenadas:
+        grupos.append(sin_coordenadas)
+    return grupos
+
+
+def duracion_bus(comunas, coordenadas, tiempo_parada, duracion_por_defecto=60):
+    # Minutos entre la primera parada y el aeropuerto (o al revés, en bajada). Si alguna comuna
+    # no está en la tabla se usa la duración promedio de la región, como antes.
+    extra = tiempo_parada * (len(comunas) - 1) if len(comunas) > 1 else 0
+    if comunas and tiene_coordenadas(comunas, coordenadas):
+        _, minutos = ordenar_paradas(comunas, coordenadas)
+        return round(minutos) + extra
+    return duracion_por_defecto + extra
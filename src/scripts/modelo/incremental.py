@@ -0,0 +1,78 @@
+from collections import Counter
+from datetime import datetime
+
+
+def cargar_plan_anterior(cursor, turno_id, fecha_turno):
+    # Asignaciones y horarios de buses ya guardados para el turno (resultado de la corrida anterior).
+    # Las asignaciones de avión hechas a mano (agregarAsignacionTurno) no son parte del plan:
+    # van aparte en "vuelo_manual" y la re-optimización no las mueve ni las borra.
+    plan = {}
+    for clave, tabla, columna, filtro in (
+        ("bus", "AssignmentBus", "busTurnoId", ""),
+        ("vuelo", "AssignmentPlane", "planeTurnoId", 'AND NOT A."manual"'),
+        ("vuelo_manual", "AssignmentPlane", "planeTurnoId", 'AND A."manual"'),
+        ("vuelo_comercial", "AssignmentCommercialPlane", "commercialPlaneId", ""),
+    ):
+        cursor.execute(f'''
+            SELECT A."trabajadorTurnoId", A."{columna}"
+            FROM "{tabla}" A
+            JOIN "TrabajadorTurno" TT ON A."trabajadorTurnoId" = TT.id
+            WHERE TT."turnoId" = %s {filtro}
+        ''', (turno_id,))
+        plan[clave] = dict(cursor.fetchall())
+
+    # Hora optimizada del bus en minutos desde la medianoche del turno: llegada para buses
+    # de subida y salida para los de bajada (lo mismo que guarda resolver_modelo.py)
+    medianoche = datetime.combine(fecha_turno.date(), datetime.min.time())
+    cursor.execute('''
+        SELECT id, "horario_salida", "horario_llegada"
+        FROM "BusTurno"
+        WHERE "turnoId" = %s
+    ''', (turno_id,))
+    plan["hora_bus"] = {}
+    for b, salida, llegada in cursor.fetchall():
+        horario = llegada if "subida" in b.lower() else salida
+        plan["hora_bus"][b] = int((horario - medianoche).total_seconds() // 60)
+    return plan
+
+
+def trabajadores_modificados(trabajadores, bus_anterior, vuelo_anterior, buses_trabajador, vuelos_trabajador,
+                             usa_bus, usa_avion, conexion_valida):
+    # Un trabajador se considera tocado por la edición si es nuevo, si su bus o vuelo anterior
+    # ya no es compatible (se eliminó o cambió de ruta) o si la conexión anterior dejó de
+    # cumplirse con los horarios actuales (por ejemplo, un PlaneTurno que cambió de hora).
+    modificados = set()
+    for t in trabajadores:
+        b = bus_anterior.get(t)
+        v = vuelo_anterior.get(t)
+        if usa_bus[t] == 1 and b not in buses_trabajador[t]:
+            modificados.add(t)
+        elif usa_bus[t] != 1 and b is not None:
+            modificados.add(t)
+        elif usa_avion[t] == 1 and v not in vuelos_trabajador[t]:
+            modificados.add(t)
+        elif usa_avion[t] != 1 and v is not None:
+            modificados.add(t)
+        elif b is not None and v is not None and not conexion_valida(t, b, v):
+            modificados.add(t)
+    return modificados
+
+
+def agregar_hints(model, variables, asignado):
+    # variables: {(t, destino): BoolVar}; se sugiere 1 solo para el destino anterior de t
+    for (t, destino), var in variables.items():
+        model.AddHint(var, int(asignado.get(t) == destino))
+
+
+def fijar_asignaciones(model, variables, asignado, fijos):
+    for (t, destino), var in variables.items():
+        if t in fijos and asignado.get(t) == destino:
+            model.Add(var == 1)
+
+
+def cantidades_clase(miembros, asignado, miembros_filtrados=None):
+    # Cuántos miembros de la clase tenían cada destino (opcionalmente solo entre miembros_filtrados)
+    return Counter(
+        asignado[t] for t in miembros
+        if t in asignado and (miembros_filtrados is None or t in miembros_filtrados)
+    )
@@ -0,0 +1,106 @@
+import json
+import os
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import psutil
+
+# Métricas por fase de una ejecución del optimizador. Una medición es un diccionario con una
+# lista de fases; cada fase registra tiempo de reloj, tiempo de CPU (del proceso y de sus hijos
+# directos), RSS al inicio y al final, y conteos propios de la fase (trabajadores, variables,
+# filas escritas, ...). Los subproblemas en paralelo corren en procesos del forkserver, fuera de
+# los hijos: su CPU se informa en el conteo cpu_subprocesos de la fase. Todas las funciones aceptan
+# medicion=None para que las etapas del pipeline se puedan usar sin medir.
+
+_proceso = psutil.Process(os.getpid())
+
+
+def _rss_mb():
+    return _proceso.memory_info().rss / (1024 * 1024)
+
+
+def _cpu_segundos():
+    tiempos = _proceso.cpu_times()
+    return tiempos.user + tiempos.system + tiempos.children_user + tiempos.children_system
+
+
+def nueva_medicion(turno_id):
+    rss = _rss_mb()
+    return {
+        "turnoId": turno_id,
+        "inicio": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "_reloj": time.perf_counter(),
+        "_cpu": _cpu_segundos(),
+        "rss_inicial_mb": rss,
+        "rss_max_mb": rss,
+        "fases": [],
+    }
+
+
+def iniciar_fase(medicion, nombre):
+    if medicion is None:
+        return None
+    return {
+        "nombre": nombre,
+        "_reloj": time.perf_counter(),
+        "_cpu": _cpu_segundos(),
+        "rss_inicio_mb": _rss_mb(),
+    }
+
+
+def cerrar_fase(medicion, fase, **conteos):
+    if medicion is None or fase is None:
+        return None
+    rss = _rss_mb()
+    fase["tiempo"] = time.perf_counter() - fase.pop("_reloj")
+    fase["cpu"] = _cpu_segundos() - fase.pop("_cpu")
+    fase["rss_fin_mb"] = rss
+    fase["rss_delta_mb"] = rss - fase["rss_inicio_mb"]
+    fase["conteos"] = conteos
+    medicion["rss_max_mb"] = max(medicion["rss_max_mb"], rss)
+    medicion["fases"].append(fase)
+    return fase
+
+
+def tiempos_por_fase(medicion):
+    return {fase["nombre"]: fase["tiempo"] for fase in medicion["fases"]}
+
+
+def resumen(medicion):
+    # Documento JSON de la ejecución (sin los contadores internos)
+    documento = {clave: valor for clave, valor in medicion.items() if not clave.startswith("_")}
+    documento["tiempo_total"] = time.perf_counter() - medicion["_reloj"]
+    documento["cpu_total"] = _cpu_segundos() - medicion["_cpu"]
+    documento["rss_final_mb"] = _rss_mb()
+    documento["rss_max_mb"] = max(medicion["rss_max_mb"], documento["rss_final_mb"])
+    if documento["fases"]:
+        documento["fase_dominante"] = max(documento["fases"], key=lambda f: f["tiempo"])["nombre"]
+    return documento
+
+
+def guardar_metricas(conn, documento, estado=None):
+    # Una fila por ejecución en MetricaEjecucionTurno (transacción propia: si falla, las
+    # asignaciones ya guardadas no se pierden)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO "MetricaEjecucionTurno" (
+                id, "turnoId", estado, tiempo_total, cpu_total, rss_max_mb, fase_dominante, fases
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ''', (
+            str(uuid4()),
+            documento["turnoId"],
+            estado,
+            documento["tiempo_total"],
+            documento["cpu_total"],
+            documento["rss_max_mb"],
+            documento.get("fase_dominante"),
+            json.dumps(documento["fases"]),
+        ))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
@@ -0,0 +1,93 @@
+import time
+from uuid import uuid4
+
+from psycopg2.extras import execute_values
+
+TAMANO_LOTE = 1000
+
+COLUMNAS_DESTINO = {
+    "AssignmentBus": "busTurnoId",
+    "AssignmentPlane": "planeTurnoId",
+    "AssignmentCommercialPlane": "commercialPlaneId",
+}
+
+
+def insertar_asignaciones(cursor, tabla, columna_destino, pares):
+    # pares: lista de (trabajadorTurnoId, id de destino); un solo INSERT multi-fila por lote
+    if not pares:
+        return 0
+    execute_values(
+        cursor,
+        f'INSERT INTO "{tabla}" (id, "trabajadorTurnoId", "{columna_destino}") VALUES %s',
+        [(str(uuid4()), t, destino) for t, destino in pares],
+        page_size=TAMANO_LOTE,
+    )
+    return len(pares)
+
+
+def eliminar_asignaciones(cursor, tabla, columna_destino, pares):
+    # Borra solo las filas (trabajadorTurnoId, destino) indicadas, en un único DELETE por lote
+    if not pares:
+        return 0
+    execute_values(
+        cursor,
+        f'''
+        DELETE FROM "{tabla}" AS a
+        USING  (VALUES %s) AS v(trabajador, destino)
+        WHERE  a."trabajadorTurnoId" = v.trabajador AND a."{columna_destino}" = v.destino
+        ''',
+        pares,
+        page_size=TAMANO_LOTE,
+    )
+    return len(pares)
+
+
+def actualizar_horarios_buses(cursor, horarios):
+    # horarios: lista de (busTurnoId, horario_salida, horario_llegada); un único UPDATE ... FROM (VALUES ...)
+    if not horarios:
+        return 0
+    execute_values(
+        cursor,
+        '''
+        UPDATE "BusTurno" AS bt
+        SET    "horario_salida" = v.horario_salida,
+               "horario_llegada" = v.horario_llegada
+        FROM   (VALUES %s) AS v(id, horario_salida, horario_llegada)
+        WHERE  bt.id = v.id
+        ''',
+        horarios,
+        template="(%s, %s::timestamp, %s::timestamp)",
+        page_size=TAMANO_LOTE,
+    )
+    return len(horarios)
+
+
+def guardar_resultados(conn, asignaciones_bus, asignaciones_avion, asignaciones_comerciales, horarios_buses,
+                       sentencias_previas=(), asignaciones_eliminadas=None):
+    # Escribe todos los resultados de un turno en una sola transacción: si algo falla no queda
+    # ninguna asignación a medias. "sentencias_previas" son (sql, parámetros) que deben quedar
+    # en la misma transacción (por ejemplo, los KPIs de ParametrosModeloTurno).
+    # "asignaciones_eliminadas" ({tabla: pares}) se borran antes de insertar (modo incremental).
+    inicio = time.time()
+    filas = {}
+    eliminadas = {}
+    cursor = conn.cursor()
+    try:
+        for sql, parametros in sentencias_previas:
+            cursor.execute(sql, parametros)
+        for tabla, pares in (asignaciones_eliminadas or {}).items():
+            eliminadas[tabla] = eliminar_asignaciones(cursor, tabla, COLUMNAS_DESTINO[tabla], pares)
+        for tabla, pares in (
+            ("AssignmentBus", asignaciones_bus),
+            ("AssignmentPlane", asignaciones_avion),
+            ("AssignmentCommercialPlane", asignaciones_comerciales),
+        ):
+            filas[tabla] = insertar_asignaciones(cursor, tabla, COLUMNAS_DESTINO[tabla], pares)
+        filas["BusTurno"] = actualizar_horarios_buses(cursor, horarios_buses)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return {"filas": filas, "eliminadas": eliminadas, "tiempo": time.time() - inicio}
@@ -0,0 +1,149 @@
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+
+def normalizar(texto):
+    if not isinstance(texto, str):
+        return ''
+    return unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('utf-8').strip().upper()
+
+
+def normalizar_columna(serie):
+    # Cada valor distinto se normaliza una sola vez (las nóminas repiten mucho comunas y ciudades)
+    mapa = {valor: normalizar(valor) for valor in serie.dropna().unique()}
+    return serie.map(mapa).fillna('')
+
+
+# -------------------------
+# Horarios
+# -------------------------
+# Los horarios se pasan a minutos desde las 00:00 del día del turno, una columna completa a la
+# vez. Los charter se guardan en hora local; los comerciales, en UTC y se llevan a hora de Chile.
+ZONA_HORARIA = "America/Santiago"
+
+
+def minutos_desde_base(serie, fecha_base, zona=None):
+    # zona=None: se usa la hora tal como viene; con zona, los horarios sin zona se toman como UTC
+    if zona is None:
+        horarios = pd.to_datetime(serie)
+        if horarios.dt.tz is not None:
+            horarios = horarios.dt.tz_localize(None)
+    else:
+        horarios = pd.to_datetime(serie, utc=True).dt.tz_convert(zona).dt.tz_localize(None)
+    minutos = horarios.dt.hour * 60 + horarios.dt.minute
+    # Se suman 24h a lo que cae el día siguiente (o después) del turno
+    dia_siguiente = horarios.dt.normalize() > pd.Timestamp(fecha_base.date())
+    return (minutos + dia_siguiente * 24 * 60).astype(int)
+
+
+# -------------------------
+# Códigos categóricos
+# -------------------------
+# Comunas, ciudades y aeropuertos ya normalizados comparten un único catálogo nombre -> entero,
+# así que las comparaciones trabajador/bus/vuelo se hacen entre enteros.
+def construir_catalogo(*colecciones):
+    nombres = set()
+    for coleccion in colecciones:
+        nombres.update(coleccion)
+    nombres.discard('')
+    return {nombre: codigo for codigo, nombre in enumerate(sorted(nombres))}
+
+
+def codificar(valores, catalogo):
+    valores = list(valores)
+    return np.fromiter((catalogo.get(v, -1) for v in valores), dtype=np.int32, count=len(valores))
+
+
+# -------------------------
+# Registros por posición
+# -------------------------
+# Cada registro es un dict de arreglos del mismo largo; la posición i describe al i-ésimo
+# trabajador/bus/vuelo y "id" permite volver al identificador de la base de datos.
+def registros_trabajadores(df, catalogo):
+    return {
+        "id": df["trabajador_id"].tolist(),
+        "acercamiento": codificar(df["acercamiento"], catalogo),
+        "origen": codificar(df["origen"], catalogo),
+        "destino": codificar(df["destino"], catalogo),
+        "region": df["region"].fillna(-1).to_numpy(dtype=np.int16),
+        "subida": df["subida"].to_numpy(dtype=bool),
+        "use_bus": df["use_bus"].to_numpy(dtype=np.int8),
+        "use_plane": df["use_plane"].to_numpy(dtype=np.int8),
+    }
+
+
+def registros_buses(df, catalogo):
+    return {
+        "id": df["id"].tolist(),
+        "capacidad": df["capacidad"].to_numpy(dtype=np.int32),
+        "comunas_origen": [codificar(dict.fromkeys(c), catalogo) for c in df["comunas_origen"]],
+        "comunas_destino": [codificar(dict.fromkeys(c), catalogo) for c in df["comunas_destino"]],
+    }
+
+
+def registros_vuelos(ids, origenes, destinos, catalogo):
+    return {
+        "id": list(ids),
+        "origen": codificar(origenes, catalogo),
+        "destino": codificar(destinos, catalogo),
+    }
+
+
+def posiciones_por_codigo(listas_codigos):
+    # codigo -> posiciones (en orden) cuyo listado de códigos lo contiene
+    indice = defaultdict(list)
+    for posicion, codigos in enumerate(listas_codigos):
+        for codigo in codigos:
+            indice[int(codigo)].append(posicion)
+    return indice
+
+
+def posiciones_por_ruta(vuelos):
+    indice = defaultdict(list)
+    for posicion, ruta in enumerate(zip(vuelos["origen"].tolist(), vuelos["destino"].tolist())):
+        indice[ruta].append(posicion)
+    return indice
+
+
+def compatibilidad(trabajadores, buses, vuelos):
+    # Buses y vuelos compatibles de cada trabajador, como listas de ids.
+    # Cada clave (comuna, sentido) o (origen, destino) se resuelve una sola vez y los
+    # trabajadores con la misma clave comparten la lista resultante.
+    buses_subida = posiciones_por_codigo(buses["comunas_origen"])
+    buses_bajada = posiciones_por_codigo(buses["comunas_destino"])
+    vuelos_ruta = posiciones_por_ruta(vuelos)
+
+    cache_buses = {}
+    cache_vuelos = {}
+    buses_trabajador = {}
+    vuelos_trabajador = {}
+    columnas = zip(
+        trabajadores["id"],
+        trabajadores["acercamiento"].tolist(),
+        trabajadores["origen"].tolist(),
+        trabajadores["destino"].tolist(),
+        trabajadores["subida"].tolist(),
+        trabajadores["use_bus"].tolist(),
+        trabajadores["use_plane"].tolist(),
+    )
+    for t, comuna, origen, destino, subida, use_bus, use_plane in columnas:
+        clave_bus = (comuna, subida)
+        if clave_bus not in cache_buses:
+            indice = buses_subida if subida else buses_bajada
+            cache_buses[clave_bus] = [buses["id"][p] for p in indice.get(comuna, [])]
+        clave_vuelo = (origen, destino)
+        if clave_vuelo not in cache_vuelos:
+            cache_vuelos[clave_vuelo] = [vuelos["id"][p] for p in vuelos_ruta.get(clave_vuelo, [])]
+
+        buses_trabajador[t] = cache_buses[clave_bus] if use_bus == 1 else []
+        vuelos_trabajador[t] = cache_vuelos[clave_vuelo] if use_plane == 1 else []
+
+    return buses_trabajador, vuelos_trabajador
+
+
+def por_id(registros, columna):
+    # Vista id -> valor de una columna (tipos nativos de Python)
+    return dict(zip(registros["id"], registros[columna].tolist()))
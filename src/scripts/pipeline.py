@@ -0,0 +1,1759 @@
+import json
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from scripts.modelo import preprocesamiento
+from scripts.modelo.agregacion import agrupar_trabajadores_identicos, desagregar_clase
+from scripts.modelo.carga import cargar_datos_crear_buses, cargar_datos_turno
+from scripts.modelo.conexion import obtener_conexion
+from scripts.modelo.dominancia import podar_vuelos_dominados
+from scripts.modelo.descomposicion import (componentes_conexas, evaluar_objetivo, modelo_factibilidad,
+                                           resolver_en_paralelo, resolver_modelo)
+from scripts.modelo.flota import MAX_PARADAS, TIEMPO_MAXIMO_FLOTA, dimensionar_flota
+from scripts.modelo.geografia import (DIAMETRO_MAXIMO_KM, agrupar_por_cercania, cargar_coordenadas,
+                                      distancia_km, duracion_bus, ordenar_paradas, tiene_coordenadas)
+from scripts.modelo.metricas import cerrar_fase, guardar_metricas, iniciar_fase, nueva_medicion, resumen, tiempos_por_fase
+from scripts.modelo.incremental import agregar_hints, cantidades_clase, fijar_asignaciones, trabajadores_modificados
+from scripts.modelo.persistencia import guardar_resultados
+from scripts.modelo.preprocesamiento import ZONA_HORARIA, minutos_desde_base, normalizar, normalizar_columna, por_id
+
+# Pipeline de optimización de un turno como funciones importables:
+#   cargar_datos -> crear_buses -> preparar -> construir -> resolver -> extraer_solucion -> guardar
+# Todas las etapas comparten una misma conexión y una misma foto de los datos ("datos"), y el
+# estado entre etapas viaja en un diccionario ("contexto"). crear_buses.py y resolver_modelo.py
+# son solo la interfaz de línea de comandos de estas funciones.
+
+romanos_a_enteros = {
+    "I": 1, "II": 2, "III": 3, "IV": 4, "V": 5, "VI": 6, "VII": 7, "VIII": 8,
+    "IX": 9, "X": 10, "XI": 11, "XII": 12, "XIV": 14, "XV": 15,
+    "RM": 13
+}
+
+# COMBINACIONES: una variable de espera por cada (trabajador, bus, vuelo) compatible.
+# POR_TRABAJADOR: una sola variable de espera por trabajador.
+FORMULACIONES_ESPERA = ["COMBINACIONES", "POR_TRABAJADOR"]
+
+MENSAJE_SIN_SOLUCION = "❌ No se encontró solución."
+# Capacidad que se asigna a una región sin CapacidadTurno en el turno
+CAPACIDAD_POR_DEFECTO = 30
+ESTADOS_CON_SOLUCION = [cp_model.FEASIBLE, cp_model.OPTIMAL]
+# Presupuesto (segundos) de la fase de factibilidad en la resolución en dos fases; nunca más que
+# max_tiempo_ejecucion
+TIEMPO_FACTIBILIDAD = 10
+
+
+# -------------------------
+# Cargar datos desde la DB
+# -------------------------
+def cargar_datos(conn, turno_id, incremental=False, medicion=None):
+    # Una sola transacción, con parámetros enlazados (ver scripts/modelo/carga.py)
+    fase = iniciar_fase(medicion, "carga")
+    inicio_carga = time.time()
+    datos = cargar_datos_turno(conn, turno_id, con_plan_anterior=incremental)
+    print(f"\n📥 Datos del turno cargados en {time.time() - inicio_carga:.3f} segundos")
+    cerrar_fase(medicion, fase, trabajadores=len(datos["trabajadores"]), buses=len(datos["buses"]),
+                vuelos=len(datos["planes"]), vuelos_comerciales=len(datos["commercial_planes"]))
+    return datos
+
+
+# -------------------------
+# Crear buses
+# -------------------------
+def planificar_buses(turno_id, datos, max_paradas=MAX_PARADAS, tiempo_flota=TIEMPO_MAXIMO_FLOTA,
+                     diametro_grupo=DIAMETRO_MAXIMO_KM):
+    # Flota del turno sin tocar la base: filas de BusTurno a crear y regiones a las que les falta
+    # CapacidadTurno (se les asigna la capacidad por defecto). Devuelve None si no hay nada que crear.
+    df_tt = datos["trabajadores"]
+
+    if df_tt.empty:
+        print(f"No hay trabajadores para el turno {turno_id}")
+        return None
+
+    fecha_turno = datos["fecha_turno"]  # Este es un datetime.date o datetime.datetime
+    if fecha_turno is None:
+        print(f"No se encontró el turno con ID {turno_id}")
+        return None
+
+    # Capacidades por región (puedes modificar según demanda real)
+    capacidades_por_region = {}
+    for region, group in datos["capacidades"].groupby('region'):
+        capacidades_por_region[region] = group['capacidad'].tolist()
+    regiones_sin_capacidad = []
+
+    df_regiones = datos["regiones"]
+    duracion_por_region = dict(zip(df_regiones["name"], df_regiones["tiempo_promedio_bus"]))
+    tiempo_adicional_parada = datos["tiempo_adicional_parada"]
+    coordenadas = cargar_coordenadas()
+    comuna_a_region_subida = {}
+    comuna_a_region_bajada = {}
+
+    for _, row in df_regiones.iterrows():
+        for comuna in row["comunas_acercamiento_subida"]:
+            comuna_a_region_subida[comuna.upper()] = row["name"]
+        for comuna in row["comunas_acercamiento_bajada"]:
+            comuna_a_region_bajada[comuna.upper()] = row["name"]
+
+    def capacidades_de_region(region):
+        if not capacidades_por_region.get(region):
+            print(f"⚠️ Región '{region}' no tiene capacidades definidas. Se asigna capacidad por defecto = {CAPACIDAD_POR_DEFECTO}")
+            capacidades_por_region[region] = [CAPACIDAD_POR_DEFECTO]
+            regiones_sin_capacidad.append(region)
+        return capacidades_por_region[region]
+
+    def asignar_buses_por_comuna(df_filtrado, nombre="SUBIDA"):
+        trabajadores_por_comuna = df_filtrado['acercamiento'].str.upper().value_counts().to_dict()
+        bus_info = []
+        bus_counter = 1
+
+        es_subida = nombre.upper() == "SUBIDA"
+        comuna_a_region = comuna_a_region_subida if es_subida else comuna_a_region_bajada
+
+        # Demanda por región: {region: {comuna: cantidad}}
+        demanda_por_region = {}
+        for comuna, cantidad in trabajadores_por_comuna.items():
+            region = comuna_a_region.get(comuna)
+            if not region:
+                print(f"⚠️ Comuna '{comuna}' no está registrada en tabla Region para {'subida' if es_subida else 'bajada'}")
+                continue
+            demanda_por_region.setdefault(region, {})[comuna] = cantidad
+
+        # Las comunas de cada región se agrupan por cercanía y cada grupo se resuelve con bin packing
+        # exacto (CP-SAT): un bus nunca junta comunas de grupos distintos
+        resumen = {"buses": 0, "asientos": 0, "asientos_vacios": 0, "tiempo": 0.0}
+        for region, demanda in demanda_por_region.items():
+            capacidades = capacidades_de_region(region)
+            for grupo in agrupar_por_cercania(list(demanda), coordenadas, diametro_grupo):
+                distancia = (lambda a, b: distancia_km(a, b, coordenadas)) if tiene_coordenadas(grupo, coordenadas) else None
+                buses, stats = dimensionar_flota({c: demanda[c] for c in grupo}, capacidades, max_paradas,
+                                                 tiempo_flota, distancia)
+                if not stats["optimo"]:
+                    print(f"⚠️ Flota de {region} ({nombre.lower()}, {', '.join(grupo)}) no probada óptima en {tiempo_flota} segundos")
+                for clave in resumen:
+                    resumen[clave] += stats[clave]
+
+                for bus in buses:
+                    # Paradas en orden de recorrido hacia el aeropuerto (en bajada, el orden inverso)
+                    comunas = list(bus["comunas"])
+                    if tiene_coordenadas(comunas, coordenadas):
+                        comunas, _ = ordenar_paradas(comunas, coordenadas)
+                        if not es_subida:
+                            comunas.reverse()
+                    bus_info.append({
+                        "id": f"{nombre.lower()}_bus{turno_id}_{bus_counter}",
+                        "region": region,
+                        "capacidad": bus["capacidad"],
+                        "comunas": comunas,
+                        "subida": es_subida
+                    })
+                    bus_counter += 1
+
+        print(f"🚌 Buses de {nombre.lower()}: {resumen['buses']} | asientos: {resumen['asientos']} | "
+              f"vacíos: {resumen['asientos_vacios']} | tiempo: {resumen['tiempo']:.2f} segundos")
+        return bus_info, resumen
+
+    # Excluir comuna no deseada en buses
+    df_subida = df_tt[(df_tt["subida"] == True) & (df_tt["acercamiento"].str.upper() != "AEROPUERTO SANTIAGO")]
+    df_bajada = df_tt[(df_tt["subida"] == False) & (df_tt["acercamiento"].str.upper() != "AEROPUERTO SANTIAGO")]
+
+    buses_subida, resumen_subida = asignar_buses_por_comuna(df_subida, "SUBIDA")
+    buses_bajada, resumen_bajada = asignar_buses_por_comuna(df_bajada, "BAJADA")
+    todos_los_buses = buses_subida + buses_bajada
+
+    HB_b = {
+        bus["id"]: 870 if bus["subida"] else 2000
+        for bus in todos_los_buses
+    }
+
+    # Filas de BusTurno: (id, capacidad, horario_salida, horario_llegada, region, comunas_origen, comunas_destino)
+    filas = []
+    for bus in todos_los_buses:
+        print(bus)
+        bus_id = bus["id"]
+        subida = bus["subida"]
+        region = bus["region"]
+        comunas_origen = bus["comunas"] if subida else ["SANTIAGO"]
+        comunas_destino = ["SANTIAGO"] if subida else bus["comunas"]
+
+        hora_base = HB_b[bus_id]
+        hora_salida = datetime.combine(fecha_turno.date(), datetime.min.time()) + timedelta(minutes=hora_base)
+        duracion = duracion_bus(bus["comunas"], coordenadas, tiempo_adicional_parada, duracion_por_region.get(region, 60))
+        hora_llegada = hora_salida + timedelta(minutes=duracion)
+        filas.append((bus_id, bus["capacidad"], hora_salida, hora_llegada, region,
+                      json.dumps(comunas_origen), json.dumps(comunas_destino)))
+
+    return {
+        "buses": todos_los_buses,
+        "filas": filas,
+        "regiones_sin_capacidad": regiones_sin_capacidad,
+        "resumen": {"subida": resumen_subida, "bajada": resumen_bajada},
+    }
+
+
+def agregar_buses(datos, filas):
+    # Los BusTurno nuevos pasan a la foto de datos que usará el resolver (sin volver a consultar)
+    if "buses" in datos and filas:
+        nuevas = pd.DataFrame([(f[0], f[1], f[4], f[5], f[6]) for f in filas], columns=datos["buses"].columns)
+        datos["buses"] = pd.concat([datos["buses"], nuevas], ignore_index=True)
+
+
+def crear_buses(conn, turno_id, datos=None, max_paradas=MAX_PARADAS, tiempo_flota=TIEMPO_MAXIMO_FLOTA,
+                diametro_grupo=DIAMETRO_MAXIMO_KM, medicion=None):
+    # Planifica la flota y escribe los BusTurno del turno. Si se entregan "datos" (de cargar_datos)
+    # no se vuelve a leer la base y los buses nuevos se agregan a datos["buses"], así el resolver
+    # los ve sin otra consulta. Devuelve el plan de planificar_buses o None si no hay nada que crear.
+    print("----------------------------------------------------------------------------------")
+    print("Creando buses:")
+
+    fase = iniciar_fase(medicion, "crear_buses")
+
+    # Trabajadores, capacidades, regiones y fecha del turno en una sola transacción
+    if datos is None:
+        datos = cargar_datos_crear_buses(conn, turno_id)
+
+    plan = planificar_buses(turno_id, datos, max_paradas, tiempo_flota, diametro_grupo)
+    if plan is None:
+        cerrar_fase(medicion, fase, buses=0, buses_nuevos=0)
+        return None
+
+    cursor = conn.cursor()
+    for region in plan["regiones_sin_capacidad"]:
+        # Agregar a la tabla CapacidadTurno si no existe aún
+        cursor.execute('''
+            SELECT COUNT(*) FROM "CapacidadTurno"
+            WHERE "turnoId" = %s AND "regionId" = (
+                SELECT id FROM "Region" WHERE name = %s
+            ) AND capacidad = %s
+        ''', (turno_id, region, CAPACIDAD_POR_DEFECTO))
+        ya_existe = cursor.fetchone()[0] > 0
+
+        if not ya_existe:
+            cursor.execute('''
+                INSERT INTO "CapacidadTurno" (id, "turnoId", "regionId", capacidad)
+                VALUES (%s, %s, (SELECT id FROM "Region" WHERE name = %s), %s)
+            ''', (str(uuid4()), turno_id, region, CAPACIDAD_POR_DEFECTO))
+            print(f"✅ CapacidadTurno añadida para región {region}, turno {turno_id}, capacidad {CAPACIDAD_POR_DEFECTO}")
+
+    filas_nuevas = []
+    for fila in plan["filas"]:
+        cursor.execute('SELECT COUNT(*) FROM "BusTurno" WHERE "id" = %s', (fila[0],))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute('''
+                INSERT INTO "BusTurno" (
+                    id, "capacidad", "horario_salida", "horario_llegada",
+                    "region","comunas_origen", "comunas_destino", "turnoId"
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ''', (*fila, turno_id))
+            filas_nuevas.append(fila)
+
+    conn.commit()
+    cursor.close()
+    agregar_buses(datos, filas_nuevas)
+    cerrar_fase(medicion, fase, buses=len(plan["filas"]), buses_nuevos=len(filas_nuevas))
+    return plan
+
+
+# -------------------------
+# Preprocesamiento
+# -------------------------
+def preparar(datos, turno_id, formulacion=None, agrupar=False, incremental=False, fijar_no_modificados=False,
+             medicion=None):
+    # Parámetros del turno, pre-asignación a vuelos charter/comerciales e índice de compatibilidad.
+    # Devuelve el contexto que usan las etapas siguientes, o None si el turno no tiene parámetros.
+    # Con "medicion" registra las fases preprocesamiento, preasignacion e indice.
+    if fijar_no_modificados:
+        incremental = True
+    fase = iniciar_fase(medicion, "preprocesamiento")
+    df_trabajadores = datos["trabajadores"].copy()
+    df_trabajadores_con_avion = datos["trabajadores_con_avion"]
+    df_buses = datos["buses"].copy()
+    df_planes = datos["planes"].copy()
+    df_capacidad_usada_aviones = datos["capacidad_usada_aviones"]
+    df_commercial_planes = datos["commercial_planes"].copy()
+    df_regiones = datos["regiones"]
+
+    if len(df_trabajadores_con_avion)>0:
+        print(f"\nTrabajadores con asignación manual: {df_trabajadores_con_avion}")
+    else:
+        print(f"\nTrabajadores con asignación manual: 0")
+
+    region_por_id = df_buses.set_index("id")["region"].to_dict()
+    duracion_por_region = dict(zip(df_regiones["name"], df_regiones["tiempo_promedio_bus"]))
+
+    row = datos["parametros"]
+    if not row:
+        print(f"No se encontró el turno con ID {turno_id}")
+        return None
+
+    fecha_turno, espera_conexion_subida, espera_conexion_bajada, max_espera_permitida, margen_desfase, max_tiempo_ejecucion, tiempo_adicional_parada, formulacion_espera, agrupar_trabajadores, hilos_busqueda, gap_relativo, gap_absoluto, semilla, nivel_presolve, dos_fases = row
+    parametros_solver = {
+        "gap_relativo": gap_relativo,
+        "gap_absoluto": gap_absoluto,
+        "semilla": semilla,
+        "nivel_presolve": nivel_presolve,
+    }
+    if formulacion:
+        formulacion_espera = formulacion
+    if agrupar:
+        agrupar_trabajadores = True
+    if agrupar_trabajadores:
+        print("\n🧮 Modelo agregado por clases de trabajadores idénticos")
+    else:
+        print(f"\n🧮 Formulación de espera: {formulacion_espera}")
+
+    # Plan guardado por la corrida anterior (modo incremental)
+    plan_anterior = None
+    vuelo_anterior = {}
+    if incremental:
+        plan_anterior = datos["plan_anterior"]
+        vuelo_anterior = {**plan_anterior["vuelo"], **plan_anterior["vuelo_comercial"]}
+        print(f"\n♻️ Re-optimización incremental: {len(plan_anterior['bus'])} asignaciones de bus, "
+              f"{len(vuelo_anterior)} de vuelo guardadas, {len(plan_anterior['vuelo_manual'])} de avión manuales")
+
+    # Cada columna se normaliza una sola vez y por valor distinto; desde aquí en adelante
+    # todas las comparaciones de comunas y ciudades usan estos valores normalizados.
+    df_trabajadores["origen"] = normalizar_columna(df_trabajadores["origen"])
+    df_trabajadores["destino"] = normalizar_columna(df_trabajadores["destino"])
+    df_trabajadores["acercamiento"] = normalizar_columna(df_trabajadores["acercamiento"])
+    df_trabajadores["region"] = normalizar_columna(df_trabajadores["region"]).map(romanos_a_enteros)
+    df_planes["ciudad_origen"] = normalizar_columna(df_planes["ciudad_origen"])
+    df_planes["ciudad_destino"] = normalizar_columna(df_planes["ciudad_destino"])
+
+    #commercialplanes
+    iata_map = {"SCL": "SANTIAGO","ANF": "ANTOFAGASTA","CJC": "CALAMA"}
+    # Reemplazar en columnas origin y destination
+    df_commercial_planes["origin"] = normalizar_columna(df_commercial_planes["origin"]).replace(iata_map)
+    df_commercial_planes["destination"] = normalizar_columna(df_commercial_planes["destination"]).replace(iata_map)
+    #buses
+    df_buses["comunas_origen"] = df_buses["comunas_origen"].apply(lambda x: [normalizar(c) for c in json.loads(x)])
+    df_buses["comunas_destino"] = df_buses["comunas_destino"].apply(lambda x: [normalizar(c) for c in json.loads(x)])
+
+    # use_plane: 0 para regiones 1, 2, 3, 4 y 15; 1 para el resto
+    df_trabajadores["use_plane"] = np.where(df_trabajadores["region"].isin([1, 2, 3, 4, 15]), 0, 1)
+    # use_bus: 1 para todas excepto RM (13), que es 0
+    df_trabajadores["use_bus"] = np.where(df_trabajadores["region"] == 13, 0, 1)
+    # En modo incremental los trabajadores con avión asignado a mano quedan fuera del modelo y
+    # conservan sus asignaciones (su asiento se descuenta de la capacidad, ver más abajo)
+    if incremental:
+        df_trabajadores = df_trabajadores[~df_trabajadores["trabajador_id"].isin(list(plan_anterior["vuelo_manual"]))]
+
+    # -------------------------
+    # Capacidad Disponible
+    # -------------------------
+    buses = df_buses["id"].tolist()
+    vuelos = df_planes["plane_turno_id"].tolist()
+    usadas_dict = df_capacidad_usada_aviones.set_index("planeTurnoId")["capacidad_usada"].to_dict()
+    if incremental:
+        # Las asignaciones de avión guardadas son el plan anterior (se reoptimizan), no cupos ya
+        # ocupados; solo las manuales ocupan su asiento
+        usadas_dict = Counter(plan_anterior["vuelo_manual"].values())
+    CB = df_buses.set_index("id")["capacidad"].to_dict()
+
+    CVtotal = df_planes.set_index("plane_turno_id")["capacidad"].to_dict()
+    CV = {
+        plane_id: CVtotal.get(plane_id, 0) - usadas_dict.get(plane_id, 0)
+        for plane_id in CVtotal
+    }
+
+    cerrar_fase(medicion, fase, trabajadores=len(df_trabajadores), buses=len(buses), vuelos=len(vuelos),
+                vuelos_comerciales=len(df_commercial_planes))
+
+    # --------------------------------------
+    # Trabajadores sin vuelo charter
+    # --------------------------------------
+    fase = iniciar_fase(medicion, "preasignacion")
+
+    # Agrupo la capacidad disponible por (origen, destino)
+    df_plane_capacity = (
+        df_planes
+        .assign(capacidad_restante=lambda df: df['plane_turno_id'].map(CV))
+        .groupby(['ciudad_origen', 'ciudad_destino'])['capacidad_restante']
+        .sum()
+        .reset_index(name='capacidad_total')
+    )
+
+    print("\nCapacidad Vuelos charter origen-destino")
+    print(df_plane_capacity)
+
+    # Para cada grupo origen–destino, elijo:
+    #    - primero todos los de la Región Metropolitana (13)
+    #    - luego los otros, hasta agotar la capacidad
+    df_demand = df_trabajadores[df_trabajadores['use_plane'] == 1]
+    # Un solo groupby reparte la demanda por ruta (el orden de filas dentro de cada grupo se mantiene)
+    demanda_por_ruta = dict(tuple(df_demand.groupby(['origen', 'destino'], sort=False)))
+    asignados_por_origen_dest = {}
+
+    for _, row in df_plane_capacity.iterrows():
+        o = row['ciudad_origen']
+        d = row['ciudad_destino']
+        cap = int(row['capacidad_total'])
+        grupo = demanda_por_ruta.get((o, d), df_demand.iloc[0:0])
+
+        # Si la demanda cabe, asigno todos
+        if len(grupo) <= cap:
+            asign_ids = grupo['trabajador_id'].tolist()
+        else:
+            # 3.1) Primero RM (región 13)
+            rm = grupo[grupo['region'] == 13]['trabajador_id'].tolist()
+            asign_ids = rm[:cap]
+
+            # 3.2) Si aún quedan cupos, agrego otros hasta llenar
+            faltantes = cap - len(asign_ids)
+            if faltantes > 0:
+                otros = grupo[~grupo['trabajador_id'].isin(asign_ids)]
+                asign_ids += otros['trabajador_id'].tolist()[:faltantes]
+
+        asignados_por_origen_dest[(o, d)] = asign_ids
+
+    # 1) Obtener el listado de todos los IDs asignados a avión
+    assigned_ids = [
+        trab_id
+        for ids in asignados_por_origen_dest.values()
+        for trab_id in ids
+    ]
+
+    # 2) DataFrame de quienes NO tienen vuelo charter
+    df_trabajadores_vuelos_comerciales = df_trabajadores[
+        ~df_trabajadores["trabajador_id"].isin(assigned_ids)
+    ]
+
+    # 3) Quitar los que viajaran en vuelos comerciales de df_trabajadores
+    not_assigned_ids = set(df_trabajadores_vuelos_comerciales["trabajador_id"])
+    df_trabajadores = df_trabajadores[
+        ~df_trabajadores["trabajador_id"].isin(not_assigned_ids)
+    ].reset_index(drop=True)
+
+    #--------------------------------------
+    #Filtrar vuelos comerciales por hora
+
+    #planeturnos
+    HV = dict(zip(df_planes["plane_turno_id"], minutos_desde_base(df_planes["horario_salida"], fecha_turno).tolist()))
+
+    HV_bajada = dict(zip(df_planes["plane_turno_id"],
+                         minutos_desde_base(df_planes["horario_llegada"], fecha_turno).tolist()))
+
+    min_hora = min(min(HV.values()), min(HV_bajada.values()))
+    max_hora = max(max(HV.values()), max(HV_bajada.values()))
+
+    print(f'\n Min hora vuelo: {min_hora} Max hora vuelo: {max_hora}')
+
+    print("\nVuelos comerciales (sin filtrar):", len(df_commercial_planes))
+    # Horarios en minutos una sola vez por columna; el filtro es una máscara sobre esas columnas
+    df_commercial_planes["minuto_salida"] = minutos_desde_base(df_commercial_planes["departureTime"], fecha_turno, ZONA_HORARIA)
+    df_commercial_planes["minuto_llegada"] = minutos_desde_base(df_commercial_planes["arrivalTime"], fecha_turno, ZONA_HORARIA)
+
+    # Los vuelos desde o hacia Santiago deben caer dentro de la ventana de los charter (± margen)
+    es_santiago = (df_commercial_planes["destination"] == "SANTIAGO") | (df_commercial_planes["origin"] == "SANTIAGO")
+    fuera_de_ventana = (
+        (df_commercial_planes["minuto_llegada"] < df_commercial_planes["minuto_salida"])
+        | (df_commercial_planes["minuto_salida"] < min_hora - margen_desfase)
+        | (df_commercial_planes["minuto_llegada"] > max_hora + margen_desfase)
+    )
+
+    # Filtrar DataFrame
+    df_commercial_planes = df_commercial_planes[~(es_santiago & fuera_de_ventana)].reset_index(drop=True)
+    print("Vuelos comerciales compatibles (filtrados):", len(df_commercial_planes))
+
+    prev_C_CP = df_commercial_planes.set_index("id")["seatsAvailable"].to_dict() #capacidad
+    prev_Precio_CP = df_commercial_planes.set_index("id")["priceClp"].to_dict() #precio
+
+    prev_df_commercial_plane_capacity = (
+        df_commercial_planes
+        .assign(capacidad_restante=lambda df: df['id'].map(prev_C_CP))
+        .groupby(['origin', 'destination'])['capacidad_restante']
+        .sum()
+        .reset_index(name='capacidad_total')
+    )
+    print("\nCapacidad vuelos comerciales origen-destino")
+    print(prev_df_commercial_plane_capacity)
+
+    demanda_comercial_por_ruta = (
+        df_trabajadores_vuelos_comerciales[df_trabajadores_vuelos_comerciales["use_plane"] == 1]
+        .groupby(["origen", "destino"]).size().to_dict()
+    )
+    vuelos_por_trayecto = dict(tuple(df_commercial_planes.groupby(["origin", "destination"], sort=False)))
+    vuelos_descartados = set()
+
+    for _, row in prev_df_commercial_plane_capacity.iterrows():
+        o, d, capacidad_total = row["origin"], row["destination"], int(row["capacidad_total"])
+        demanda = demanda_comercial_por_ruta.get((o, d), 0)
+
+        if capacidad_total > demanda:
+            vuelos_trayecto = vuelos_por_trayecto[(o, d)].sort_values(by="priceClp")
+            vuelos_seleccionados = []
+            acumulado = 0
+
+            for vuelo_id in vuelos_trayecto["id"]:
+                if acumulado >= demanda:
+                    break
+                vuelos_seleccionados.append(vuelo_id)
+                acumulado += prev_C_CP[vuelo_id]
+
+            vuelos_descartados.update(set(vuelos_trayecto["id"]) - set(vuelos_seleccionados))
+
+    df_commercial_planes = df_commercial_planes[~df_commercial_planes["id"].isin(vuelos_descartados)]
+
+    # Poda por dominancia (precio, hora respecto de la ventana de buses y asientos; ver modelo/dominancia.py)
+    protegidos = set(plan_anterior["vuelo_comercial"].values()) if plan_anterior else set()
+    vuelos_dominados, poda_por_ruta = podar_vuelos_dominados(
+        df_commercial_planes, demanda_comercial_por_ruta,
+        min_hora - espera_conexion_subida - margen_desfase, max_hora + espera_conexion_bajada + margen_desfase,
+        espera_conexion_subida, espera_conexion_bajada, protegidos,
+    )
+    df_commercial_planes = df_commercial_planes[~df_commercial_planes["id"].isin(vuelos_dominados)]
+    print(f"\n✂️ Vuelos comerciales dominados descartados: {len(vuelos_dominados)} de "
+          f"{sum(r['candidatos'] for r in poda_por_ruta.values())} candidatos")
+
+    vuelos_comerciales = df_commercial_planes["id"].tolist()
+
+    C_CP = df_commercial_planes.set_index("id")["seatsAvailable"].to_dict() #capacidad
+    Precio_CP = df_commercial_planes.set_index("id")["priceClp"].to_dict() #precio
+    # --------------------------------------
+    # Trabajadores sin vuelo
+    # --------------------------------------
+    df_commercial_plane_capacity = (
+        df_commercial_planes
+        .assign(capacidad_restante=lambda df: df['id'].map(C_CP))
+        .groupby(['origin', 'destination'])['capacidad_restante']
+        .sum()
+        .reset_index(name='capacidad_total')
+    )
+
+    df_demand_com = df_trabajadores_vuelos_comerciales[df_trabajadores_vuelos_comerciales['use_plane'] == 1]
+    demanda_com_por_ruta = dict(tuple(df_demand_com.groupby(['origen', 'destino'], sort=False)))
+    comerciales_asignados_por_origen_dest = {}
+
+    for _, row in df_commercial_plane_capacity.iterrows():
+        o = row['origin']
+        d = row['destination']
+        cap = int(row['capacidad_total'])
+        grupo = demanda_com_por_ruta.get((o, d), df_demand_com.iloc[0:0])
+
+        # Si la demanda cabe, asigno todos
+        if len(grupo) <= cap:
+            asign_ids_com = grupo['trabajador_id'].tolist()
+        else:
+            # 3.1) Primero RM (región 13)
+            rm = grupo[grupo['region'] == 13]['trabajador_id'].tolist()
+            asign_ids_com = rm[:cap]
+
+            # 3.2) Si aún quedan cupos, agrego otros hasta llenar
+            faltantes = cap - len(asign_ids_com)
+            if faltantes > 0:
+                otros = grupo[~grupo['trabajador_id'].isin(asign_ids_com)]
+                asign_ids_com += otros['trabajador_id'].tolist()[:faltantes]
+
+        comerciales_asignados_por_origen_dest[(o, d)] = asign_ids_com
+
+    # 1) Obtener el listado de todos los IDs asignados a vuelos comerciales
+    comerciales_assigned_ids = [trab_id
+        for ids in comerciales_asignados_por_origen_dest.values()
+        for trab_id in ids]
+
+    # 2) DataFrame de quienes NO tienen transporte (ni chartes ni cpmerciañ)
+    df_trabajadores_no_asignados = df_trabajadores_vuelos_comerciales[
+        ~df_trabajadores_vuelos_comerciales["trabajador_id"].isin(comerciales_assigned_ids)
+    ]
+
+    # 3) Quitar los que viajaran en vuelos comerciales de df_trabajadores
+    not_assigned_ids_2 = set(df_trabajadores_no_asignados["trabajador_id"])
+    df_trabajadores_vuelos_comerciales = df_trabajadores_vuelos_comerciales[
+        ~df_trabajadores_vuelos_comerciales["trabajador_id"].isin(not_assigned_ids_2)
+    ].reset_index(drop=True)
+    # Variables z que no se crean por la poda: una por trabajador comercial de la ruta y vuelo descartado
+    comerciales_por_ruta = df_trabajadores_vuelos_comerciales.groupby(["origen", "destino"]).size().to_dict()
+    poda_dominancia = {
+        "candidatos": sum(r["candidatos"] for r in poda_por_ruta.values()),
+        "vuelos_descartados": len(vuelos_dominados),
+        "z_evitadas": sum(r["descartados"] * comerciales_por_ruta.get(ruta, 0) for ruta, r in poda_por_ruta.items()),
+        "por_ruta": {f"{o}-{d}": r for (o, d), r in poda_por_ruta.items()},
+    }
+    if vuelos_dominados:
+        print(f"✂️ Variables z evitadas por la poda: {poda_dominancia['z_evitadas']}")
+    cerrar_fase(medicion, fase, trabajadores_charter=len(df_trabajadores),
+                trabajadores_comerciales=len(df_trabajadores_vuelos_comerciales),
+                trabajadores_sin_vuelo=len(df_trabajadores_no_asignados), vuelos_comerciales=len(vuelos_comerciales),
+                vuelos_dominados=len(vuelos_dominados), z_evitadas=poda_dominancia["z_evitadas"])
+
+    # -------------------------
+    # Parámetros
+    # -------------------------
+    fase = iniciar_fase(medicion, "indice")
+    #charter
+    trabajadores = df_trabajadores["trabajador_id"].tolist()
+
+    #vuelos comerciales
+    trabajadores_comerciales = df_trabajadores_vuelos_comerciales["trabajador_id"].tolist()
+
+    #commercialplanes
+    H_CP = dict(zip(df_commercial_planes["id"], df_commercial_planes["minuto_salida"].tolist()))
+
+    H_CP_bajada = dict(zip(df_commercial_planes["id"], df_commercial_planes["minuto_llegada"].tolist()))
+
+    print("\nDestino vuelos comerciales:")
+    print(dict(zip(df_commercial_planes["id"], df_commercial_planes["destination"])))
+
+    # -------------------------
+    # Índice de compatibilidad
+    # -------------------------
+    # Comunas y ciudades (ya normalizadas) se codifican como enteros de un catálogo común y
+    # cada trabajador, bus y vuelo queda como un registro por posición. El índice
+    # comuna -> buses y (origen, destino) -> vuelos se arma una sola vez sobre esos códigos:
+    # solo los pares trabajador-bus y trabajador-vuelo compatibles generan variables.
+    inicio_indice = time.time()
+
+    catalogo = preprocesamiento.construir_catalogo(
+        df_trabajadores["acercamiento"], df_trabajadores["origen"], df_trabajadores["destino"],
+        df_trabajadores_vuelos_comerciales["acercamiento"], df_trabajadores_vuelos_comerciales["origen"],
+        df_trabajadores_vuelos_comerciales["destino"],
+        (c for comunas in df_buses["comunas_origen"] for c in comunas),
+        (c for comunas in df_buses["comunas_destino"] for c in comunas),
+        df_planes["ciudad_origen"], df_planes["ciudad_destino"],
+        df_commercial_planes["origin"], df_commercial_planes["destination"],
+    )
+    registros_charter = preprocesamiento.registros_trabajadores(df_trabajadores, catalogo)
+    registros_comerciales = preprocesamiento.registros_trabajadores(df_trabajadores_vuelos_comerciales, catalogo)
+    registros_buses = preprocesamiento.registros_buses(df_buses, catalogo)
+    registros_vuelos = preprocesamiento.registros_vuelos(
+        df_planes["plane_turno_id"], df_planes["ciudad_origen"], df_planes["ciudad_destino"], catalogo
+    )
+    registros_vuelos_comerciales = preprocesamiento.registros_vuelos(
+        df_commercial_planes["id"], df_commercial_planes["origin"], df_commercial_planes["destination"], catalogo
+    )
+
+    buses_trabajador, vuelos_trabajador = preprocesamiento.compatibilidad(registros_charter, registros_buses, registros_vuelos)
+    buses_trabajador_com, vuelos_trabajador_com = preprocesamiento.compatibilidad(registros_comerciales, registros_buses, registros_vuelos_comerciales)
+    buses_trabajador.update(buses_trabajador_com)
+    vuelos_trabajador.update(vuelos_trabajador_com)
+
+    #charter
+    region_trabajadores = por_id(registros_charter, "region")
+    use_plane_trabajadores = por_id(registros_charter, "use_plane")
+    use_bus_trabajadores = por_id(registros_charter, "use_bus")
+    subida_trabajadores = por_id(registros_charter, "subida")
+    #vuelos comerciales
+    region_trabajadores_comerciales = por_id(registros_comerciales, "region")
+    use_plane_trabajadores_comerciales = por_id(registros_comerciales, "use_plane")
+    use_bus_trabajadores_comerciales = por_id(registros_comerciales, "use_bus")
+    subida_trabajadores_comerciales = por_id(registros_comerciales, "subida")
+
+    tiempo_indice = time.time() - inicio_indice
+    print(f"\n🧭 Índice de compatibilidad construido en {tiempo_indice:.3f} segundos")
+
+    # -------------------------
+    # Trabajadores afectados por la edición (modo incremental)
+    # -------------------------
+    trabajadores_fijos = set()
+    if incremental:
+        def conexion_anterior_valida(t, b, v):
+            hb = plan_anterior["hora_bus"].get(b)
+            if hb is None:
+                return False
+            if t in subida_trabajadores_comerciales:
+                subida, hora_subida, hora_bajada = subida_trabajadores_comerciales[t], H_CP, H_CP_bajada
+            else:
+                subida, hora_subida, hora_bajada = subida_trabajadores[t], HV, HV_bajada
+            if subida:
+                return hb + espera_conexion_subida <= hora_subida[v]
+            return hb >= hora_bajada[v] + espera_conexion_bajada
+
+        modificados = trabajadores_modificados(
+            trabajadores, plan_anterior["bus"], plan_anterior["vuelo"], buses_trabajador, vuelos_trabajador,
+            use_bus_trabajadores, use_plane_trabajadores, conexion_anterior_valida
+        ) | trabajadores_modificados(
+            trabajadores_comerciales, plan_anterior["bus"], plan_anterior["vuelo_comercial"], buses_trabajador, vuelos_trabajador,
+            use_bus_trabajadores_comerciales, use_plane_trabajadores_comerciales, conexion_anterior_valida
+        )
+        if fijar_no_modificados:
+            trabajadores_fijos = (set(trabajadores) | set(trabajadores_comerciales)) - modificados
+        print(f"♻️ Trabajadores modificados: {len(modificados)} | fijos: {len(trabajadores_fijos)}")
+
+    # -------------------------
+    # Logs para depuración
+    # -------------------------
+    incompatibles_bus = 0
+    incompatibles_vuelo = 0
+
+    for t in trabajadores:
+        subida = subida_trabajadores[t]
+
+        # Validar compatibilidad solo si el trabajador puede usar bus
+        if use_bus_trabajadores[t] == 1 and len(buses_trabajador[t]) == 0:
+            print(f"⚠️ Trabajador {t} sin buses compatibles ({'SUBIDA' if subida else 'BAJADA'})")
+            incompatibles_bus += 1
+
+        # Validar compatibilidad solo si el trabajador puede usar vuelo
+        if use_plane_trabajadores[t] == 1 and len(vuelos_trabajador[t]) == 0:
+            print(f"⚠️ Trabajador {t} sin vuelos compatibles")
+            incompatibles_vuelo += 1
+
+
+    print(f"\n🚫 Trabajadores sin buses compatibles: {incompatibles_bus}")
+    print(f"🚫 Trabajadores sin vuelos compatibles: {incompatibles_vuelo}")
+
+    #comerciales
+    incompatibles_bus = 0
+    incompatibles_vuelo = 0
+
+    for t in trabajadores_comerciales:
+        subida = subida_trabajadores_comerciales[t]
+
+        # Validar compatibilidad solo si el trabajador puede usar bus
+        if use_bus_trabajadores_comerciales[t] == 1 and len(buses_trabajador[t]) == 0:
+            print(f"⚠️ Trabajador {t} sin buses compatibles ({'SUBIDA' if subida else 'BAJADA'})")
+            incompatibles_bus += 1
+
+        # Validar compatibilidad solo si el trabajador puede usar vuelo
+        if use_plane_trabajadores_comerciales[t] == 1 and len(vuelos_trabajador[t]) == 0:
+            print(f"⚠️ Trabajador {t} sin vuelos compatibles")
+            incompatibles_vuelo += 1
+
+
+    print(f"\n🚫 Trabajadores Comerciales sin buses compatibles: {incompatibles_bus}")
+    print(f"🚫 Trabajadores Comerciales sin vuelos compatibles: {incompatibles_vuelo}")
+    cerrar_fase(medicion, fase, pares_bus=sum(len(b) for b in buses_trabajador.values()),
+                pares_vuelo=sum(len(v) for v in vuelos_trabajador.values()), trabajadores_fijos=len(trabajadores_fijos))
+
+    return {
+        "turno_id": turno_id,
+        "incremental": incremental,
+        "fecha_turno": fecha_turno,
+        "espera_conexion_subida": espera_conexion_subida,
+        "espera_conexion_bajada": espera_conexion_bajada,
+        "max_espera_permitida": max_espera_permitida,
+        "margen_desfase": margen_desfase,
+        "poda_dominancia": poda_dominancia,
+        "max_tiempo_ejecucion": max_tiempo_ejecucion,
+        "resolver_dos_fases": bool(dos_fases),
+        "tiempo_adicional_parada": tiempo_adicional_parada,
+        "formulacion_espera": formulacion_espera,
+        "agrupar_trabajadores": agrupar_trabajadores,
+        "hilos_busqueda": hilos_busqueda,
+        "parametros_solver": parametros_solver,
+        "plan_anterior": plan_anterior,
+        "vuelo_anterior": vuelo_anterior,
+        "trabajadores_fijos": trabajadores_fijos,
+        "df_buses": df_buses,
+        "df_trabajadores_no_asignados": df_trabajadores_no_asignados,
+        "region_por_id": region_por_id,
+        "duracion_por_region": duracion_por_region,
+        "trabajadores": trabajadores,
+        "trabajadores_comerciales": trabajadores_comerciales,
+        "buses": buses,
+        "vuelos": vuelos,
+        "vuelos_comerciales": vuelos_comerciales,
+        "CB": CB,
+        "CV": CV,
+        "CVtotal": CVtotal,
+        "C_CP": C_CP,
+        "Precio_CP": Precio_CP,
+        "HV": HV,
+        "HV_bajada": HV_bajada,
+        "H_CP": H_CP,
+        "H_CP_bajada": H_CP_bajada,
+        "min_hora": min_hora,
+        "max_hora": max_hora,
+        "buses_trabajador": buses_trabajador,
+        "vuelos_trabajador": vuelos_trabajador,
+        "region_trabajadores": region_trabajadores,
+        "use_plane_trabajadores": use_plane_trabajadores,
+        "use_bus_trabajadores": use_bus_trabajadores,
+        "subida_trabajadores": subida_trabajadores,
+        "region_trabajadores_comerciales": region_trabajadores_comerciales,
+        "use_plane_trabajadores_comerciales": use_plane_trabajadores_comerciales,
+        "use_bus_trabajadores_comerciales": use_bus_trabajadores_comerciales,
+        "subida_trabajadores_comerciales": subida_trabajadores_comerciales,
+        "tiempo_indice": tiempo_indice,
+    }
+
+
+# -------------------------
+# Modelo OR-Tools
+# -------------------------
+# Construye el modelo para un subconjunto de trabajadores, buses y vuelos (una componente
+# del grafo de compatibilidad, o el turno completo).
+def construir_modelo(contexto, trabajadores, trabajadores_comerciales, buses, vuelos, vuelos_comerciales):
+    buses_trabajador, vuelos_trabajador = contexto["buses_trabajador"], contexto["vuelos_trabajador"]
+    use_bus_trabajadores, use_plane_trabajadores = contexto["use_bus_trabajadores"], contexto["use_plane_trabajadores"]
+    use_bus_trabajadores_comerciales = contexto["use_bus_trabajadores_comerciales"]
+    use_plane_trabajadores_comerciales = contexto["use_plane_trabajadores_comerciales"]
+    subida_trabajadores, subida_trabajadores_comerciales = contexto["subida_trabajadores"], contexto["subida_trabajadores_comerciales"]
+    CB, CV, C_CP = contexto["CB"], contexto["CV"], contexto["C_CP"]
+    HV, HV_bajada, H_CP, H_CP_bajada = contexto["HV"], contexto["HV_bajada"], contexto["H_CP"], contexto["H_CP_bajada"]
+    min_hora, max_hora, margen_desfase = contexto["min_hora"], contexto["max_hora"], contexto["margen_desfase"]
+    espera_conexion_subida, espera_conexion_bajada = contexto["espera_conexion_subida"], contexto["espera_conexion_bajada"]
+    formulacion_espera = contexto["formulacion_espera"]
+
+    model = cp_model.CpModel()
+
+    #Restricciones y Variables
+    x = {}
+    y = {}
+    z = {}
+    HB_var = {}
+    x_por_bus = defaultdict(list)
+    y_por_vuelo = defaultdict(list)
+    z_por_vuelo = defaultdict(list)
+
+    for t in trabajadores:
+        for b in buses_trabajador[t]:
+            x[(t, b)] = model.NewBoolVar(f'x_{t}_{b}')
+            x_por_bus[b].append(x[(t, b)])
+        for v in vuelos_trabajador[t]:
+            y[(t, v)] = model.NewBoolVar(f'y_{t}_{v}')
+            y_por_vuelo[v].append(y[(t, v)])
+
+    for tc in trabajadores_comerciales:
+        for b in buses_trabajador[tc]:
+            x[(tc, b)] = model.NewBoolVar(f'x_{tc}_{b}')
+            x_por_bus[b].append(x[(tc, b)])
+        for vc in vuelos_trabajador[tc]:
+            z[(tc, vc)] = model.NewBoolVar(f'z_{tc}_{vc}')
+            z_por_vuelo[vc].append(z[(tc, vc)])
+
+    # Restricción: use bus y use vuelo por trabajador según región
+    # (si no hay buses o vuelos compatibles la suma vacía vuelve el modelo infactible, igual que antes)
+    for t in trabajadores:
+        model.Add(sum(x[(t, b)] for b in buses_trabajador[t]) == use_bus_trabajadores[t])
+        model.Add(sum(y[(t, v)] for v in vuelos_trabajador[t]) == use_plane_trabajadores[t])
+
+    for tc in trabajadores_comerciales:
+        model.Add(sum(x[(tc, b)] for b in buses_trabajador[tc]) == use_bus_trabajadores_comerciales[tc])
+        model.Add(sum(z[(tc, vc)] for vc in vuelos_trabajador[tc]) == use_plane_trabajadores_comerciales[tc])
+
+    # Restricción: capacidad buses y vuelos
+    for b in buses:
+        model.Add(sum(x_por_bus[b]) <= CB[b])
+        HB_var[b] = model.NewIntVar(min_hora-espera_conexion_subida-margen_desfase, max_hora+espera_conexion_bajada+margen_desfase, f'HB_{b}')
+    for v in vuelos:
+        model.Add(sum(y_por_vuelo[v]) <= CV[v])
+    for vc in vuelos_comerciales:
+        model.Add(sum(z_por_vuelo[vc]) <= C_CP[vc])
+
+    # Restricción de conexión temporal (solo pares compatibles)
+    # En POR_TRABAJADOR la conexión se impone sobre la espera de cada trabajador (ver función objetivo)
+    if formulacion_espera == "COMBINACIONES":
+        for t in trabajadores:
+            subida = subida_trabajadores[t]
+            for v in vuelos_trabajador[t]:
+                for b in buses_trabajador[t]:
+                    if subida:
+                        model.Add(HB_var[b] + espera_conexion_subida <= HV[v]).OnlyEnforceIf([x[(t, b)], y[(t, v)]])
+                    else:
+                        model.Add(HB_var[b] >= HV_bajada[v] + espera_conexion_bajada).OnlyEnforceIf([x[(t, b)], y[(t, v)]])
+
+        for t in trabajadores_comerciales:
+            subida = subida_trabajadores_comerciales[t]
+            for v in vuelos_trabajador[t]:
+                for b in buses_trabajador[t]:
+                    if subida:
+                        model.Add(HB_var[b] + espera_conexion_subida <= H_CP[v]).OnlyEnforceIf([x[(t, b)], z[(t, v)]])
+                    else:
+                        model.Add(HB_var[b] >= H_CP_bajada[v] + espera_conexion_bajada).OnlyEnforceIf([x[(t, b)], z[(t, v)]])
+
+    # -------------------------
+    # Función objetivo: minimizar espera
+    # -------------------------
+    espera_total = []
+    comb_vars = {}
+    if formulacion_espera == "COMBINACIONES":
+        for t in trabajadores:
+            if use_plane_trabajadores[t] == 1 and use_bus_trabajadores[t] == 1:
+                subida = subida_trabajadores[t]
+                for b in buses_trabajador[t]:
+                    for v in vuelos_trabajador[t]:
+                        # Crear la variable de diferencia
+                        diff_expr = HV[v] - HB_var[b] if subida else HB_var[b] - HV_bajada[v]
+
+                        # Crear variable de combinación
+                        comb = model.NewBoolVar(f'c_{t}_{b}_{v}')
+                        comb_vars[(t, b, v)] = comb
+                        model.AddBoolAnd([x[(t, b)], y[(t, v)]]).OnlyEnforceIf(comb)
+                        model.AddBoolOr([x[(t, b)].Not(), y[(t, v)].Not()]).OnlyEnforceIf(comb.Not())
+
+                        # Crear variable de espera condicional
+                        espera = model.NewIntVar(-1440, 1440, f'espera_{t}_{b}_{v}')
+                        model.Add(espera == diff_expr).OnlyEnforceIf(comb)
+                        model.Add(espera == 0).OnlyEnforceIf(comb.Not())
+
+                        # Agregar a la función objetivo
+                        espera_total.append(espera)
+
+        for t in trabajadores_comerciales:
+            if use_plane_trabajadores_comerciales[t] == 1 and use_bus_trabajadores_comerciales[t] == 1:
+                subida = subida_trabajadores_comerciales[t]
+                for b in buses_trabajador[t]:
+                    for v in vuelos_trabajador[t]:
+                        # Crear la variable de diferencia
+                        diff_expr = H_CP[v] - HB_var[b] if subida else HB_var[b] - H_CP_bajada[v]
+
+                        # Crear variable de combinación
+                        comb = model.NewBoolVar(f'c_{t}_{b}_{v}')
+                        comb_vars[(t, b, v)] = comb
+                        model.AddBoolAnd([x[(t, b)], z[(t, v)]]).OnlyEnforceIf(comb)
+                        model.AddBoolOr([x[(t, b)].Not(), z[(t, v)].Not()]).OnlyEnforceIf(comb.Not())
+
+                        # Crear variable de espera condicional
+                        espera = model.NewIntVar(-1440, 1440, f'espera_{t}_{b}_{v}')
+                        model.Add(espera == diff_expr).OnlyEnforceIf(comb)
+                        model.Add(espera == 0).OnlyEnforceIf(comb.Not())
+
+                        # Agregar a la función objetivo
+                        espera_total.append(espera)
+
+    else:
+        # Hora del bus elegido: una restricción por bus compatible (HB_t == HB_b si x[t, b]).
+        # Hora del vuelo elegido: expresión lineal sobre y/z, ya que se elige exactamente un vuelo.
+        horas_modelo = list(HV.values()) + list(HV_bajada.values()) + list(H_CP.values()) + list(H_CP_bajada.values())
+        hb_min = min_hora-espera_conexion_subida-margen_desfase
+        hb_max = max_hora+espera_conexion_bajada+margen_desfase
+        cota_espera = max(horas_modelo + [hb_max]) - min(horas_modelo + [hb_min])
+
+        def espera_trabajador(t, subida, var_vuelo, hora_subida, hora_bajada):
+            buses_t = buses_trabajador[t]
+            if len(buses_t) == 1:
+                hb_t = HB_var[buses_t[0]]
+            else:
+                hb_t = model.NewIntVar(hb_min, hb_max, f'HB_t_{t}')
+                for b in buses_t:
+                    model.Add(hb_t == HB_var[b]).OnlyEnforceIf(x[(t, b)])
+
+            if subida:
+                hv_t = sum(hora_subida[v] * var_vuelo[(t, v)] for v in vuelos_trabajador[t])
+                espera = model.NewIntVar(espera_conexion_subida, max(espera_conexion_subida, cota_espera), f'espera_{t}')
+                model.Add(espera == hv_t - hb_t)
+            else:
+                hv_t = sum(hora_bajada[v] * var_vuelo[(t, v)] for v in vuelos_trabajador[t])
+                espera = model.NewIntVar(espera_conexion_bajada, max(espera_conexion_bajada, cota_espera), f'espera_{t}')
+                model.Add(espera == hb_t - hv_t)
+            return espera
+
+        for t in trabajadores:
+            if use_plane_trabajadores[t] == 1 and use_bus_trabajadores[t] == 1 and buses_trabajador[t] and vuelos_trabajador[t]:
+                espera_total.append(espera_trabajador(t, subida_trabajadores[t], y, HV, HV_bajada))
+
+        for t in trabajadores_comerciales:
+            if use_plane_trabajadores_comerciales[t] == 1 and use_bus_trabajadores_comerciales[t] == 1 and buses_trabajador[t] and vuelos_trabajador[t]:
+                espera_total.append(espera_trabajador(t, subida_trabajadores_comerciales[t], z, H_CP, H_CP_bajada))
+
+    model.Minimize(sum(espera_total))
+    return model, x, y, z, HB_var, comb_vars, espera_total
+
+# Modelo agregado: los trabajadores indistinguibles se agrupan en clases y cada clase k tiene
+# variables enteras "cuántos van en el bus b" (X), "cuántos van en el vuelo v" (V) y, si combinan
+# bus y avión, "cuántos combinan b con v" (W). La espera total se calcula como
+# sum(W * hora_vuelo) - sum(HB_b * pasajeros_b), con un único producto por bus y sentido.
+def construir_modelo_agregado(contexto, trabajadores, trabajadores_comerciales, buses, vuelos, vuelos_comerciales):
+    buses_trabajador, vuelos_trabajador = contexto["buses_trabajador"], contexto["vuelos_trabajador"]
+    use_bus_trabajadores, use_plane_trabajadores = contexto["use_bus_trabajadores"], contexto["use_plane_trabajadores"]
+    use_bus_trabajadores_comerciales = contexto["use_bus_trabajadores_comerciales"]
+    use_plane_trabajadores_comerciales = contexto["use_plane_trabajadores_comerciales"]
+    subida_trabajadores, subida_trabajadores_comerciales = contexto["subida_trabajadores"], contexto["subida_trabajadores_comerciales"]
+    CB, CV, C_CP = contexto["CB"], contexto["CV"], contexto["C_CP"]
+    HV, HV_bajada, H_CP, H_CP_bajada = contexto["HV"], contexto["HV_bajada"], contexto["H_CP"], contexto["H_CP_bajada"]
+    min_hora, max_hora, margen_desfase = contexto["min_hora"], contexto["max_hora"], contexto["margen_desfase"]
+    espera_conexion_subida, espera_conexion_bajada = contexto["espera_conexion_subida"], contexto["espera_conexion_bajada"]
+
+    model = cp_model.CpModel()
+
+    HB_var = {}
+    X = {}
+    V = {}
+    W = {}
+    X_por_bus = defaultdict(list)
+    V_por_vuelo = defaultdict(list)
+    pasajeros_conexion = defaultdict(list)
+    espera_vuelos = []
+    clases = []
+
+    hb_min = min_hora-espera_conexion_subida-margen_desfase
+    hb_max = max_hora+espera_conexion_bajada+margen_desfase
+    for b in buses:
+        HB_var[b] = model.NewIntVar(hb_min, hb_max, f'HB_{b}')
+
+    grupos = (
+        (trabajadores, False, subida_trabajadores, use_bus_trabajadores, use_plane_trabajadores),
+        (trabajadores_comerciales, True, subida_trabajadores_comerciales, use_bus_trabajadores_comerciales, use_plane_trabajadores_comerciales),
+    )
+    for grupo, comercial, subida_g, use_bus_g, use_plane_g in grupos:
+        firma = lambda t: (tuple(buses_trabajador[t]), tuple(vuelos_trabajador[t]), bool(subida_g[t]), use_bus_g[t], use_plane_g[t])
+        for k, miembros in agrupar_trabajadores_identicos(grupo, firma).items():
+            n = len(miembros)
+            clase = {
+                "id": k,
+                "miembros": miembros,
+                "comercial": comercial,
+                "subida": bool(subida_g[k]),
+                "use_bus": use_bus_g[k],
+                "use_plane": use_plane_g[k],
+                "buses": buses_trabajador[k],
+                "vuelos": vuelos_trabajador[k],
+            }
+            clases.append(clase)
+
+            for b in clase["buses"]:
+                X[(k, b)] = model.NewIntVar(0, n, f'X_{k}_{b}')
+                X_por_bus[b].append(X[(k, b)])
+            for v in clase["vuelos"]:
+                V[(k, v)] = model.NewIntVar(0, n, f'V_{k}_{v}')
+                V_por_vuelo[v].append(V[(k, v)])
+
+            model.Add(sum(X[(k, b)] for b in clase["buses"]) == n * clase["use_bus"])
+            model.Add(sum(V[(k, v)] for v in clase["vuelos"]) == n * clase["use_plane"])
+
+            if not (clase["use_bus"] == 1 and clase["use_plane"] == 1):
+                continue
+
+            subida = clase["subida"]
+            if comercial:
+                hora_vuelo = H_CP if subida else H_CP_bajada
+            else:
+                hora_vuelo = HV if subida else HV_bajada
+
+            for b in clase["buses"]:
+                for v in clase["vuelos"]:
+                    W[(k, b, v)] = model.NewIntVar(0, n, f'W_{k}_{b}_{v}')
+                    activo = model.NewBoolVar(f'A_{k}_{b}_{v}')
+                    model.Add(W[(k, b, v)] <= n * activo)
+                    if subida:
+                        model.Add(HB_var[b] + espera_conexion_subida <= hora_vuelo[v]).OnlyEnforceIf(activo)
+                    else:
+                        model.Add(HB_var[b] >= hora_vuelo[v] + espera_conexion_bajada).OnlyEnforceIf(activo)
+                    espera_vuelos.append((hora_vuelo[v] if subida else -hora_vuelo[v]) * W[(k, b, v)])
+
+            for b in clase["buses"]:
+                model.Add(sum(W[(k, b, v)] for v in clase["vuelos"]) == X[(k, b)])
+                pasajeros_conexion[(b, subida)].append(X[(k, b)])
+            for v in clase["vuelos"]:
+                model.Add(sum(W[(k, b, v)] for b in clase["buses"]) == V[(k, v)])
+
+    # Restricción: capacidad buses y vuelos
+    for b in buses:
+        model.Add(sum(X_por_bus[b]) <= CB[b])
+    for v in vuelos:
+        model.Add(sum(V_por_vuelo[v]) <= CV[v])
+    for vc in vuelos_comerciales:
+        model.Add(sum(V_por_vuelo[vc]) <= C_CP[vc])
+
+    # Término HB_b * pasajeros_b de la espera (uno por bus y sentido)
+    espera_buses = []
+    for (b, subida), lista in pasajeros_conexion.items():
+        pasajeros = model.NewIntVar(0, CB[b], f'N_{b}_{int(subida)}')
+        model.Add(pasajeros == sum(lista))
+        extremos = [hb_min * CB[b], hb_max * CB[b], 0]
+        producto = model.NewIntVar(min(extremos), max(extremos), f'P_{b}_{int(subida)}')
+        model.AddMultiplicationEquality(producto, [HB_var[b], pasajeros])
+        espera_buses.append(-producto if subida else producto)
+
+    model.Minimize(sum(espera_vuelos) + sum(espera_buses))
+    return model, X, V, W, HB_var, clases
+
+# Modo incremental: el plan anterior entra como hint y, si se pide, los trabajadores no
+# modificados quedan fijos. Se guarda una copia sin fijar de cada subproblema por si la
+# fijación lo vuelve infactible (por ejemplo, si se redujo la capacidad de un vuelo).
+def hints_plan_anterior(contexto, model, x_c, y_c, z_c, HB_c):
+    plan_anterior = contexto["plan_anterior"]
+    agregar_hints(model, x_c, plan_anterior["bus"])
+    agregar_hints(model, y_c, plan_anterior["vuelo"])
+    agregar_hints(model, z_c, plan_anterior["vuelo_comercial"])
+    # Mismo dominio de HB_var que en construir_modelo / construir_modelo_agregado
+    hb_min = contexto["min_hora"]-contexto["espera_conexion_subida"]-contexto["margen_desfase"]
+    hb_max = contexto["max_hora"]+contexto["espera_conexion_bajada"]+contexto["margen_desfase"]
+    buses_con_asignacion_anterior = set(plan_anterior["bus"].values())
+    for b, var in HB_c.items():
+        hora = plan_anterior["hora_bus"].get(b)
+        if b in buses_con_asignacion_anterior and hb_min <= hora <= hb_max:
+            model.AddHint(var, hora)
+
+def fijar_plan_anterior(contexto, model, x_c, y_c, z_c):
+    plan_anterior, trabajadores_fijos = contexto["plan_anterior"], contexto["trabajadores_fijos"]
+    fijar_asignaciones(model, x_c, plan_anterior["bus"], trabajadores_fijos)
+    fijar_asignaciones(model, y_c, plan_anterior["vuelo"], trabajadores_fijos)
+    fijar_asignaciones(model, z_c, plan_anterior["vuelo_comercial"], trabajadores_fijos)
+
+def cantidades_plan_anterior(contexto, X_c, V_c, W_c, clases_c, miembros_filtrados=None):
+    # (variable agregada, cuántos miembros de la clase tenían ese bus / vuelo / par en el plan anterior)
+    plan_anterior, vuelo_anterior = contexto["plan_anterior"], contexto["vuelo_anterior"]
+    par_anterior = {t: (plan_anterior["bus"].get(t), vuelo_anterior.get(t)) for t in plan_anterior["bus"]}
+    for clase in clases_c:
+        k, miembros = clase["id"], clase["miembros"]
+        por_bus = cantidades_clase(miembros, plan_anterior["bus"], miembros_filtrados)
+        por_vuelo = cantidades_clase(miembros, vuelo_anterior, miembros_filtrados)
+        for b in clase["buses"]:
+            yield X_c[(k, b)], por_bus.get(b, 0)
+        for v in clase["vuelos"]:
+            yield V_c[(k, v)], por_vuelo.get(v, 0)
+        if clase["use_bus"] == 1 and clase["use_plane"] == 1:
+            por_par = cantidades_clase(miembros, par_anterior, miembros_filtrados)
+            for b in clase["buses"]:
+                for v in clase["vuelos"]:
+                    yield W_c[(k, b, v)], por_par.get((b, v), 0)
+
+def hints_plan_anterior_agregado(contexto, model, X_c, V_c, W_c, HB_c, clases_c):
+    for var, cantidad in cantidades_plan_anterior(contexto, X_c, V_c, W_c, clases_c):
+        model.AddHint(var, cantidad)
+    hints_plan_anterior(contexto, model, {}, {}, {}, HB_c)
+
+def fijar_plan_anterior_agregado(contexto, model, X_c, V_c, W_c, clases_c):
+    for var, cantidad in cantidades_plan_anterior(contexto, X_c, V_c, W_c, clases_c, contexto["trabajadores_fijos"]):
+        if cantidad:
+            model.Add(var >= cantidad)
+
+
+def construir(contexto, sin_descomposicion=False):
+    # Un modelo por componente conexa (o uno solo con sin_descomposicion). Agrega al contexto los
+    # modelos, sus variables y, en modo incremental con trabajadores fijos, las copias sin fijar.
+    trabajadores, trabajadores_comerciales = contexto["trabajadores"], contexto["trabajadores_comerciales"]
+    buses, vuelos, vuelos_comerciales = contexto["buses"], contexto["vuelos"], contexto["vuelos_comerciales"]
+    agrupar_trabajadores, incremental = contexto["agrupar_trabajadores"], contexto["incremental"]
+    trabajadores_fijos = contexto["trabajadores_fijos"]
+
+    # -------------------------
+    # Descomposición en subproblemas
+    # -------------------------
+    # Los trabajadores solo interactúan a través de buses y vuelos compartidos: cada componente
+    # conexa del grafo de compatibilidad es un modelo independiente.
+    if sin_descomposicion:
+        componentes = [{
+            "trabajadores": trabajadores,
+            "trabajadores_comerciales": trabajadores_comerciales,
+            "buses": buses,
+            "vuelos": vuelos,
+            "vuelos_comerciales": vuelos_comerciales,
+        }]
+    else:
+        componentes = componentes_conexas(trabajadores, trabajadores_comerciales, buses, vuelos, vuelos_comerciales,
+                                          contexto["buses_trabajador"], contexto["vuelos_trabajador"])
+    print(f"\n🧩 Subproblemas independientes: {len(componentes)}")
+
+    inicio_modelo = time.time()
+    modelos = []
+    modelos_libres = []
+    variables_componentes = []
+    x, y, z, HB_var, comb_vars, espera_total = {}, {}, {}, {}, {}, []
+    X, V, W, clases = {}, {}, {}, []
+    for componente in componentes:
+        args_componente = (
+            componente["trabajadores"],
+            componente["trabajadores_comerciales"],
+            componente["buses"],
+            componente["vuelos"],
+            componente["vuelos_comerciales"],
+        )
+        if agrupar_trabajadores:
+            model_c, X_c, V_c, W_c, HB_c, clases_c = construir_modelo_agregado(contexto, *args_componente)
+            if incremental:
+                hints_plan_anterior_agregado(contexto, model_c, X_c, V_c, W_c, HB_c, clases_c)
+            if trabajadores_fijos:
+                modelos_libres.append(model_c.Clone())
+                fijar_plan_anterior_agregado(contexto, model_c, X_c, V_c, W_c, clases_c)
+            variables_componentes.append([*X_c.values(), *V_c.values(), *W_c.values(), *HB_c.values()])
+            X.update(X_c)
+            V.update(V_c)
+            W.update(W_c)
+            clases.extend(clases_c)
+        else:
+            model_c, x_c, y_c, z_c, HB_c, comb_c, espera_c = construir_modelo(contexto, *args_componente)
+            if incremental:
+                hints_plan_anterior(contexto, model_c, x_c, y_c, z_c, HB_c)
+            if trabajadores_fijos:
+                modelos_libres.append(model_c.Clone())
+                fijar_plan_anterior(contexto, model_c, x_c, y_c, z_c)
+            variables_componentes.append([*x_c.values(), *y_c.values(), *z_c.values(), *HB_c.values()])
+            x.update(x_c)
+            y.update(y_c)
+            z.update(z_c)
+            comb_vars.update(comb_c)
+            espera_total.extend(espera_c)
+        modelos.append(model_c)
+        HB_var.update(HB_c)
+    tiempo_modelo = time.time() - inicio_modelo
+
+    # Chequeo: variables que fueron creadas (entre paréntesis, las que crearía el modelo denso)
+    CB, CVtotal, C_CP = contexto["CB"], contexto["CVtotal"], contexto["C_CP"]
+    df_trabajadores_no_asignados = contexto["df_trabajadores_no_asignados"]
+    x_densas = (len(trabajadores) + len(trabajadores_comerciales)) * len(buses)
+    y_densas = len(trabajadores) * len(vuelos)
+    z_densas = len(trabajadores_comerciales) * len(vuelos_comerciales)
+    print(f"\n🏗️ Modelo construido en {tiempo_modelo:.3f} segundos")
+    print(f"📦 Variables x creadas: {len(x)} (denso: {x_densas})")
+    print(f"📦 Variables y creadas: {len(y)} (denso: {y_densas})")
+    print(f"📦 Variables z creadas: {len(z)} (denso: {z_densas})")
+    print(f"📦 Variables HB_var creadas: {len(HB_var)}")
+    print(f"📦 Variables comb creadas: {len(comb_vars)}")
+    print(f"📦 Variables espera creadas: {len(espera_total)}")
+    if agrupar_trabajadores:
+        print(f"📦 Clases de trabajadores idénticos: {len(clases)} (de {len(trabajadores) + len(trabajadores_comerciales)} trabajadores)")
+        print(f"📦 Variables agregadas X/V/W creadas: {len(X)}/{len(V)}/{len(W)}")
+
+    print("🔍 Total trabajadores:", len(trabajadores)+len(trabajadores_comerciales)+len(df_trabajadores_no_asignados))
+    print("   - Total trabajadores (vuelos charter):", len(trabajadores))
+    print("   - Total trabajadores (vuelos comerciales):", len(trabajadores_comerciales))
+    print("   - Total trabajadores (sin vuelos):", len(df_trabajadores_no_asignados))
+    print("🔍 Total buses:", len(buses))
+    print("🔍 Total vuelos:", len(vuelos)+len(vuelos_comerciales))
+    print("   - Total vuelos charter:", len(vuelos))
+    print("   - Total vuelos comerciales:", len(vuelos_comerciales))
+    print("🔍 Capacidad total buses:", sum(CB.values()))
+    print("🔍 Capacidad total vuelos:", sum(CVtotal.values())+sum(C_CP.values()))
+    print("   - Capacidad vuelos charter:", sum(CVtotal.values()))
+    print("   - Capacidad vuelos comerciales:", sum(C_CP.values()))
+
+    contexto.update(
+        modelos=modelos, modelos_libres=modelos_libres, variables_componentes=variables_componentes,
+        x=x, y=y, z=z, HB_var=HB_var, comb_vars=comb_vars, espera_total=espera_total,
+        X=X, V=V, W=W, clases=clases, componentes=componentes, tiempo_modelo=tiempo_modelo,
+    )
+    return contexto
+
+
+# -------------------------
+# Resolver
+# -------------------------
+# Sin objetivo la hora de los buses queda libre y extraer_solucion descarta a los trabajadores
+# comerciales cuya espera supera max_espera_permitida. La copia de factibilidad minimiza cuántos
+# quedan así: "fuera" marca al trabajador (o, en el modelo agregado, cuántos de la clase) cuyo par
+# bus + vuelo no respeta la espera máxima.
+def penalizar_espera_comerciales(contexto, model, componente):
+    buses_trabajador, vuelos_trabajador = contexto["buses_trabajador"], contexto["vuelos_trabajador"]
+    subida_trabajadores_comerciales = contexto["subida_trabajadores_comerciales"]
+    H_CP, H_CP_bajada, HB_var = contexto["H_CP"], contexto["H_CP_bajada"], contexto["HB_var"]
+    max_espera = contexto["max_espera_permitida"]
+
+    def espera_aceptable(b, v, subida):
+        if subida:
+            return HB_var[b] + max_espera >= H_CP[v]
+        return H_CP_bajada[v] + max_espera >= HB_var[b]
+
+    fuera_total = []
+    if contexto["agrupar_trabajadores"]:
+        W = contexto["W"]
+        ids = set(componente["trabajadores_comerciales"])
+        for clase in contexto["clases"]:
+            k, n = clase["id"], len(clase["miembros"])
+            if not (clase["comercial"] and k in ids and clase["use_bus"] == 1 and clase["use_plane"] == 1):
+                continue
+            for b in clase["buses"]:
+                for v in clase["vuelos"]:
+                    aceptable = model.NewBoolVar(f'OK_{k}_{b}_{v}')
+                    fuera = model.NewIntVar(0, n, f'F_{k}_{b}_{v}')
+                    model.Add(espera_aceptable(b, v, clase["subida"])).OnlyEnforceIf(aceptable)
+                    model.Add(W[(k, b, v)] <= fuera + n * aceptable)
+                    fuera_total.append(fuera)
+    else:
+        x, z = contexto["x"], contexto["z"]
+        for t in componente["trabajadores_comerciales"]:
+            if not (contexto["use_bus_trabajadores_comerciales"][t] == 1 and contexto["use_plane_trabajadores_comerciales"][t] == 1):
+                continue
+            fuera = model.NewBoolVar(f'F_{t}')
+            for b in buses_trabajador[t]:
+                for v in vuelos_trabajador[t]:
+                    model.Add(espera_aceptable(b, v, subida_trabajadores_comerciales[t])).OnlyEnforceIf([x[(t, b)], z[(t, v)], fuera.Not()])
+            fuera_total.append(fuera)
+
+    if fuera_total:
+        model.Minimize(sum(fuera_total))
+    return model
+
+
+def resolver(contexto, factibilidad=False, max_tiempo=None):
+    # factibilidad: resuelve copias de los modelos sin la espera como objetivo (solo la penalización
+    # de penalizar_espera_comerciales); la espera se evalúa después sobre los modelos originales.
+    # max_tiempo: sobrescribe max_tiempo_ejecucion (presupuesto de una fase).
+    max_tiempo_ejecucion, hilos_busqueda = max_tiempo or contexto["max_tiempo_ejecucion"], contexto["hilos_busqueda"]
+    parametros_solver = contexto["parametros_solver"]
+    modelos, modelos_libres = contexto["modelos"], contexto["modelos_libres"]
+    if factibilidad:
+        componentes = contexto["componentes"]
+        modelos = [penalizar_espera_comerciales(contexto, modelo_factibilidad(m), c) for m, c in zip(modelos, componentes)]
+        modelos_libres = [penalizar_espera_comerciales(contexto, modelo_factibilidad(m), c) for m, c in zip(modelos_libres, componentes)]
+
+    # Tiempo límite y estadísticas iniciales
+    print(f"\n🧠 Tiempo límite de resolución{' (solo factibilidad)' if factibilidad else ''}: "
+          f"{float(max_tiempo_ejecucion)} segundos")
+    print(f"⚙️ Workers: {hilos_busqueda or 'todos los núcleos'} | gap relativo: {parametros_solver['gap_relativo']} "
+          f"| gap absoluto: {parametros_solver['gap_absoluto']} | semilla: {parametros_solver['semilla']} "
+          f"| presolve: {parametros_solver['nivel_presolve']}")
+    print("📈 Comenzando resolución...")
+
+    def resolver_subproblemas(modelos_a_resolver):
+        if len(modelos_a_resolver) == 1:
+            return [resolver_modelo(modelos_a_resolver[0], max_tiempo_ejecucion, hilos_busqueda, parametros_solver)]
+        return resolver_en_paralelo(modelos_a_resolver, max_tiempo_ejecucion, num_workers_total=hilos_busqueda,
+                                    parametros_solver=parametros_solver)
+
+    inicio_resolucion = time.time()
+    resultados = resolver_subproblemas(modelos)
+
+    # Subproblemas que la fijación volvió infactibles se resuelven de nuevo sin fijar (solo con hints)
+    if contexto["trabajadores_fijos"]:
+        sin_solucion = [i for i, r in enumerate(resultados) if r["estado"] not in ESTADOS_CON_SOLUCION]
+        if sin_solucion:
+            print(f"⚠️ {len(sin_solucion)} subproblema(s) sin solución con trabajadores fijos; se resuelven sin fijar")
+            resultados_libres = resolver_subproblemas([modelos_libres[i] for i in sin_solucion])
+            for i, resultado in zip(sin_solucion, resultados_libres):
+                resultados[i] = resultado
+    tiempo_resolucion = time.time() - inicio_resolucion
+
+    # Combinar soluciones: el turno es factible solo si lo son todos los subproblemas
+    estados = [r["estado"] for r in resultados]
+    fallidos = [e for e in estados if e not in ESTADOS_CON_SOLUCION]
+    if fallidos:
+        status = fallidos[0]
+    elif all(e == cp_model.OPTIMAL for e in estados):
+        status = cp_model.OPTIMAL
+    else:
+        status = cp_model.FEASIBLE
+
+    valores = {}
+    objetivo = None
+    cota = None
+    gap_obtenido = None
+    if not fallidos and factibilidad:
+        # Sin la espera como objetivo no hay cota ni gap: solo se informa la espera de la solución
+        status = cp_model.FEASIBLE
+        objetivo = sum(evaluar_objetivo(m, r["solucion"]) for m, r in zip(contexto["modelos"], resultados))
+    elif not fallidos:
+        objetivo = sum(r["objetivo"] for r in resultados)
+        cota = sum(r["cota"] for r in resultados)
+        gap_obtenido = abs(objetivo - cota) / max(1.0, abs(objetivo))
+    if not fallidos:
+        for variables_c, resultado in zip(contexto["variables_componentes"], resultados):
+            for var in variables_c:
+                valores[var.Name()] = resultado["solucion"][var.Index()]
+
+    contexto.update(status=status, objetivo=objetivo, cota=cota, gap_obtenido=gap_obtenido, valores=valores,
+                    tiempo_resolucion=tiempo_resolucion, cpu_subprocesos=sum(r.get("cpu", 0.0) for r in resultados))
+    return contexto
+
+
+def hints_solucion(contexto):
+    # Reemplaza los hints de cada subproblema (y de su copia sin fijar) por la última solución encontrada
+    modelos, modelos_libres, valores = contexto["modelos"], contexto["modelos_libres"], contexto["valores"]
+    for i, variables_c in enumerate(contexto["variables_componentes"]):
+        for model in [modelos[i], *(modelos_libres[i:i + 1] if modelos_libres else [])]:
+            model.ClearHints()
+            for var in variables_c:
+                model.AddHint(var, valores[var.Name()])
+
+
+def estadisticas(contexto):
+    # Resumen del modelo y la resolución (lo que resolver_modelo.py escribe con --stats-json)
+    modelos = contexto["modelos"]
+    return {
+        "turnoId": contexto["turno_id"],
+        "formulacion_espera": contexto["formulacion_espera"],
+        "agrupar_trabajadores": bool(contexto["agrupar_trabajadores"]),
+        "trabajadores": len(contexto["trabajadores"]) + len(contexto["trabajadores_comerciales"]),
+        "buses": len(contexto["buses"]),
+        "vuelos": len(contexto["vuelos"]) + len(contexto["vuelos_comerciales"]),
+        "subproblemas": len(modelos),
+        "variables": sum(len(m.Proto().variables) for m in modelos),
+        "restricciones": sum(len(m.Proto().constraints) for m in modelos),
+        "tiempo_indice": contexto["tiempo_indice"],
+        "tiempo_modelo": contexto["tiempo_modelo"],
+        "tiempo_resolucion": contexto["tiempo_resolucion"],
+        "incremental": contexto["incremental"],
+        "trabajadores_fijos": len(contexto["trabajadores_fijos"]),
+        "estado": cp_model.CpSolver().StatusName(contexto["status"]),
+        "objetivo": contexto["objetivo"],
+        "gap_obtenido": contexto["gap_obtenido"],
+        "poda_dominancia": contexto["poda_dominancia"],
+        "dos_fases": contexto.get("dos_fases"),
+        "hilos_busqueda": contexto["hilos_busqueda"],
+        "parametros_solver": contexto["parametros_solver"],
+    }
+
+
+# -------------------------
+# Extraer solución
+# -------------------------
+def extraer_solucion(contexto):
+    # Asignaciones, horarios de buses y KPIs a guardar. Devuelve None si no hubo solución.
+    if contexto["status"] not in ESTADOS_CON_SOLUCION:
+        print(MENSAJE_SIN_SOLUCION)
+        return None
+
+    turno_id, objetivo = contexto["turno_id"], contexto["objetivo"]
+    trabajadores, trabajadores_comerciales = contexto["trabajadores"], contexto["trabajadores_comerciales"]
+    region_trabajadores = contexto["region_trabajadores"]
+    region_trabajadores_comerciales = contexto["region_trabajadores_comerciales"]
+    subida_trabajadores_comerciales = contexto["subida_trabajadores_comerciales"]
+    H_CP, H_CP_bajada, Precio_CP = contexto["H_CP"], contexto["H_CP_bajada"], contexto["Precio_CP"]
+    buses, HB_var, valores = contexto["buses"], contexto["HB_var"], contexto["valores"]
+    fecha_turno = contexto["fecha_turno"]
+    plan_anterior = contexto["plan_anterior"]
+
+    def valor(var):
+        return valores[var.Name()]
+
+    print("✅ Solución encontrada. Valor objetivo:", objetivo)
+    trabajadores_no_rm = [t for t in trabajadores if region_trabajadores[t] != 13]
+    trabajadores_com_no_rm = [t for t in trabajadores_comerciales if region_trabajadores_comerciales[t] != 13]
+    if trabajadores_no_rm or trabajadores_com_no_rm:
+        espera_promedio = round(objetivo / (len(trabajadores_no_rm)+len(trabajadores_com_no_rm)))
+        print("Espera Promedio:", espera_promedio)
+    else:
+        espera_promedio = 0
+        print("No hay trabajadores fuera de la Región Metropolitana (Región 13)")
+        print("Espera Promedio:", espera_promedio)
+
+    # Se guarda en ParametrosModeloTurno junto con las asignaciones, en la misma transacción
+    # (sin gap conocido, como en la fase de factibilidad, se conserva el valor de la columna)
+    actualizaciones_kpi = [(
+        '''
+        UPDATE "ParametrosModeloTurno"
+        SET    "tiempo_promedio_espera" = %s,
+               "tiempo_resolucion" = %s,
+               "gap_obtenido" = COALESCE(%s, "gap_obtenido")
+        WHERE  "turnoId" = %s
+        ''',
+        (espera_promedio, contexto["tiempo_resolucion"], contexto["gap_obtenido"], turno_id)
+    )]
+
+    # Bus y vuelo elegido por trabajador, y hora optimizada de cada bus
+    hora_bus = {b: valor(HB_var[b]) for b in buses}
+    bus_asignado = {}
+    vuelo_asignado = {}
+
+    if contexto["agrupar_trabajadores"]:
+        X, V, W = contexto["X"], contexto["V"], contexto["W"]
+        # Desagregación determinista: miembros ordenados por id, destinos ordenados por (bus, vuelo)
+        for clase in contexto["clases"]:
+            k = clase["id"]
+            if clase["use_bus"] == 1 and clase["use_plane"] == 1:
+                cantidades = [((b, v), valor(W[(k, b, v)])) for b in sorted(clase["buses"]) for v in sorted(clase["vuelos"])]
+            elif clase["use_bus"] == 1:
+                cantidades = [((b, None), valor(X[(k, b)])) for b in sorted(clase["buses"])]
+            elif clase["use_plane"] == 1:
+                cantidades = [((None, v), valor(V[(k, v)])) for v in sorted(clase["vuelos"])]
+            else:
+                cantidades = []
+            for t, (b, v) in desagregar_clase(clase["miembros"], cantidades).items():
+                if b is not None:
+                    bus_asignado[t] = b
+                if v is not None:
+                    vuelo_asignado[t] = v
+    else:
+        for (t, b), var in contexto["x"].items():
+            if valor(var):
+                bus_asignado[t] = b
+        for (t, v), var in [*contexto["y"].items(), *contexto["z"].items()]:
+            if valor(var):
+                vuelo_asignado[t] = v
+
+    # Asignaciones de bus y avión charter
+    filas_bus = [(t, bus_asignado[t]) for t in trabajadores if t in bus_asignado]
+    filas_avion = [(t, vuelo_asignado[t]) for t in trabajadores if t in vuelo_asignado]
+    filas_comerciales = []
+
+    # Asignaciones de bus y vuelo comercial (si combina ambos, solo cuando la espera es aceptable)
+    kpi_precio_comerciales=0
+    comerciales_descartados = 0
+    for t in trabajadores_comerciales:
+        b = bus_asignado.get(t)
+        v = vuelo_asignado.get(t)
+        if b is not None and v is not None:
+            if subida_trabajadores_comerciales[t]:
+                espera = H_CP[v]-hora_bus[b]
+            else:
+                espera = hora_bus[b]-H_CP_bajada[v]
+            if espera > contexto["max_espera_permitida"]:
+                comerciales_descartados += 1
+                continue
+
+        if b is not None:
+            filas_bus.append((t, b))
+        if v is not None:
+            filas_comerciales.append((t, v))
+            kpi_precio_comerciales+=Precio_CP[v]
+
+    if comerciales_descartados:
+        print(f"⚠️ Trabajadores comerciales sin asignar (espera mayor a {contexto['max_espera_permitida']} min): {comerciales_descartados}")
+    print(f"Costos Vuelos Comerciales: {kpi_precio_comerciales} CLP")
+
+    actualizaciones_kpi.append((
+        '''
+        UPDATE "ParametrosModeloTurno"
+        SET    "costo_vuelos_comerciales" = %s
+        WHERE  "turnoId" = %s
+        ''',
+        (kpi_precio_comerciales, turno_id)
+    ))
+
+    # -------------------------
+    # Horarios optimizados de buses
+    # -------------------------
+    # La duración de cada bus sale de la tabla local de comunas (recorrido por sus paradas hasta el
+    # aeropuerto); si alguna comuna no está en la tabla se usa tiempo_promedio_bus de la región
+    df_buses = contexto["df_buses"]
+    coordenadas = cargar_coordenadas()
+    paradas_bus = {
+        b: origen if "subida" in b.lower() else destino
+        for b, origen, destino in zip(df_buses["id"], df_buses["comunas_origen"], df_buses["comunas_destino"])
+    }
+    horarios_buses = []
+    for b in buses:
+        region = contexto["region_por_id"].get(b)
+        duracion = duracion_bus(paradas_bus[b], coordenadas, contexto["tiempo_adicional_parada"],
+                                contexto["duracion_por_region"].get(region, 60))
+
+        if "subida" in b.lower():
+            horario_llegada_min = hora_bus[b]
+            horario_llegada = datetime.combine(fecha_turno.date(), datetime.min.time()) + timedelta(minutes=horario_llegada_min)
+            horario_salida = horario_llegada - timedelta(minutes=duracion)
+
+        elif "bajada" in b.lower():
+            horario_salida_min = hora_bus[b]
+            horario_salida = datetime.combine(fecha_turno.date(), datetime.min.time()) + timedelta(minutes=horario_salida_min)
+            horario_llegada = horario_salida + timedelta(minutes=duracion)
+
+        horarios_buses.append((b, horario_salida, horario_llegada))
+
+    # En modo incremental solo se escriben las diferencias con el plan anterior: las asignaciones
+    # que no cambiaron conservan su fila (y el estado de las de vuelos comerciales). Lo mismo con
+    # el plan que ya escribió la fase de factibilidad en la resolución en dos fases.
+    plan = {"bus": dict(filas_bus), "vuelo": dict(filas_avion), "vuelo_comercial": dict(filas_comerciales)}
+    base = contexto.get("plan_escrito")
+    if base is None and contexto["incremental"]:
+        base = plan_anterior
+    asignaciones_eliminadas = None
+    if base is not None:
+        # Los trabajadores con avión asignado a mano no estuvieron en el modelo: sus filas se conservan
+        fijados_a_mano = set(plan_anterior["vuelo_manual"]) if plan_anterior else set()
+        asignaciones_eliminadas = {}
+        for tabla, nuevas, anterior in (
+            ("AssignmentBus", filas_bus, base["bus"]),
+            ("AssignmentPlane", filas_avion, base["vuelo"]),
+            ("AssignmentCommercialPlane", filas_comerciales, base["vuelo_comercial"]),
+        ):
+            pares_nuevos = set(nuevas)
+            pares_anteriores = set(anterior.items())
+            asignaciones_eliminadas[tabla] = [
+                par for par in anterior.items() if par not in pares_nuevos and par[0] not in fijados_a_mano
+            ]
+            nuevas[:] = [par for par in nuevas if par not in pares_anteriores]
+
+    return {
+        "filas_bus": filas_bus,
+        "filas_avion": filas_avion,
+        "filas_comerciales": filas_comerciales,
+        "horarios_buses": horarios_buses,
+        "actualizaciones_kpi": actualizaciones_kpi,
+        "asignaciones_eliminadas": asignaciones_eliminadas,
+        "plan": plan,
+        "comerciales_descartados": comerciales_descartados,
+        "espera_promedio": espera_promedio,
+        "costo_vuelos_comerciales": kpi_precio_comerciales,
+    }
+
+
+# -------------------------
+# Guardar Resultados
+# -------------------------
+def guardar(conn, turno_id, solucion):
+    # Todo el turno se escribe en una sola transacción
+    escritura = guardar_resultados(
+        conn, solucion["filas_bus"], solucion["filas_avion"], solucion["filas_comerciales"],
+        solucion["horarios_buses"], solucion["actualizaciones_kpi"], solucion["asignaciones_eliminadas"]
+    )
+    print(f"✈️🚌 Asignaciones insertadas exitosamente para el turno {turno_id}")
+    print("💾 Filas escritas: " + ", ".join(f"{tabla} {n}" for tabla, n in escritura["filas"].items())
+          + f" en {escritura['tiempo']:.3f} segundos")
+    if escritura["eliminadas"]:
+        print("🗑️ Filas eliminadas: " + ", ".join(f"{tabla} {n}" for tabla, n in escritura["eliminadas"].items()))
+    return escritura
+
+
+# -------------------------
+# Resolución en dos fases
+# -------------------------
+def actualizar_kpis_resolucion(conn, contexto):
+    # Tiempo y gap de la resolución cuando el plan guardado no cambia
+    guardar_resultados(conn, [], [], [], [], sentencias_previas=[(
+        '''
+        UPDATE "ParametrosModeloTurno"
+        SET    "tiempo_resolucion" = %s,
+               "gap_obtenido" = COALESCE(%s, "gap_obtenido")
+        WHERE  "turnoId" = %s
+        ''',
+        (contexto["tiempo_resolucion"], contexto["gap_obtenido"], contexto["turno_id"])
+    )])
+
+
+def resolver_dos_fases(conn, contexto, resultado, guardar_solucion=True, tiempo_factibilidad=None, medicion=None):
+    # Fase 1: primera solución factible, sin objetivo y con un presupuesto corto; se guarda de
+    # inmediato para que el turno tenga un plan válido aunque la optimización no termine.
+    # Fase 2: minimiza la espera con lo que queda de max_tiempo_ejecucion, partiendo de la
+    # solución de la fase 1 (hints), y reemplaza el plan guardado solo si reduce la espera.
+    # Deja en "resultado" la última solución extraída y su escritura.
+    max_tiempo = contexto["max_tiempo_ejecucion"]
+    tiempo_factibilidad = min(tiempo_factibilidad or TIEMPO_FACTIBILIDAD, max_tiempo)
+
+    def extraer_y_guardar(sufijo):
+        fase = iniciar_fase(medicion, "extraccion" + sufijo)
+        resultado["solucion"] = extraer_solucion(contexto)
+        cerrar_fase(medicion, fase)
+        fase = iniciar_fase(medicion, "escritura" + sufijo)
+        resultado["escritura"] = guardar(conn, contexto["turno_id"], resultado["solucion"])
+        cerrar_fase(medicion, fase, **resultado["escritura"]["filas"])
+        contexto["plan_escrito"] = resultado["solucion"]["plan"]
+
+    print("\n1️⃣ Fase 1: búsqueda de un plan factible")
+    fase = iniciar_fase(medicion, "factibilidad")
+    resolver(contexto, factibilidad=True, max_tiempo=tiempo_factibilidad)
+    cerrar_fase(medicion, fase, subproblemas=len(contexto["modelos"]), cpu_subprocesos=contexto["cpu_subprocesos"])
+    primera = {clave: contexto[clave] for clave in ("status", "objetivo", "gap_obtenido", "valores", "tiempo_resolucion")}
+    factible = primera["status"] in ESTADOS_CON_SOLUCION
+    if factible:
+        print(f"✅ Plan factible en {primera['tiempo_resolucion']:.2f} segundos. Espera total: {primera['objetivo']}")
+        if guardar_solucion:
+            extraer_y_guardar("_factibilidad")
+    else:
+        print(f"⚠️ Sin plan factible en {tiempo_factibilidad} segundos; se sigue con la optimización")
+
+    resumen_fases = {
+        "factibilidad": {"estado": cp_model.CpSolver().StatusName(primera["status"]),
+                         "objetivo": primera["objetivo"], "tiempo": primera["tiempo_resolucion"]},
+        "optimizacion": None,
+        "plan_mejorado": False,
+    }
+    contexto["dos_fases"] = resumen_fases
+    # Si la fase 1 demostró que el turno es infactible, la fase 2 no puede encontrar nada
+    if primera["status"] == cp_model.INFEASIBLE:
+        print(MENSAJE_SIN_SOLUCION)
+        return contexto
+
+    print("\n2️⃣ Fase 2: minimización de la espera")
+    if factible:
+        hints_solucion(contexto)
+    fase = iniciar_fase(medicion, "resolucion")
+    resolver(contexto, max_tiempo=max(1.0, round(max_tiempo - primera["tiempo_resolucion"], 1)))
+    cerrar_fase(medicion, fase, subproblemas=len(contexto["modelos"]), cpu_subprocesos=contexto["cpu_subprocesos"])
+    resumen_fases["optimizacion"] = {"estado": cp_model.CpSolver().StatusName(contexto["status"]),
+                                     "objetivo": contexto["objetivo"], "tiempo": contexto["tiempo_resolucion"]}
+    tiempo_total = primera["tiempo_resolucion"] + contexto["tiempo_resolucion"]
+
+    mejora = contexto["status"] in ESTADOS_CON_SOLUCION and (not factible or contexto["objetivo"] < primera["objetivo"])
+    if not mejora:
+        if not factible:
+            print(MENSAJE_SIN_SOLUCION)
+            return contexto
+        # Se conserva el plan de la fase 1. Si la fase 2 llegó a la misma espera, su estado (p. ej.
+        # OPTIMAL) vale para ese plan; en todo caso su cota da el gap del plan guardado.
+        status, cota = contexto["status"], contexto["cota"]
+        iguales = status in ESTADOS_CON_SOLUCION and contexto["objetivo"] == primera["objetivo"]
+        contexto.update(primera)
+        if iguales:
+            print(f"✅ La optimización confirmó la espera de la fase 1 ({primera['objetivo']}); se conserva su plan")
+            contexto["status"] = status
+        else:
+            print(f"↩️ La optimización no redujo la espera ({primera['objetivo']}); se conserva el plan de la fase 1")
+        if cota is not None:
+            contexto["gap_obtenido"] = abs(primera["objetivo"] - cota) / max(1.0, abs(primera["objetivo"]))
+        contexto["tiempo_resolucion"] = tiempo_total
+        if guardar_solucion:
+            actualizar_kpis_resolucion(conn, contexto)
+        return contexto
+
+    resumen_fases["plan_mejorado"] = True
+    contexto["tiempo_resolucion"] = tiempo_total
+    if factible:
+        print(f"📉 Espera total: {primera['objetivo']} -> {contexto['objetivo']}")
+    if guardar_solucion:
+        extraer_y_guardar("")
+    return contexto
+
+
+# -------------------------
+# Pipeline completo
+# -------------------------
+def resolver_turno(conn, turno_id, datos=None, formulacion=None, agrupar=False, incremental=False,
+                   fijar_no_modificados=False, sin_descomposicion=False, guardar_solucion=True, stats_json=None,
+                   medicion=None, metricas_json=None, dos_fases=False, tiempo_factibilidad=None):
+    # preparar -> construir -> resolver -> extraer_solucion -> guardar sobre una misma conexión.
+    # Devuelve {"contexto", "stats", "solucion", "escritura", "tiempos", "metricas"}; "contexto" es
+    # None si el turno no tiene parámetros y "solucion" es None si no hubo solución o no se pidió
+    # guardar. Las métricas por fase se escriben en metricas_json y, si se guarda la solución, en
+    # MetricaEjecucionTurno. Con dos_fases (o dos_fases en ParametrosModeloTurno) se resuelve con
+    # resolver_dos_fases, que guarda el plan factible antes de optimizar.
+    incremental = incremental or fijar_no_modificados
+    if medicion is None:
+        medicion = nueva_medicion(turno_id)
+    inicio_total = time.time()
+    if datos is None:
+        datos = cargar_datos(conn, turno_id, incremental, medicion)
+
+    resultado = {"contexto": None, "stats": None, "solucion": None, "escritura": None}
+    contexto = preparar(datos, turno_id, formulacion, agrupar, incremental, fijar_no_modificados, medicion)
+    if contexto is not None:
+        resultado["contexto"] = contexto
+
+        fase = iniciar_fase(medicion, "construccion")
+        construir(contexto, sin_descomposicion)
+        cerrar_fase(medicion, fase, subproblemas=len(contexto["modelos"]),
+                    variables=sum(len(m.Proto().variables) for m in contexto["modelos"]),
+                    restricciones=sum(len(m.Proto().constraints) for m in contexto["modelos"]))
+
+        dos_fases = dos_fases or contexto["resolver_dos_fases"]
+        if dos_fases:
+            resolver_dos_fases(conn, contexto, resultado, guardar_solucion, tiempo_factibilidad, medicion)
+        else:
+            fase = iniciar_fase(medicion, "resolucion")
+            resolver(contexto)
+            cerrar_fase(medicion, fase, subproblemas=len(contexto["modelos"]), cpu_subprocesos=contexto["cpu_subprocesos"])
+        print(f"⏱ Tiempo total Ejecución: {time.time() - inicio_total:.2f} segundos")
+
+        resultado["stats"] = estadisticas(contexto)
+        if stats_json:
+            with open(stats_json, "w", encoding="utf-8") as f:
+                json.dump(resultado["stats"], f, indent=2)
+
+        if not guardar_solucion:
+            print("💾 Ejecución sin guardar resultados (--no-guardar)")
+        elif not dos_fases:
+            fase = iniciar_fase(medicion, "extraccion")
+            resultado["solucion"] = extraer_solucion(contexto)
+            cerrar_fase(medicion, fase)
+
+        if resultado["solucion"] is not None and resultado["escritura"] is None:
+            solucion = resultado["solucion"]
+            fase = iniciar_fase(medicion, "escritura")
+            resultado["escritura"] = guardar(conn, turno_id, solucion)
+            cerrar_fase(medicion, fase, **resultado["escritura"]["filas"])
+
+    resultado["tiempos"] = tiempos_por_fase(medicion)
+    resultado["metricas"] = resumen(medicion)
+    if metricas_json:
+        with open(metricas_json, "w", encoding="utf-8") as f:
+            json.dump(resultado["metricas"], f, indent=2)
+    if guardar_solucion and conn is not None:
+        estado = resultado["stats"]["estado"] if resultado["stats"] else None
+        try:
+            guardar_metricas(conn, resultado["metricas"], estado)
+        except Exception as e:
+            print(f"⚠️ No se pudieron guardar las métricas de la ejecución: {e}")
+    return resultado
+
+
+def ejecutar_turno(turno_id, conn=None, crear=True, incremental=False, fijar_no_modificados=False, **opciones):
+    # Crear buses + resolver con una sola conexión y una sola carga de datos
+    propia = conn is None
+    if propia:
+        conn = obtener_conexion()
+    try:
+        medicion = nueva_medicion(turno_id)
+        datos = cargar_datos(conn, turno_id, incremental or fijar_no_modificados, medicion)
+        buses = crear_buses(conn, turno_id, datos, medicion=medicion) if crear else None
+        resultado = resolver_turno(conn, turno_id, datos, incremental=incremental,
+                                   fijar_no_modificados=fijar_no_modificados, medicion=medicion, **opciones)
+        resultado["crear_buses"] = buses
+        return resultado
+    finally:
+        if propia:
+            conn.close()
@@ -1,62 +1,183 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import requests
 import time
 import random
 import sys
 from fake_useragent import UserAgent
 from pathlib import Path
+from requests import RequestException
 sys.path.append(str(Path(__file__).resolve().parents[2])) 
 
+from scripts.scraper.utils import cache_respuestas
 from scripts.scraper.utils.get_latam_headers import get_latam_headers
+from scripts.scraper.utils.red import pedir, vencido
+from scripts.scraper.utils.search_token_extractor import invalidar_search_token
 
 
 
-def obtener_vuelos_latam(origen, destino, fecha):
-    def clave(v):
-        return (v["codigo_vuelo"], v["hora_salida"])
+# LATAM no informa asientos disponibles: una búsqueda con N adultos solo devuelve los vuelos
+# que tienen al menos N asientos. La capacidad de cada vuelo se acota con búsqueda binaria
+# sobre la cantidad de adultos; una misma búsqueda sirve para todos los vuelos pendientes.
+MAX_ADULTOS = 9
+ESTADOS_TOKEN_INVALIDO = (400, 401, 403)
 
-    vuelos_base = obtener_vuelos_latam_particular(origen, destino, fecha, adultos=1)
-    vuelos_dict = {clave(v): v for v in vuelos_base}
-    capacidades = {k: None for k in vuelos_dict}
 
-    vuelos_pendientes = set(capacidades.keys())
+def clave_vuelo(v):
+    return (v["codigo_vuelo"], v["hora_salida"])
 
-    for adultos in range(9, 1, -1):
-        vuelos = obtener_vuelos_latam_particular(origen, destino, fecha, adultos=adultos)
-        claves_actuales = set(clave(v) for v in vuelos)
 
-        for k in list(vuelos_pendientes):
-            if k in claves_actuales:
-                capacidades[k] = adultos
-                vuelos_pendientes.remove(k)
+def puntos_de_sondeo(intervalos, paralelos=1):
+    # intervalos: {clave: (minimo_confirmado, maximo_posible)}; un vuelo está resuelto cuando ambos coinciden
+    pendientes = sorted({i for i in intervalos.values() if i[0] < i[1]}, key=lambda i: i[0] - i[1])
+    if not pendientes:
+        return []
+    puntos = {(bajo + alto + 1) // 2 for bajo, alto in pendientes[1:]}
+    # El intervalo más ancho se parte en tantos trozos como consultas paralelas queden libres
+    # (búsqueda k-aria; con paralelos=1 es el punto medio de siempre)
+    bajo, alto = pendientes[0]
+    libres = max(paralelos - len(puntos), 1)
+    trozos = min(libres, alto - bajo)
+    for i in range(1, trozos + 1):
+        puntos.add(bajo + -(-i * (alto - bajo) // (trozos + 1)))
+    return sorted(puntos, reverse=True)
+
+
+def llamadas_busqueda_lineal(capacidades, max_adultos=MAX_ADULTOS):
+    # Consultas que habría hecho el recorrido de max_adultos hacia abajo hasta 2 (sin contar la base)
+    if not capacidades:
+        return 1
+    minimo = min(capacidades.values())
+    return max_adultos - 1 if minimo <= 1 else max_adultos - minimo + 1
+
+
+def consultar_en_paralelo(origen, destino, fecha, puntos, paralelos=1, buscar=None, plazo=None, obligatorios=()):
+    # Una búsqueda por cantidad de adultos; el límite por host de utils/red.py acota la concurrencia real.
+    # Una búsqueda que falla (plazo vencido, error de red, circuito abierto, token no disponible,
+    # respuesta que no es JSON) devuelve None, salvo las de "obligatorios", cuyo error se propaga.
+    buscar = buscar or obtener_vuelos_latam_particular
+
+    def consultar(n):
+        try:
+            return buscar(origen, destino, fecha, adultos=n, plazo=plazo)
+        except (RequestException, TimeoutError, RuntimeError, LookupError, ValueError) as e:
+            if n in obligatorios:
+                raise
+            print(f"⚠️ Latam {origen}-{destino} {fecha} con {n} adultos: {e}", file=sys.stderr)
+            return None
+
+    if paralelos > 1 and len(puntos) > 1:
+        with ThreadPoolExecutor(max_workers=min(paralelos, len(puntos))) as ejecutor:
+            return list(ejecutor.map(consultar, puntos))
+    return [consultar(n) for n in puntos]
+
+
+def sondear_capacidades(origen, destino, fecha, claves, max_adultos=MAX_ADULTOS, paralelos=1, buscar=None,
+                        plazo=None, respuestas=None):
+    # Devuelve ({clave: asientos}, consultas realizadas). La primera ronda consulta max_adultos,
+    # que resuelve de una vez el caso común de vuelos con asientos de sobra; las siguientes, los
+    # puntos medios de los intervalos pendientes (en paralelo si paralelos > 1). Termina cuando
+    # se conoce la capacidad de todos los vuelos o vence el plazo; en ese caso cada vuelo queda
+    # con el mínimo confirmado. respuestas: {adultos: vuelos} ya consultados por quien llama.
+    # Una búsqueda fallida (None) no dice nada de los vuelos: no acota ningún intervalo.
+    intervalos = {k: (1, max_adultos) for k in claves}
+    respuestas = dict(respuestas or {})
+    consultas = 0
+
+    while True:
+        for adultos, vuelos in respuestas.items():
+            if vuelos is None:
+                continue
+            presentes = {clave_vuelo(v) for v in vuelos}
+            for k, (bajo, alto) in intervalos.items():
+                if bajo >= alto:
+                    continue
+                if k in presentes:
+                    bajo = max(bajo, adultos)
+                else:
+                    alto = min(alto, adultos - 1)
+                # Respuestas no monótonas (la oferta cambió entre consultas): se queda con el mínimo
+                intervalos[k] = (bajo, max(bajo, alto))
+        respuestas = {}
+
+        if consultas == 0 and max_adultos > 1 and any(b < a for b, a in intervalos.values()) \
+                and all(a == max_adultos for b, a in intervalos.values()):
+            puntos = [max_adultos]
+            if paralelos > 1:
+                puntos += puntos_de_sondeo({None: (1, max_adultos - 1)}, paralelos - 1)
+        else:
+            puntos = puntos_de_sondeo(intervalos, paralelos)
+        if not puntos or vencido(plazo):
+            break
 
-        if not vuelos_pendientes:
+        resultados = consultar_en_paralelo(origen, destino, fecha, puntos, paralelos, buscar, plazo)
+        consultas += len(puntos)
+        respuestas = dict(zip(puntos, resultados))
+        # Si fallaron todas las búsquedas de la ronda, repetirlas daría lo mismo
+        if all(r is None for r in resultados):
             break
 
+    return {k: bajo for k, (bajo, _) in intervalos.items()}, consultas
+
+
+def obtener_vuelos_latam(origen, destino, fecha, max_adultos=MAX_ADULTOS, paralelos=1, plazo=None):
+    # Con consultas paralelas, la búsqueda base (1 adulto) y la de max_adultos van en la misma ronda
+    puntos = [1, max_adultos] if paralelos > 1 and max_adultos > 1 else [1]
+    resultados = consultar_en_paralelo(origen, destino, fecha, puntos, paralelos, plazo=plazo, obligatorios=(1,))
+    vuelos_base = resultados[0] or []
+    vuelos_dict = {clave_vuelo(v): v for v in vuelos_base}
+
+    capacidades, consultas = sondear_capacidades(
+        origen, destino, fecha, list(vuelos_dict), max_adultos=max_adultos, paralelos=paralelos, plazo=plazo,
+        respuestas=dict(zip(puntos[1:], resultados[1:])),
+    )
+    consultas += len(puntos) - 1
+    ahorro = llamadas_busqueda_lineal(capacidades, max_adultos) - consultas
+    print(f"🔎 Latam {origen}-{destino} {fecha}: {len(vuelos_dict)} vuelos, {consultas + 1} consultas "
+          f"({ahorro} menos que la búsqueda lineal)", file=sys.stderr)
+    if vencido(plazo):
+        print(f"⚠️ Latam {origen}-{destino} {fecha}: plazo vencido, asientos acotados por el mínimo confirmado",
+              file=sys.stderr)
+
     # Armar resultado final
     resultado = []
-    for k, cap in capacidades.items():
-        vuelo = vuelos_dict[k]
-        vuelo["asientos_disponibles"] = cap if cap is not None else 1
+    for k, vuelo in vuelos_dict.items():
+        vuelo["asientos_disponibles"] = capacidades.get(k, 1)
         resultado.append(vuelo)
 
     return resultado
 
 
-def obtener_vuelos_latam_particular(origen: str, destino: str, fecha: str, adultos: int = 1):
-    
-    # Método para consultar directamente a LATAM Airlines
-
+def descargar_ofertas_latam(origen: str, destino: str, fecha: str, adultos: int = 1, plazo=None):
+    # JSON de ofertas tal como lo entrega LATAM, o None si la consulta falló
     url = f"https://www.latamairlines.com/bff/air-offers/v2/offers/search?inOfferId=null&destination={destino}&inFrom=null&sort=RECOMMENDED&redemption=false&cabinType=Economy&outOfferId=null&outFlightDate=null&origin={origen}&adult={adultos}&infant=0&inFlightDate=null&child=0&outFrom={fecha}"
     headers = get_latam_headers(origen, destino, fecha, adultos)
-    response = requests.get(url, headers=headers)
+    response = pedir("GET", url, plazo=plazo, headers=headers)
+
+    # Un 400/401/403 suele ser un search token vencido o revocado: se descarta de la caché y se
+    # reintenta una vez. Un 429 no: pedir() ya esperó y reintentó, y el circuito se encarga si sigue.
+    if response.status_code in ESTADOS_TOKEN_INVALIDO:
+        invalidar_search_token(origen, destino, fecha)
+        headers = get_latam_headers(origen, destino, fecha, adultos)
+        response = pedir("GET", url, plazo=plazo, headers=headers)
 
     if response.status_code != 200:
-        print(f"⚠️ Error en consulta Latam: {response.status_code}")
-        print(response.text)
-        return []
+        print(f"⚠️ Error en consulta Latam: {response.status_code}", file=sys.stderr)
+        print(response.text, file=sys.stderr)
+        return None
 
-    data = response.json()
+    return response.json()
+
+
+def obtener_vuelos_latam_particular(origen: str, destino: str, fecha: str, adultos: int = 1, plazo=None):
+    
+    # Método para consultar directamente a LATAM Airlines (o su respuesta guardada en caché).
+    # Devuelve None si la consulta falló, para no confundirla con una búsqueda sin vuelos.
+    data = cache_respuestas.obtener_respuesta(
+        cache_respuestas.clave("Latam", origen, destino, fecha, adultos),
+        lambda: descargar_ofertas_latam(origen, destino, fecha, adultos, plazo),
+    )
+    if data is None:
+        return None
 
     vuelos = []
 
@@ -1,26 +1,182 @@
 import json
 import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
 from typing import List, Dict
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).resolve().parents[2]))  
 from scripts.scraper.latam_scraper import obtener_vuelos_latam
-from scripts.scraper.sky_scraper import obtener_vuelos_sky
+from scripts.scraper.sky_scraper import fechas_ventana, obtener_vuelos_sky_por_fecha
+from scripts.scraper.utils import cache_respuestas
+from scripts.scraper.utils.red import contadores, ejecutar_concurrente, restante
+from scripts.modelo.preprocesamiento import normalizar
+
+# Segundos extra, pasado el plazo, para recoger a los proveedores que cortaron solos al vencer
+# (LATAM con fechas flexibles entrega los días que alcanzaron a terminar)
+GRACIA_PLAZO = 0.5
+
+# Ciudades de TrabajadorTurno con aeropuerto (el inverso de iata_map en scripts/pipeline.py)
+IATA_POR_CIUDAD = {"SANTIAGO": "SCL", "ANTOFAGASTA": "ANF", "CALAMA": "CJC"}
+
+CONSULTA_RUTAS_TURNO = '''
+    SELECT DISTINCT TT.origen, TT.destino
+    FROM "TrabajadorTurno" TT
+    WHERE TT."turnoId" = %(turno_id)s
+'''
+
 
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Scraper de vuelos Latam + Sky: devuelve JSON unificado."
     )
     parser.add_argument(
-        "--origen", required=True, help="Código IATA de origen, e.g. SCL"
+        "--origen", help="Código IATA de origen, e.g. SCL"
     )
     parser.add_argument(
-        "--destino", required=True, help="Código IATA de destino, e.g. LIM"
+        "--destino", help="Código IATA de destino, e.g. LIM"
     )
     parser.add_argument(
-        "--fecha", required=True, help="Fecha de vuelo en formato YYYY-MM-DD"
+        "--fecha", help="Fecha de vuelo en formato YYYY-MM-DD (con --turnoId, reemplaza la fecha del turno)"
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--rutas", nargs="+", metavar="ORIGEN:DESTINO:FECHA",
+        help="Modo lote: varias rutas, e.g. SCL:CJC:2025-06-10 SCL:ANF:2025-06-10"
+    )
+    parser.add_argument(
+        "--turnoId", help="Modo lote: rutas origen/destino de los trabajadores del turno"
+    )
+    parser.add_argument(
+        "--dias-flexibles", type=int, default=0,
+        help="Busca también los N días antes y después de cada fecha (Sky: una sola consulta por ruta)"
+    )
+    parser.add_argument(
+        "--rutas-paralelas", type=int, default=2,
+        help="En modo lote, rutas que se scrapean a la vez"
+    )
+    parser.add_argument(
+        "--consultas-paralelas", type=int, default=3,
+        help="Búsquedas Latam simultáneas al sondear asientos disponibles"
+    )
+    parser.add_argument(
+        "--plazo", type=float, default=90,
+        help="Segundos máximos de scraping; al vencer se devuelve lo que alcanzó a terminar"
+    )
+    parser.add_argument(
+        "--cache", choices=cache_respuestas.MODOS, default=cache_respuestas.MODO,
+        help="normal: reutiliza respuestas recientes; sin_cache: siempre consulta; replay: solo respuestas grabadas, sin red"
+    )
+    parser.add_argument(
+        "--ttl-cache", type=int, default=cache_respuestas.TTL,
+        help="Segundos que una respuesta guardada se considera vigente (modo normal)"
+    )
+    parser.add_argument(
+        "--max-cache", type=int, default=cache_respuestas.MAX_ENTRADAS,
+        help="Máximo de respuestas guardadas; se desalojan las usadas hace más tiempo"
+    )
+    args = parser.parse_args()
+    if not (args.rutas or args.turnoId) and not (args.origen and args.destino and args.fecha):
+        parser.error("se requiere --origen, --destino y --fecha, o bien --rutas / --turnoId")
+    return args
+
+
+def consultar_proveedor(proveedor, origen, destino, fecha, paralelos, plazo, dias=0):
+    # Vuelos de fecha ± dias por día de la ventana: {fecha: {estado, resultado, error, tiempo}},
+    # como ejecutar_concurrente. Sky los trae en una sola consulta; LATAM no tiene búsqueda
+    # flexible y se consulta cada día (en paralelo, dentro del límite por host y del plazo).
+    inicio = time.monotonic()
+    if proveedor == "Sky":
+        por_fecha = obtener_vuelos_sky_por_fecha(origen=origen, destino=destino, fecha=fecha, dias=dias, plazo=plazo)
+        tiempo = time.monotonic() - inicio
+        return {f: {"estado": "ok", "resultado": v, "error": None, "tiempo": tiempo} for f, v in por_fecha.items()}
+    fechas = fechas_ventana(fecha, dias)
+    if len(fechas) == 1:
+        vuelos = obtener_vuelos_latam(origen=origen, destino=destino, fecha=fecha, paralelos=paralelos, plazo=plazo)
+        return {fecha: {"estado": "ok", "resultado": vuelos, "error": None, "tiempo": time.monotonic() - inicio}}
+    por_fecha = ejecutar_concurrente({
+        f: (lambda f=f: obtener_vuelos_latam(origen=origen, destino=destino, fecha=f, paralelos=paralelos, plazo=plazo))
+        for f in fechas
+    }, plazo=plazo)
+    for f, estado in sorted(por_fecha.items()):
+        if estado["estado"] == "error":
+            print(f"⚠️ Error en scraper Latam ({origen}-{destino} {f}): {estado['error']}", file=sys.stderr)
+    # Un día que falla o no termina no descarta los demás; solo es error si no terminó ninguno
+    if not any(estado["estado"] == "ok" for estado in por_fecha.values()):
+        errores = [estado["error"] for estado in por_fecha.values() if estado["estado"] == "error"]
+        raise RuntimeError(errores[0]) if errores else TimeoutError("Plazo vencido")
+    return por_fecha
+
+
+def vuelos_de(por_fecha):
+    # Vuelos de los días que terminaron bien, en orden de fecha
+    return [v for _, estado in sorted(por_fecha.items()) if estado["estado"] == "ok" for v in estado["resultado"]]
+
+
+def quedo_colgado(estado):
+    # El proveedor, o alguno de sus días, sigue corriendo en un hilo abandonado
+    return estado["estado"] == "plazo" or any(d["estado"] == "plazo" for d in (estado.get("por_fecha") or {}).values())
+
+
+def resumen_por_fecha(por_fecha):
+    # "2024-05-01: 3, 2024-05-02: error, ..." para los mensajes de estado
+    return ", ".join(f"{f}: {len(e['resultado']) if e['estado'] == 'ok' else e['estado']}"
+                     for f, e in sorted(por_fecha.items()))
+
+
+PROVEEDORES = ["Latam", "Sky"]
+
+
+def parsear_ruta(texto):
+    partes = texto.split(":")
+    if len(partes) != 3:
+        raise ValueError(f"Ruta inválida '{texto}', se espera ORIGEN:DESTINO:FECHA")
+    return partes[0].strip().upper(), partes[1].strip().upper(), partes[2].strip()
+
+
+def iata_de_ciudad(ciudad):
+    ciudad = normalizar(ciudad)
+    if ciudad in IATA_POR_CIUDAD:
+        return IATA_POR_CIUDAD[ciudad]
+    # Ya viene como código IATA
+    return ciudad if len(ciudad) == 3 and ciudad.isalpha() else None
+
+
+def rutas_de_turno(turno_id, fecha=None):
+    # Pares origen/destino distintos de los trabajadores del turno, en la fecha del turno
+    from scripts.modelo.carga import cargar_fecha_turno
+    from scripts.modelo.conexion import obtener_conexion
+
+    conn = obtener_conexion()
+    try:
+        cursor = conn.cursor()
+        parametros = {"turno_id": turno_id}
+        cursor.execute(CONSULTA_RUTAS_TURNO, parametros)
+        pares = cursor.fetchall()
+        if fecha is None:
+            fecha_turno, _ = cargar_fecha_turno(cursor, parametros)
+            if fecha_turno is None:
+                raise ValueError(f"Turno {turno_id} no encontrado")
+            fecha = fecha_turno.strftime("%Y-%m-%d")
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+    rutas = []
+    for origen, destino in pares:
+        iata_origen, iata_destino = iata_de_ciudad(origen), iata_de_ciudad(destino)
+        if not iata_origen or not iata_destino:
+            print(f"⚠️ Ruta {origen} → {destino} sin aeropuerto conocido, se omite", file=sys.stderr)
+            continue
+        if iata_origen != iata_destino:
+            rutas.append((iata_origen, iata_destino, fecha))
+    return rutas
+
+
+def deduplicar_rutas(rutas):
+    return sorted(set(rutas))
+
 
 def normalize_raw_flight(v: Dict) -> Dict:
     fecha_str = v.get("fecha_salida")
@@ -51,30 +207,136 @@ def normalize_raw_flight(v: Dict) -> Dict:
     }
 
 
+def imprimir_contadores():
+    for proveedor, c in contadores().items():
+        print(f"📈 {proveedor}: {c['consultas']} consultas, {c['errores']} con error, {c['reintentos']} reintentos, "
+              f"latencia media {c['latencia_promedio']:.2f} s (máx {c['latencia_max']:.2f} s)"
+              + (f", circuito abierto {c['circuito_abierto']} veces" if c["circuito_abierto"] else ""),
+              file=sys.stderr)
+
+
+def scrapear_lote(rutas, paralelos, rutas_paralelas, plazo, emitir, dias=0):
+    # Todas las (ruta, proveedor) en un solo pool; cada resultado se entrega a emitir() apenas
+    # termina, sin esperar al resto. Devuelve {(ruta, proveedor): {estado, vuelos, error, tiempo}}.
+    inicio = time.monotonic()
+    estados = {}
+    ejecutor = ThreadPoolExecutor(max_workers=max(rutas_paralelas, 1) * len(PROVEEDORES))
+    futuros = {
+        ejecutor.submit(consultar_proveedor, proveedor, *ruta, paralelos, plazo, dias): (ruta, proveedor)
+        for ruta in rutas for proveedor in PROVEEDORES
+    }
+    try:
+        for futuro in as_completed(futuros, timeout=None if plazo is None else restante(plazo + GRACIA_PLAZO)):
+            ruta, proveedor = futuros[futuro]
+            estado = {"estado": "ok", "vuelos": 0, "por_fecha": None, "error": None, "tiempo": time.monotonic() - inicio}
+            try:
+                por_fecha = futuro.result()
+                vuelos = vuelos_de(por_fecha)
+                estado.update(vuelos=len(vuelos), por_fecha=por_fecha)
+                emitir(ruta, proveedor, vuelos)
+            except Exception as e:
+                estado.update(estado="error", error=str(e))
+            estados[(ruta, proveedor)] = estado
+    except FuturesTimeoutError:
+        pass
+    ejecutor.shutdown(wait=False, cancel_futures=True)
+
+    for clave in futuros.values():
+        estados.setdefault(clave, {"estado": "plazo", "vuelos": 0, "por_fecha": None, "error": None,
+                                   "tiempo": time.monotonic() - inicio})
+    return estados
+
+
+def main_lote(args, plazo):
+    rutas = [parsear_ruta(r) for r in args.rutas or []]
+    if args.turnoId:
+        rutas += rutas_de_turno(args.turnoId, args.fecha)
+    rutas = deduplicar_rutas(rutas)
+    print(f"🧭 {len(rutas)} rutas distintas a scrapear", file=sys.stderr)
+
+    emitidos = set()
+
+    def emitir(ruta, proveedor, vuelos):
+        # Una línea NDJSON por vuelo, apenas termina cada proveedor de cada ruta (con fechas
+        # flexibles, las ventanas de rutas iguales en días cercanos se solapan: cada vuelo sale una vez)
+        for v in vuelos:
+            clave_vuelo = (v.get("aerolinea"), v.get("codigo_vuelo"), v.get("fecha_salida"), v.get("hora_salida"))
+            if clave_vuelo in emitidos:
+                continue
+            emitidos.add(clave_vuelo)
+            sys.stdout.write(json.dumps(normalize_raw_flight(v), ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+    estados = scrapear_lote(rutas, args.consultas_paralelas, args.rutas_paralelas, plazo, emitir, args.dias_flexibles)
+
+    for ((origen, destino, fecha), proveedor), estado in sorted(estados.items()):
+        ruta = f"{origen}-{destino} {fecha}"
+        if estado["estado"] == "ok":
+            detalle = f" ({resumen_por_fecha(estado['por_fecha'])})" if len(estado["por_fecha"]) > 1 else ""
+            print(f"📡 {ruta} {proveedor}: {estado['vuelos']} vuelos en {estado['tiempo']:.1f} s{detalle}",
+                  file=sys.stderr)
+        elif estado["estado"] == "error":
+            print(f"⚠️ Error en scraper {proveedor} ({ruta}): {estado['error']}", file=sys.stderr)
+        else:
+            print(f"⚠️ Scraper {proveedor} ({ruta}) no terminó dentro del plazo de {args.plazo:.0f} s",
+                  file=sys.stderr)
+
+    imprimir_contadores()
+
+    total = sum(estado["vuelos"] for estado in estados.values())
+    colgados = any(quedo_colgado(estado) for estado in estados.values())
+    if rutas and total == 0:
+        print("Error: ninguna ruta devolvió vuelos.", file=sys.stderr)
+    return 1 if rutas and total == 0 else 0, colgados
+
+
 def main():
     args = parse_args()
 
+    plazo = time.monotonic() + args.plazo
+    cache_respuestas.configurar(modo=args.cache, ttl=args.ttl_cache, max_entradas=args.max_cache)
+
+    # Modo lote: NDJSON por stdout, un vuelo por línea
+    if args.rutas or args.turnoId:
+        codigo, colgados = main_lote(args, plazo)
+        if colgados:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(codigo)
+        sys.exit(codigo)
+
     origen = args.origen
     destino = args.destino
     fecha  = args.fecha
 
-    # 1. Llamar a cada scraper y capturar errores
-    try:
-        vuelos_latam_raw = obtener_vuelos_latam(origen=origen, destino=destino, fecha=fecha)
-    except Exception as e:
-        print(f"⚠️ Error en scraper Latam: {e}", file=sys.stderr)
-        vuelos_latam_raw = []
+    # 1. Llamar a ambos scrapers en paralelo, con un plazo común, y capturar errores
+    estados = ejecutar_concurrente({
+        proveedor: (lambda p=proveedor: consultar_proveedor(p, origen, destino, fecha, args.consultas_paralelas, plazo,
+                                                        args.dias_flexibles))
+        for proveedor in PROVEEDORES
+    }, plazo=plazo + GRACIA_PLAZO)
 
-    try:
-        vuelos_sky_raw = obtener_vuelos_sky(origen=origen, destino=destino, fecha=fecha)
-    except Exception as e:
-        print(f"⚠️ Error en scraper Sky: {e}", file=sys.stderr)
-        vuelos_sky_raw = []
+    for proveedor, estado in estados.items():
+        if estado["estado"] == "ok":
+            por_fecha = estado["por_fecha"] = estado["resultado"]
+            estado["resultado"] = vuelos_de(por_fecha)
+            detalle = f" ({resumen_por_fecha(por_fecha)})" if len(por_fecha) > 1 else ""
+            print(f"📡 {proveedor}: {len(estado['resultado'])} vuelos en {estado['tiempo']:.1f} s{detalle}",
+                  file=sys.stderr)
+        elif estado["estado"] == "error":
+            print(f"⚠️ Error en scraper {proveedor}: {estado['error']}", file=sys.stderr)
+        else:
+            print(f"⚠️ Scraper {proveedor} no terminó dentro del plazo de {args.plazo:.0f} s", file=sys.stderr)
+    imprimir_contadores()
+
+    vuelos_latam_raw = estados["Latam"]["resultado"] or []
+    vuelos_sky_raw = estados["Sky"]["resultado"] or []
 
     # 2. Si ambos scrapers no devolvieron datos, error
     if not vuelos_latam_raw and not vuelos_sky_raw:
         print("Error: ambos scrapers Latam y Sky fallaron o no devolvieron datos.", file=sys.stderr)
-        sys.exit(1)
+        sys.stderr.flush()
+        os._exit(1)
 
     # 3. Normalizar cada lista
     normalizados: List[Dict] = []
@@ -89,6 +351,12 @@ def main():
     # 5. Imprimir por stdout el JSON unificado
     print(json.dumps(normalizados, ensure_ascii=False))
 
+    # Un proveedor que sigue colgado no debe retener el proceso después del plazo
+    if any(quedo_colgado(estado) for estado in estados.values()):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(0)
+
 if __name__ == "__main__":
     main()
 # 
\ No newline at end of file
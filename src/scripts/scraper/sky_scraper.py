@@ -1,7 +1,15 @@
-import requests
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
 
+from scripts.scraper.utils import cache_respuestas
+from scripts.scraper.utils.red import pedir
 
-def obtener_vuelos_sky(origen: str, destino: str, fecha: str):
+
+def descargar_ofertas_sky(origen: str, destino: str, fecha: str, plazo=None, dias: int = 0):
+    # JSON de la búsqueda tal como lo entrega Sky, o None si la consulta falló. Con dias > 0, la
+    # misma consulta trae los vuelos de fecha ± dias (búsqueda de fechas flexibles de Sky).
     url = "https://api.skyairline.com/farequoting/v1/search/flight?stage=IS"
 
     headers = {
@@ -20,7 +28,7 @@ def obtener_vuelos_sky(origen: str, destino: str, fecha: str):
             "destination": {"code": destino, "useNearbyLocations": False},
             "departureDate": {"date": fecha},
             "selectedOfferRef": None,
-            "plusMinusDays": None
+            "plusMinusDays": dias or None
         }],
         "passengers": {
             "ADT": 1,
@@ -32,18 +40,50 @@ def obtener_vuelos_sky(origen: str, destino: str, fecha: str):
         "preferredOperatingCarrier": None
     }
 
-    response = requests.post(url, headers=headers, json=payload)
+    response = pedir("POST", url, plazo=plazo, headers=headers, json=payload)
 
     if response.status_code != 200:
-        print(f"⚠️ Error en consulta Sky: {response.status_code}")
-        print(response.text)
+        print(f"⚠️ Error en consulta Sky: {response.status_code}", file=sys.stderr)
+        print(response.text, file=sys.stderr)
+        return None
+
+    return response.json()
+
+
+def fechas_ventana(fecha: str, dias: int = 0):
+    centro = date.fromisoformat(fecha)
+    return [(centro + timedelta(days=d)).isoformat() for d in range(-dias, dias + 1)]
+
+
+def obtener_vuelos_sky(origen: str, destino: str, fecha: str, plazo=None, dias: int = 0):
+    # Vuelos de fecha ± dias en una sola consulta (dias=0: solo la fecha pedida)
+    clave_extra = {"dias": dias} if dias else {}
+    data = cache_respuestas.obtener_respuesta(
+        cache_respuestas.clave("Sky", origen, destino, fecha, **clave_extra),
+        lambda: descargar_ofertas_sky(origen, destino, fecha, plazo, dias),
+    )
+    if data is None:
         return []
 
-    data = response.json()
+    ventana = set(fechas_ventana(fecha, dias))
+    vuelos = [v for v in parsear_vuelos_sky(data) if v["fecha_salida"] in ventana]
+    return vuelos
+
+
+def obtener_vuelos_sky_por_fecha(origen: str, destino: str, fecha: str, dias: int, plazo=None):
+    # {fecha: vuelos} para cada día de la ventana, incluidos los días sin vuelos
+    por_fecha = {f: [] for f in fechas_ventana(fecha, dias)}
+    for vuelo in obtener_vuelos_sky(origen, destino, fecha, plazo, dias):
+        por_fecha[vuelo["fecha_salida"]].append(vuelo)
+    return por_fecha
+
 
+def parsear_vuelos_sky(data):
     vuelos = []
 
-    for itinerario in data.get("itineraryParts", [[]])[0]:
+    # Una lista de itinerarios por parte del viaje; con fechas flexibles traen días distintos
+    itinerarios = [itinerario for parte in data.get("itineraryParts") or [] for itinerario in parte]
+    for itinerario in itinerarios:
         for segmento in itinerario.get("segments", []):
             stop_airports = segmento["flight"].get("stopAirports", [])
             paradas = []
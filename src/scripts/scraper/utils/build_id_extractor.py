@@ -1,8 +1,26 @@
-import requests
+import os
 import re
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from scripts.scraper.utils import cache_tokens
+from scripts.scraper.utils.red import pedir
+
+# Ruta donde guardar el HTML descargado para depuración (desactivado si no se define)
+RUTA_HTML_DEPURACION = os.getenv("LATAM_HTML_DEPURACION")
 
 
 def obtener_build_id_latam(origen: str, destino: str, fecha: str):
+    # El build id es el mismo para todas las rutas: se descarga la página una vez por TTL
+    return cache_tokens.obtener("build_id", cache_tokens.TTL_BUILD_ID,
+                                lambda: descargar_build_id_latam(origen, destino, fecha))
+
+
+def invalidar_build_id_latam():
+    cache_tokens.invalidar("build_id")
+
+
+def descargar_build_id_latam(origen: str, destino: str, fecha: str):
     url = "https://www.latamairlines.com/es-cl/flights/"
     headers = {
         "Accept": "*/*",
@@ -18,15 +36,15 @@ def obtener_build_id_latam(origen: str, destino: str, fecha: str):
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36 Edg/135.0.0.0"
     }
 
-    response = requests.get(url, headers=headers, timeout=30)
+    response = pedir("GET", url, headers=headers, timeout=30)
 
     if response.status_code != 200:
-        raise Exception(f"Error cargando página de LATAM: {response.status_code}")
+        raise RuntimeError(f"Error cargando página de LATAM: {response.status_code}")
 
     html = response.text
-    # Guardar el HTML en un archivo para depuración
-    with open("latam_page.html", "w", encoding="utf-8") as f:
-        f.write(html)
+    if RUTA_HTML_DEPURACION:
+        with open(RUTA_HTML_DEPURACION, "w", encoding="utf-8") as f:
+            f.write(html)
 
     # Buscar el build_id
     match = re.search(r'_next/static/([^/]+)/_buildManifest.js', html)
@@ -34,4 +52,4 @@ def obtener_build_id_latam(origen: str, destino: str, fecha: str):
         build_id = match.group(1)
         return build_id
     else:
-        raise Exception("No se pudo encontrar el build_id automáticamente.")
+        raise RuntimeError("No se pudo encontrar el build_id automáticamente.")
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Caché de respuestas crudas de los proveedores (el JSON tal como llega de LATAM o Sky), por
+# proveedor, ruta, fecha y cantidad de adultos. Un archivo por respuesta en un directorio
+# compartido entre procesos. La fecha de modificación del archivo es la de la consulta (TTL) y
+# la de acceso, la de último uso (se desalojan las menos usadas al superar MAX_ENTRADAS).
+#
+# Modos:
+# - "normal": usa la respuesta si tiene menos de TTL segundos; si no, consulta y la guarda.
+# - "sin_cache": siempre consulta (y guarda, para poder reproducirla después).
+# - "replay": solo respuestas grabadas, sin importar su antigüedad y sin tocar la red.
+
+MODOS = ["normal", "sin_cache", "replay"]
+
+DIRECTORIO = Path(os.getenv("SCRAPER_CACHE_DIR", Path(tempfile.gettempdir()) / "scraper_respuestas"))
+TTL = int(os.getenv("SCRAPER_CACHE_TTL", 15 * 60))
+MAX_ENTRADAS = int(os.getenv("SCRAPER_CACHE_MAX", 500))
+MODO = os.getenv("SCRAPER_CACHE_MODO", "normal")
+
+_lock = threading.Lock()
+
+
+def configurar(modo=None, ttl=None, max_entradas=None, directorio=None):
+    global MODO, TTL, MAX_ENTRADAS, DIRECTORIO
+    if modo is not None:
+        if modo not in MODOS:
+            raise ValueError(f"Modo de caché desconocido: {modo}")
+        MODO = modo
+    if ttl is not None:
+        TTL = ttl
+    if max_entradas is not None:
+        MAX_ENTRADAS = max_entradas
+    if directorio is not None:
+        DIRECTORIO = Path(directorio)
+
+
+def clave(proveedor, origen, destino, fecha, adultos=1, **extra):
+    partes = [proveedor, origen, destino, fecha, str(adultos)] + [f"{k}={v}" for k, v in sorted(extra.items())]
+    return ":".join(str(p) for p in partes)
+
+
+def _ruta(clave_respuesta):
+    return DIRECTORIO / (hashlib.sha1(clave_respuesta.encode("utf-8")).hexdigest() + ".json")
+
+
+def leer(clave_respuesta, ignorar_ttl=False):
+    ruta = _ruta(clave_respuesta)
+    try:
+        edad = time.time() - ruta.stat().st_mtime
+        if not ignorar_ttl and edad > TTL:
+            return None
+        with open(ruta, encoding="utf-8") as f:
+            entrada = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entrada.get("clave") != clave_respuesta:
+        return None
+    try:
+        os.utime(ruta, (time.time(), ruta.stat().st_mtime))
+    except OSError:
+        pass
+    return entrada["respuesta"]
+
+
+def guardar(clave_respuesta, respuesta):
+    try:
+        DIRECTORIO.mkdir(parents=True, exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=DIRECTORIO, prefix=".respuesta")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"clave": clave_respuesta, "guardada": time.time(), "respuesta": respuesta}, f)
+        os.replace(temporal, _ruta(clave_respuesta))
+        _desalojar()
+    except OSError:
+        pass
+
+
+def _desalojar():
+    # Borra las respuestas usadas hace más tiempo hasta quedar en MAX_ENTRADAS
+    with _lock:
+        archivos = list(DIRECTORIO.glob("*.json"))
+        if len(archivos) <= MAX_ENTRADAS:
+            return
+        fechas = []
+        for archivo in archivos:
+            try:
+                fechas.append((archivo.stat().st_atime, archivo))
+            except OSError:
+                pass
+        fechas.sort()
+        for _, archivo in fechas[:len(fechas) - MAX_ENTRADAS]:
+            try:
+                archivo.unlink()
+            except OSError:
+                pass
+
+
+def obtener_respuesta(clave_respuesta, descargar):
+    # descargar() devuelve el JSON del proveedor, o None si la consulta falló (no se guarda)
+    if MODO == "replay":
+        respuesta = leer(clave_respuesta, ignorar_ttl=True)
+        if respuesta is None:
+            raise LookupError(f"Sin respuesta grabada para {clave_respuesta}")
+        return respuesta
+    if MODO == "normal":
+        respuesta = leer(clave_respuesta)
+        if respuesta is not None:
+            return respuesta
+    respuesta = descargar()
+    if respuesta is not None:
+        guardar(clave_respuesta, respuesta)
+    return respuesta
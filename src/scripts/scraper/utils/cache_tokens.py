@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Caché de tokens de LATAM (build id y search token) compartida entre procesos: un archivo JSON
+# {clave: {"valor": ..., "expira": epoch}}. Se reescribe completo con un reemplazo atómico, así
+# que un scraper nunca lee un archivo a medio escribir; si dos procesos escriben a la vez, gana
+# el último y el otro solo vuelve a pedir su token.
+
+RUTA_CACHE = Path(os.getenv("LATAM_CACHE_TOKENS", Path(tempfile.gettempdir()) / "latam_tokens.json"))
+TTL_BUILD_ID = int(os.getenv("LATAM_TTL_BUILD_ID", 6 * 3600))
+TTL_SEARCH_TOKEN = int(os.getenv("LATAM_TTL_SEARCH_TOKEN", 15 * 60))
+
+# _lock protege la lectura-modificación-escritura del archivo; _locks_por_clave, el cálculo de
+# cada token (así una descarga no bloquea las de otras rutas y fechas)
+_lock = threading.Lock()
+_locks_por_clave = {}
+
+
+def _leer_archivo():
+    try:
+        with open(RUTA_CACHE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir_archivo(entradas):
+    ahora = time.time()
+    vigentes = {k: e for k, e in entradas.items() if e.get("expira", 0) > ahora}
+    try:
+        RUTA_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=RUTA_CACHE.parent, prefix=".latam_tokens")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(vigentes, f)
+        os.replace(temporal, RUTA_CACHE)
+    except OSError:
+        # Sin disco escribible la caché solo dura lo que dura el proceso
+        pass
+
+
+def leer(clave):
+    entrada = _leer_archivo().get(clave)
+    if entrada and entrada.get("expira", 0) > time.time():
+        return entrada["valor"]
+    return None
+
+
+def guardar(clave, valor, ttl):
+    with _lock:
+        entradas = _leer_archivo()
+        entradas[clave] = {"valor": valor, "expira": time.time() + ttl}
+        _escribir_archivo(entradas)
+
+
+def invalidar(clave):
+    with _lock:
+        entradas = _leer_archivo()
+        if entradas.pop(clave, None) is not None:
+            _escribir_archivo(entradas)
+
+
+def _lock_de(clave):
+    with _lock:
+        return _locks_por_clave.setdefault(clave, threading.Lock())
+
+
+def obtener(clave, ttl, calcular):
+    # Devuelve el valor vigente o lo calcula una sola vez por proceso (los hilos que piden la
+    # misma clave esperan al primero en vez de descargar la página cada uno)
+    valor = leer(clave)
+    if valor is not None:
+        return valor
+    with _lock_de(clave):
+        valor = leer(clave)
+        if valor is None:
+            valor = calcular()
+            guardar(clave, valor, ttl)
+        return valor
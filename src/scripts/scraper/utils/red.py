@@ -0,0 +1,202 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Capa común de red de los scrapers:
+# - una sesión HTTP por host (conexiones keep-alive reutilizadas entre consultas e hilos),
+# - límite de consultas simultáneas y por segundo por host (LATAM corta con 403/429 si se le
+#   pega muy seguido),
+# - timeout en toda consulta, reintentos acotados con backoff exponencial con jitter ante
+#   429/5xx y errores de conexión, y un circuito por proveedor que deja de consultar por un
+#   rato tras varias fallas seguidas,
+# - contadores de consultas, errores y latencia por proveedor,
+# - ejecución de proveedores en paralelo con un plazo global, devolviendo lo que alcanzó a terminar.
+
+LIMITES_POR_HOST = {
+    "www.latamairlines.com": {"proveedor": "Latam", "concurrencia": 3, "por_segundo": 4.0},
+    "api.skyairline.com": {"proveedor": "Sky", "concurrencia": 2, "por_segundo": 2.0},
+}
+LIMITE_POR_DEFECTO = {"concurrencia": 2, "por_segundo": 2.0}
+
+TIMEOUT = (5, 30)  # segundos de conexión y de lectura
+REINTENTOS = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAXIMO = 8.0
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+FALLAS_PARA_ABRIR = 5
+ENFRIAMIENTO_CIRCUITO = 60.0
+
+_hosts = {}
+_lock_hosts = threading.Lock()
+
+
+def _estado_host(host):
+    with _lock_hosts:
+        if host not in _hosts:
+            limite = LIMITES_POR_HOST.get(host, LIMITE_POR_DEFECTO)
+            sesion = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=limite["concurrencia"])
+            sesion.mount("https://", adaptador)
+            sesion.mount("http://", adaptador)
+            _hosts[host] = {
+                "proveedor": limite.get("proveedor", host),
+                "sesion": sesion,
+                "semaforo": threading.BoundedSemaphore(limite["concurrencia"]),
+                "intervalo": 1.0 / limite["por_segundo"],
+                "lock": threading.Lock(),
+                "proxima": 0.0,
+                "fallas_seguidas": 0,
+                "abierto_hasta": 0.0,
+                "contadores": {"consultas": 0, "errores": 0, "reintentos": 0, "circuito_abierto": 0,
+                               "latencia_total": 0.0, "latencia_max": 0.0},
+            }
+        return _hosts[host]
+
+
+def restante(plazo):
+    # Segundos que quedan hasta el plazo (time.monotonic); None si no hay plazo
+    return None if plazo is None else max(plazo - time.monotonic(), 0.0)
+
+
+def vencido(plazo):
+    return plazo is not None and time.monotonic() >= plazo
+
+
+@contextmanager
+def limitar_host(host, plazo=None):
+    estado = _estado_host(host)
+    if not estado["semaforo"].acquire(timeout=restante(plazo)):
+        raise TimeoutError(f"Plazo vencido esperando turno para {host}")
+    try:
+        # Espaciado mínimo entre consultas al mismo host (se reserva el turno antes de dormir)
+        with estado["lock"]:
+            ahora = time.monotonic()
+            turno = max(ahora, estado["proxima"])
+            estado["proxima"] = turno + estado["intervalo"]
+        if turno > ahora:
+            time.sleep(turno - ahora)
+        yield
+    finally:
+        estado["semaforo"].release()
+
+
+def _registrar(estado, latencia, falla):
+    # Contadores y circuito del host; toda consulta pasa por aquí una vez terminada
+    with estado["lock"]:
+        contadores = estado["contadores"]
+        contadores["consultas"] += 1
+        contadores["latencia_total"] += latencia
+        contadores["latencia_max"] = max(contadores["latencia_max"], latencia)
+        if not falla:
+            estado["fallas_seguidas"] = 0
+            return
+        contadores["errores"] += 1
+        estado["fallas_seguidas"] += 1
+        # Tras el enfriamiento se deja pasar una consulta de prueba; si vuelve a fallar, se reabre
+        if estado["fallas_seguidas"] >= FALLAS_PARA_ABRIR:
+            estado["abierto_hasta"] = time.monotonic() + ENFRIAMIENTO_CIRCUITO
+            contadores["circuito_abierto"] += 1
+
+
+def _espera_reintento(intento, respuesta):
+    # Retry-After si el servidor lo indica; si no, backoff exponencial con jitter completo
+    if respuesta is not None and respuesta.headers.get("Retry-After", "").isdigit():
+        return min(float(respuesta.headers["Retry-After"]), BACKOFF_MAXIMO)
+    return random.uniform(0, min(BACKOFF_BASE * 2 ** intento, BACKOFF_MAXIMO))
+
+
+def _timeout(plazo, timeout):
+    if plazo is None:
+        return timeout
+    queda = restante(plazo)
+    if queda <= 0:
+        raise TimeoutError("Plazo vencido")
+    conexion, lectura = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    return (min(conexion, queda), min(lectura, queda))
+
+
+def pedir(metodo, url, plazo=None, reintentos=REINTENTOS, **kwargs):
+    # Devuelve la última respuesta recibida (aunque sea 429/5xx tras agotar los reintentos: quien
+    # llama decide qué hacer con el código) o levanta el último error de conexión
+    host = urlparse(url).hostname
+    estado = _estado_host(host)
+    timeout = kwargs.pop("timeout", TIMEOUT)
+    respuesta, error = None, None
+
+    for intento in range(reintentos + 1):
+        if time.monotonic() < estado["abierto_hasta"]:
+            raise RuntimeError(f"Circuito abierto para {estado['proveedor']}: demasiadas fallas seguidas")
+
+        respuesta, error = None, None
+        with limitar_host(host, plazo):
+            inicio = time.monotonic()
+            try:
+                respuesta = estado["sesion"].request(metodo, url, timeout=_timeout(plazo, timeout), **kwargs)
+            except requests.RequestException as e:
+                error = e
+            _registrar(estado, time.monotonic() - inicio,
+                       error is not None or respuesta.status_code in ESTADOS_REINTENTABLES)
+
+        if error is None and respuesta.status_code not in ESTADOS_REINTENTABLES:
+            return respuesta
+        if intento == reintentos:
+            break
+        espera = _espera_reintento(intento, respuesta)
+        if plazo is not None and espera >= restante(plazo):
+            break
+        with estado["lock"]:
+            estado["contadores"]["reintentos"] += 1
+        time.sleep(espera)
+
+    if error is not None:
+        raise error
+    return respuesta
+
+
+def contadores():
+    # {proveedor: consultas, errores, reintentos, circuito_abierto, latencia_promedio, latencia_max}
+    resultado = {}
+    with _lock_hosts:
+        estados = list(_hosts.values())
+    for estado in estados:
+        with estado["lock"]:
+            c = dict(estado["contadores"])
+        c["latencia_promedio"] = c.pop("latencia_total") / c["consultas"] if c["consultas"] else 0.0
+        resultado[estado["proveedor"]] = c
+    return resultado
+
+
+def ejecutar_concurrente(tareas, plazo=None):
+    # tareas: {nombre: función sin argumentos}. Devuelve {nombre: {estado, resultado, error, tiempo}}
+    # con estado "ok", "error" o "plazo" (no terminó a tiempo; su hilo se abandona)
+    inicio = time.monotonic()
+    resultados = {}
+    ejecutor = ThreadPoolExecutor(max_workers=max(len(tareas), 1))
+    futuros = {ejecutor.submit(funcion): nombre for nombre, funcion in tareas.items()}
+    terminados = {}
+
+    def registrar(futuro):
+        terminados[futuro] = time.monotonic() - inicio
+
+    for futuro in futuros:
+        futuro.add_done_callback(registrar)
+    wait(futuros, timeout=restante(plazo))
+    ejecutor.shutdown(wait=False, cancel_futures=True)
+
+    for futuro, nombre in futuros.items():
+        if not futuro.done() or futuro.cancelled():
+            resultados[nombre] = {"estado": "plazo", "resultado": None, "error": None,
+                                  "tiempo": time.monotonic() - inicio}
+        elif futuro.exception() is not None:
+            resultados[nombre] = {"estado": "error", "resultado": None, "error": str(futuro.exception()),
+                                  "tiempo": terminados.get(futuro, time.monotonic() - inicio)}
+        else:
+            resultados[nombre] = {"estado": "ok", "resultado": futuro.result(), "error": None,
+                                  "tiempo": terminados.get(futuro, time.monotonic() - inicio)}
+    return resultados
@@ -1,12 +1,26 @@
-import requests
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[2]))  # apunta a raíz del proyecto
-from scripts.scraper.utils.build_id_extractor import obtener_build_id_latam
+from scripts.scraper.utils import cache_tokens
+from scripts.scraper.utils.build_id_extractor import invalidar_build_id_latam, obtener_build_id_latam
+from scripts.scraper.utils.red import pedir
+
+
+def clave_search_token(origen: str, destino: str, fecha: str):
+    return f"search_token:{origen}:{destino}:{fecha}"
 
 
 def obtener_search_token(origen: str, destino: str, fecha: str):
-    build_id = obtener_build_id_latam(origen, destino, fecha)  
+    return cache_tokens.obtener(clave_search_token(origen, destino, fecha), cache_tokens.TTL_SEARCH_TOKEN,
+                                lambda: descargar_search_token(origen, destino, fecha))
+
+
+def invalidar_search_token(origen: str, destino: str, fecha: str):
+    cache_tokens.invalidar(clave_search_token(origen, destino, fecha))
+
+
+def descargar_search_token(origen: str, destino: str, fecha: str, reintento: bool = False):
+    build_id = obtener_build_id_latam(origen, destino, fecha)
 
     url = f"https://www.latamairlines.com/es-cl/flights/_next/data/{build_id}/es-cl/flights.json"
     params = {
@@ -41,10 +55,15 @@ def obtener_search_token(origen: str, destino: str, fecha: str):
         "Origin": "https://www.latamairlines.com"
     }
 
-    response = requests.get(url, headers=headers, params=params, timeout=30)
+    response = pedir("GET", url, headers=headers, params=params, timeout=30)
+
+    # Un build id vencido (nuevo despliegue de LATAM) responde 404: se descarta y se reintenta una vez
+    if response.status_code == 404 and not reintento:
+        invalidar_build_id_latam()
+        return descargar_search_token(origen, destino, fecha, reintento=True)
 
     if response.status_code != 200:
-        raise Exception(f"Error obteniendo search token: {response.status_code}")
+        raise RuntimeError(f"Error obteniendo search token: {response.status_code}")
 
     data = response.json()
     search_token = data["pageProps"]["tokensToSearch"]["searchToken"]
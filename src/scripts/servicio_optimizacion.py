@@ -0,0 +1,212 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+# Importaciones pesadas una sola vez: cada trabajo reutiliza estos módulos ya cargados
+from ortools.sat.python import cp_model  # noqa: F401
+import numpy  # noqa: F401
+import pandas  # noqa: F401
+import psutil  # noqa: F401
+import psycopg2.extras  # noqa: F401
+import sqlalchemy  # noqa: F401
+from dotenv import load_dotenv
+
+import scripts.modelo.agregacion  # noqa: F401
+import scripts.modelo.carga  # noqa: F401
+import scripts.modelo.descomposicion  # noqa: F401
+import scripts.modelo.flota  # noqa: F401
+import scripts.modelo.geografia  # noqa: F401
+import scripts.modelo.metricas  # noqa: F401
+import scripts.modelo.persistencia  # noqa: F401
+import scripts.modelo.preprocesamiento  # noqa: F401
+from scripts import pipeline
+from scripts.modelo.conexion import obtener_conexion
+from scripts.modelo.metricas import nueva_medicion
+
+MAX_TRABAJOS_GUARDADOS = 200
+
+# Estados de un trabajo
+EN_COLA = "EN_COLA"
+EN_EJECUCION = "EN_EJECUCION"
+COMPLETADO = "COMPLETADO"
+ERROR = "ERROR"
+
+trabajos = OrderedDict()
+bloqueo_trabajos = threading.Lock()
+cola = queue.Queue()
+
+
+def ejecutar_etapa(funcion, *argumentos, **opciones):
+    # Corre una etapa del pipeline capturando su salida (la misma que imprimen los scripts)
+    salida = io.StringIO()
+    inicio = time.time()
+    codigo = 0
+    valor = None
+    try:
+        with contextlib.redirect_stdout(salida):
+            valor = funcion(*argumentos, **opciones)
+    except Exception:
+        salida.write(traceback.format_exc())
+        codigo = 1
+    return {"codigo": codigo, "salida": salida.getvalue(), "tiempo": time.time() - inicio}, valor
+
+
+def ejecutar_trabajo(trabajo):
+    # Crear buses y resolver comparten una conexión y una sola carga de datos del turno
+    turno_id = trabajo["turnoId"]
+    incremental = trabajo["incremental"]
+    resultado = {}
+
+    conn = obtener_conexion()
+    medicion = nueva_medicion(turno_id)
+    try:
+        carga, datos = ejecutar_etapa(pipeline.cargar_datos, conn, turno_id, incremental, medicion)
+        if carga["codigo"] != 0:
+            resultado["carga"] = carga
+            return ERROR, resultado, "Error al cargar los datos del turno"
+
+        if trabajo["crearBuses"]:
+            resultado["crear_buses"], _ = ejecutar_etapa(pipeline.crear_buses, conn, turno_id, datos, medicion=medicion)
+            if resultado["crear_buses"]["codigo"] != 0:
+                return ERROR, resultado, "Error al crear buses"
+
+        resultado["resolver"], resuelto = ejecutar_etapa(
+            pipeline.resolver_turno, conn, turno_id, datos,
+            incremental=incremental, fijar_no_modificados=trabajo["fijarNoModificados"],
+            dos_fases=trabajo["dosFases"], medicion=medicion
+        )
+        resultado["resolver"]["salida"] = carga["salida"] + resultado["resolver"]["salida"]
+        if resuelto is not None:
+            resultado["resolver"]["stats"] = resuelto["stats"]
+            resultado["resolver"]["tiempos"] = resuelto["tiempos"]
+            resultado["metricas"] = resuelto["metricas"]
+    finally:
+        conn.close()
+
+    if resultado["resolver"]["codigo"] != 0:
+        return ERROR, resultado, "Error al resolver el modelo"
+    resultado["solucion_encontrada"] = resuelto["solucion"] is not None
+    return COMPLETADO, resultado, None
+
+
+def procesar_cola():
+    # Un trabajo a la vez: CP-SAT ya usa todos los núcleos
+    while True:
+        trabajo = cola.get()
+        trabajo["estado"] = EN_EJECUCION
+        trabajo["inicio"] = time.time()
+        try:
+            estado, resultado, error = ejecutar_trabajo(trabajo)
+        except Exception:
+            estado, resultado, error = ERROR, {}, traceback.format_exc()
+        trabajo.update(estado=estado, resultado=resultado, error=error, fin=time.time())
+        print(f"{'✅' if estado == COMPLETADO else '❌'} Trabajo {trabajo['id']} (turno {trabajo['turnoId']}): "
+              f"{estado} en {trabajo['fin'] - trabajo['inicio']:.2f} segundos", file=sys.stderr)
+        cola.task_done()
+
+
+def encolar(turno_id, crear_buses=True, incremental=False, fijar_no_modificados=False, dos_fases=False):
+    trabajo = {
+        "id": str(uuid4()),
+        "turnoId": turno_id,
+        "crearBuses": crear_buses,
+        "incremental": incremental or fijar_no_modificados,
+        "fijarNoModificados": fijar_no_modificados,
+        "dosFases": dos_fases,
+        "estado": EN_COLA,
+        "creado": time.time(),
+        "resultado": None,
+        "error": None,
+    }
+    with bloqueo_trabajos:
+        trabajos[trabajo["id"]] = trabajo
+        # Se olvidan los trabajos terminados más antiguos
+        while len(trabajos) > MAX_TRABAJOS_GUARDADOS:
+            viejo = next((k for k, t in trabajos.items() if t["estado"] in (COMPLETADO, ERROR)), None)
+            if viejo is None:
+                break
+            del trabajos[viejo]
+    cola.put(trabajo)
+    return trabajo
+
+
+class ManejadorOptimizacion(BaseHTTPRequestHandler):
+    def responder(self, codigo, cuerpo):
+        datos = json.dumps(cuerpo, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        if self.path == "/salud":
+            return self.responder(200, {"estado": "ok", "en_cola": cola.qsize()})
+        if self.path.startswith("/trabajos/"):
+            trabajo = trabajos.get(self.path.split("/")[2])
+            if trabajo is None:
+                return self.responder(404, {"error": "Trabajo no encontrado"})
+            return self.responder(200, trabajo)
+        self.responder(404, {"error": "Ruta no encontrada"})
+
+    def do_POST(self):
+        if self.path != "/trabajos":
+            return self.responder(404, {"error": "Ruta no encontrada"})
+        try:
+            largo = int(self.headers.get("Content-Length", 0))
+            cuerpo = json.loads(self.rfile.read(largo) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            return self.responder(400, {"error": "JSON inválido"})
+        if not cuerpo.get("turnoId"):
+            return self.responder(400, {"error": "Falta turnoId"})
+        # Una re-optimización incremental reutiliza los buses existentes salvo que se pida lo contrario
+        incremental = bool(cuerpo.get("incremental", False))
+        fijar = bool(cuerpo.get("fijarNoModificados", False))
+        trabajo = encolar(str(cuerpo["turnoId"]), bool(cuerpo.get("crearBuses", not (incremental or fijar))), incremental, fijar,
+                          bool(cuerpo.get("dosFases", False)))
+        self.responder(202, {"id": trabajo["id"], "estado": trabajo["estado"]})
+
+    def log_message(self, formato, *args):
+        print(f"🌐 {self.address_string()} {formato % args}", file=sys.stderr)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Servicio local de optimización de turnos (crear buses + resolver modelo).")
+    parser.add_argument("--host", default=os.getenv("OPTIMIZADOR_HOST", "127.0.0.1"))
+    parser.add_argument("--puerto", type=int, default=int(os.getenv("OPTIMIZADOR_PUERTO", "8765")))
+    return parser.parse_args()
+
+
+def main():
+    load_dotenv()
+    args = parse_args()
+
+    # Se abre una conexión del pool de inmediato para que el primer trabajo no pague ese costo
+    obtener_conexion().close()
+
+    threading.Thread(target=procesar_cola, daemon=True).start()
+    servidor = ThreadingHTTPServer((args.host, args.puerto), ManejadorOptimizacion)
+    print(f"🚀 Servicio de optimización escuchando en http://{args.host}:{args.puerto}", file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+const { execFile } = require('child_process');
+const path = require('path');
+
+// Servicio Python de optimización (src/scripts/servicio_optimizacion.py).
+// Mantiene ortools/pandas/SQLAlchemy cargados y el pool de conexiones abierto entre turnos.
+const OPTIMIZADOR_URL = process.env.OPTIMIZADOR_URL || 'http://127.0.0.1:8765';
+const INTERVALO_CONSULTA_MS = 500;
+// Margen sobre max_tiempo_ejecucion para cargar datos, crear buses y escribir el plan
+const MARGEN_PLAZO_MS = Number(process.env.OPTIMIZADOR_MARGEN_MS || 5 * 60 * 1000);
+const MENSAJE_SIN_SOLUCION = '❌ No se encontró solución.';
+
+const esperar = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Opciones de una optimización: { incremental, fijarNoModificados, dosFases, maxTiempoEjecucion }.
+ * Como en el servicio, una re-optimización incremental no vuelve a crear buses.
+ */
+function crearBuses({ incremental = false, fijarNoModificados = false } = {}) {
+  return !(incremental || fijarNoModificados);
+}
+
+/**
+ * Encola "crear buses + resolver turno" en el servicio y espera su resultado.
+ * Devuelve el trabajo terminado: { id, turnoId, estado, resultado, error }, o null si el servicio
+ * no está corriendo (el trabajo nunca fue aceptado).
+ */
+async function optimizarConServicio(turnoId, opciones = {}) {
+  let respuesta;
+  try {
+    respuesta = await fetch(`${OPTIMIZADOR_URL}/trabajos`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        turnoId,
+        crearBuses: crearBuses(opciones),
+        incremental: Boolean(opciones.incremental),
+        fijarNoModificados: Boolean(opciones.fijarNoModificados),
+        dosFases: Boolean(opciones.dosFases),
+      }),
+    });
+  } catch (error) {
+    if (error.cause?.code === 'ECONNREFUSED') return null;
+    throw error;
+  }
+  if (!respuesta.ok) {
+    throw new Error(`Servicio de optimización respondió ${respuesta.status}`);
+  }
+  const { id } = await respuesta.json();
+
+  // El plazo corre desde que el trabajo se acepta y se reinicia cuando sale de la cola
+  const plazoMs = (opciones.maxTiempoEjecucion || 120) * 1000 + MARGEN_PLAZO_MS;
+  let limite = Date.now() + plazoMs;
+  let enEjecucion = false;
+  while (Date.now() < limite) {
+    await esperar(INTERVALO_CONSULTA_MS);
+    // Ya aceptado: si el servicio se cae o olvidó el trabajo, es un error (parte del plan puede estar escrito)
+    const consulta = await fetch(`${OPTIMIZADOR_URL}/trabajos/${id}`);
+    if (!consulta.ok) {
+      throw new Error(`Servicio de optimización respondió ${consulta.status} para el trabajo ${id}`);
+    }
+    const trabajo = await consulta.json();
+    if (trabajo.estado === 'COMPLETADO' || trabajo.estado === 'ERROR') return trabajo;
+    if (trabajo.estado === 'EN_EJECUCION' && !enEjecucion) {
+      enEjecucion = true;
+      limite = Date.now() + plazoMs;
+    }
+  }
+  throw new Error(`El trabajo ${id} del turno ${turnoId} no terminó en ${Math.round(plazoMs / 1000)} segundos`);
+}
+
+/**
+ * Respaldo cuando el servicio no está corriendo: un proceso python3 por script (comportamiento original).
+ */
+function ejecutarScript(script, turnoId, argumentos = []) {
+  return new Promise((resolve, reject) => {
+    execFile('python3', [script, '--turnoId', turnoId, ...argumentos], { maxBuffer: 64 * 1024 * 1024 }, (err, stdout, stderr) => {
+      if (err) return reject(stderr || err.message);
+      resolve(stdout);
+    });
+  });
+}
+
+async function optimizarConProcesos(turnoId, opciones = {}) {
+  const busesScript = path.resolve(__dirname, '../scripts/crear_buses.py');
+  const resolverScript = path.resolve(__dirname, '../scripts/resolver_modelo.py');
+  const argumentos = [];
+  if (opciones.incremental) argumentos.push('--incremental');
+  if (opciones.fijarNoModificados) argumentos.push('--fijar-no-modificados');
+  if (opciones.dosFases) argumentos.push('--dos-fases');
+
+  const salidaBuses = crearBuses(opciones) ? await ejecutarScript(busesScript, turnoId) : '';
+  const salidaResolver = await ejecutarScript(resolverScript, turnoId, argumentos);
+  return {
+    estado: 'COMPLETADO',
+    turnoId,
+    resultado: {
+      crear_buses: { codigo: 0, salida: salidaBuses },
+      resolver: { codigo: 0, salida: salidaResolver },
+      solucion_encontrada: !salidaResolver.includes(MENSAJE_SIN_SOLUCION),
+    },
+    error: null,
+  };
+}
+
+/**
+ * Crea los buses y resuelve el modelo del turno. Usa el servicio persistente si está disponible;
+ * si no se puede conectar, ejecuta los scripts como procesos independientes.
+ */
+async function optimizarTurnoPython(turnoId, opciones = {}) {
+  const trabajo = await optimizarConServicio(turnoId, opciones);
+  if (trabajo) return trabajo;
+  console.warn(`Servicio de optimización no disponible en ${OPTIMIZADOR_URL}, ejecutando scripts directamente`);
+  return optimizarConProcesos(turnoId, opciones);
+}
+
+module.exports = { optimizarTurnoPython };